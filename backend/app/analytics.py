@@ -1,3 +1,4 @@
+import functools
 import json
 import os
 import re
@@ -10,10 +11,7 @@ from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from fastapi import Request
 
-try:
-    from .ingest import STOP_WORDS
-except ImportError:  # pragma: no cover - fallback if ingest import changes
-    STOP_WORDS = set()
+from .analytics_writer import ANALYTICS_ASYNC, AnalyticsWriter
 
 _DB_PATH = Path(os.getenv("ANALYTICS_DB_PATH", Path(__file__).resolve().parent.parent / "analytics.db"))
 _DB_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -31,6 +29,46 @@ def _get_conn() -> sqlite3.Connection:
     return conn
 
 
+# Fire-and-forget events (user, retrieval, summary, quiz attempt, feedback) go through one
+# background writer; ingestion events stay synchronous because callers need their row id.
+_writer = AnalyticsWriter(_DB_PATH)
+# How long a report waits for queued events before reading without them.
+_READ_FLUSH_TIMEOUT = 5.0
+
+
+def _record_event(sql: str, payload: Sequence[Any]) -> None:
+    if ANALYTICS_ASYNC:
+        _writer.submit(sql, payload)
+        return
+    with _LOCK:
+        conn = _get_conn()
+        try:
+            conn.execute(sql, payload)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def _get_read_conn() -> sqlite3.Connection:
+    """Connection for reports, opened once events logged before the call are committed."""
+    if ANALYTICS_ASYNC:
+        _writer.flush(_READ_FLUSH_TIMEOUT)
+    return _get_conn()
+
+
+def flush_analytics(timeout: Optional[float] = None) -> bool:
+    return _writer.flush(timeout)
+
+
+def close_analytics_writer() -> None:
+    """Commit queued events and stop the writer thread (application shutdown)."""
+    _writer.close()
+
+
+def analytics_writer_stats() -> Dict[str, Any]:
+    return {"async": ANALYTICS_ASYNC, **_writer.stats()}
+
+
 def _serialize(metadata: Optional[Any]) -> Optional[str]:
     if metadata is None:
         return None
@@ -40,6 +78,31 @@ def _serialize(metadata: Optional[Any]) -> Optional[str]:
         return json.dumps(str(metadata))
 
 
+# Bumped by each data migration in _ensure_schema (stored in PRAGMA user_version).
+SCHEMA_VERSION = 1
+# Text format of every stored timestamp (see _now); it sorts chronologically as plain text.
+_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+_EVENT_TABLES = [
+    "ingestion_events", "chunk_topics", "retrieval_events", "user_events", "summary_events", "quiz_attempts", "feedback_events",
+]
+# Per-student timelines: equality on (university, roll_no), then a range scan or ORDER BY on timestamp.
+_TENANT_TIME_INDEXES = {
+    "idx_quiz_attempts_tenant_time": "quiz_attempts",
+    "idx_retrieval_events_tenant_time": "retrieval_events",
+    "idx_user_events_tenant_time": "user_events",
+}
+
+
+def _normalize_timestamps(conn: sqlite3.Connection) -> None:
+    """Rewrite timestamps in other ISO-8601 shapes (microseconds, space separator, UTC offset) to _TIMESTAMP_FORMAT."""
+    for tbl in _EVENT_TABLES:
+        conn.execute(
+            f"UPDATE {tbl} SET timestamp = strftime('{_TIMESTAMP_FORMAT}', timestamp) "
+            f"WHERE strftime('{_TIMESTAMP_FORMAT}', timestamp) IS NOT NULL "
+            f"AND timestamp <> strftime('{_TIMESTAMP_FORMAT}', timestamp)"
+        )
+
+
 def _ensure_schema() -> None:
     # Base tables with university/roll_no support from the start
     tables = [
@@ -92,6 +155,7 @@ def _ensure_schema() -> None:
             retrieved_sources TEXT,
             scores TEXT,
             latency_ms INTEGER,
+            first_token_ms INTEGER,
             context_count INTEGER,
             answer_tokens INTEGER,
             metadata TEXT
@@ -118,6 +182,7 @@ def _ensure_schema() -> None:
             topic TEXT,
             chunk_count INTEGER,
             latency_ms INTEGER,
+            first_token_ms INTEGER,
             mode TEXT,
             metadata TEXT
         );
@@ -171,14 +236,31 @@ def _ensure_schema() -> None:
                 conn.execute(sql)
             
             # Migration: Ensure columns exist for existing databases
-            existing_tables = ["ingestion_events", "chunk_topics", "retrieval_events", "user_events", "summary_events", "quiz_attempts", "feedback_events"]
-            for tbl in existing_tables:
+            for tbl in _EVENT_TABLES:
                 for col in ["university", "roll_no"]:
                     try:
                         conn.execute(f"ALTER TABLE {tbl} ADD COLUMN {col} TEXT")
                     except sqlite3.OperationalError:
                         pass # Column likely exists
-            
+            try:
+                conn.execute("ALTER TABLE retrieval_events ADD COLUMN first_token_ms INTEGER")
+            except sqlite3.OperationalError:
+                pass # Column likely exists
+            try:
+                conn.execute("ALTER TABLE summary_events ADD COLUMN first_token_ms INTEGER")
+            except sqlite3.OperationalError:
+                pass # Column likely exists
+
+            # Migration 1: one sortable timestamp format, so queries can ORDER BY timestamp
+            # (and use the indexes below) instead of ORDER BY datetime(timestamp).
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < 1:
+                _normalize_timestamps(conn)
+            for name, tbl in _TENANT_TIME_INDEXES.items():
+                conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {tbl}(university, roll_no, timestamp)")
+            if version < SCHEMA_VERSION:
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
             conn.commit()
         finally:
             conn.close()
@@ -236,16 +318,10 @@ def log_user_event(
         event_type,
         _serialize(metadata),
     )
-    with _LOCK:
-        conn = _get_conn()
-        try:
-            conn.execute(
-                "INSERT INTO user_events (timestamp, university, roll_no, session_id, event_type, metadata) VALUES (?, ?, ?, ?, ?, ?)",
-                payload,
-            )
-            conn.commit()
-        finally:
-            conn.close()
+    _record_event(
+        "INSERT INTO user_events (timestamp, university, roll_no, session_id, event_type, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+        payload,
+    )
 
 
 def log_ingestion_event(
@@ -297,17 +373,26 @@ def log_ingestion_event(
             conn.close()
 
 
-def derive_chunk_topics(chunks: Sequence[str], top_terms: int = 2) -> List[Dict[str, Any]]:
+def derive_chunk_topics(
+    chunks: Sequence[str],
+    top_terms: int = 2,
+    term_counts: Optional[Sequence[Counter]] = None,
+) -> List[Dict[str, Any]]:
+    """Label each chunk by its most frequent terms; ``term_counts`` (from app.tokenization) skips re-tokenizing."""
+    # Imported here: ingest imports this module, so a module-level import only ever saw an empty set.
+    from .ingest import STOP_WORDS
+
     topics: List[Dict[str, Any]] = []
-    stop_words = set(STOP_WORDS)
     for index, chunk in enumerate(chunks):
-        tokens = re.findall(r"[A-Za-z][\w-]+", (chunk or "").lower())
-        filtered = [token for token in tokens if len(token) >= 4 and token not in stop_words]
-        token_count = len(filtered)
+        if term_counts is not None:
+            counts = term_counts[index]
+        else:
+            tokens = re.findall(r"[A-Za-z][\w-]+", (chunk or "").lower())
+            counts = Counter(token for token in tokens if len(token) >= 4 and token not in STOP_WORDS)
+        token_count = sum(counts.values())
         topic_terms: List[str] = []
         topic_label: Optional[str] = None
-        if filtered:
-            counts = Counter(filtered)
+        if counts:
             topic_terms = [term for term, _ in counts.most_common(max(3, top_terms))]
             topic_label = " ".join(term.title() for term in topic_terms[:top_terms]) if topic_terms else None
         topics.append(
@@ -376,8 +461,10 @@ def log_retrieval_event(
     answer_tokens: Optional[int] = None,
     metadata: Optional[Dict[str, Any]] = None,
     university: Optional[str] = None,
-    roll_no: Optional[str] = None
+    roll_no: Optional[str] = None,
+    first_token_ms: Optional[int] = None,
 ) -> None:
+    """Record one retrieval; ``first_token_ms`` is set for streamed answers, ``latency_ms`` is always the total."""
     sources = [
         (hit.get("meta", {}) or {}).get("source")
         for hit in hits
@@ -401,25 +488,20 @@ def log_retrieval_event(
         _serialize(filtered_sources),
         _serialize(scores),
         int(latency_ms),
+        None if first_token_ms is None else int(first_token_ms),
         len(hits),
         None if answer_tokens is None else int(answer_tokens),
         _serialize(metadata),
     )
-    with _LOCK:
-        conn = _get_conn()
-        try:
-            conn.execute(
-                """
-                INSERT INTO retrieval_events (
-                    timestamp, university, roll_no, session_id, endpoint, question, topic, top_k,
-                    retrieved_sources, scores, latency_ms, context_count, answer_tokens, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                payload,
-            )
-            conn.commit()
-        finally:
-            conn.close()
+    _record_event(
+        """
+        INSERT INTO retrieval_events (
+            timestamp, university, roll_no, session_id, endpoint, question, topic, top_k,
+            retrieved_sources, scores, latency_ms, first_token_ms, context_count, answer_tokens, metadata
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        payload,
+    )
 
 
 def log_summary_event(
@@ -430,8 +512,10 @@ def log_summary_event(
     mode: str = "summary",
     metadata: Optional[Dict[str, Any]] = None,
     university: Optional[str] = None,
-    roll_no: Optional[str] = None
+    roll_no: Optional[str] = None,
+    first_token_ms: Optional[int] = None,
 ) -> None:
+    """Record one summary; ``first_token_ms`` is set for streamed summaries, ``latency_ms`` is always the total."""
     payload = (
         _now(),
         university,
@@ -440,23 +524,18 @@ def log_summary_event(
         topic,
         int(chunk_count),
         int(latency_ms),
+        None if first_token_ms is None else int(first_token_ms),
         mode,
         _serialize(metadata),
     )
-    with _LOCK:
-        conn = _get_conn()
-        try:
-            conn.execute(
-                """
-                INSERT INTO summary_events (
-                    timestamp, university, roll_no, session_id, topic, chunk_count, latency_ms, mode, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                payload,
-            )
-            conn.commit()
-        finally:
-            conn.close()
+    _record_event(
+        """
+        INSERT INTO summary_events (
+            timestamp, university, roll_no, session_id, topic, chunk_count, latency_ms, first_token_ms, mode, metadata
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        payload,
+    )
 
 
 def log_quiz_question_event(
@@ -482,19 +561,28 @@ def log_quiz_question_event(
     log_user_event("quiz_question_generated", session_id, metadata, university=university, roll_no=roll_no)
 
 
-def log_quiz_attempt(
+_QUIZ_ATTEMPT_INSERT = """
+    INSERT OR IGNORE INTO quiz_attempts (
+        timestamp, university, roll_no, session_id, question_id, topic, difficulty, was_correct,
+        selected_option, correct_option, latency_ms, source_label, metadata
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _quiz_attempt_row(
     session_id: str,
     attempt: Dict[str, Any],
-    source_label: Optional[str] = None,
-    latency_ms: Optional[int] = None,
-    university: Optional[str] = None,
-    roll_no: Optional[str] = None
-) -> None:
+    source_label: Optional[str],
+    latency_ms: Optional[int],
+    university: Optional[str],
+    roll_no: Optional[str],
+    timestamp: Optional[str] = None,
+) -> Optional[Tuple[Any, ...]]:
     question_id = attempt.get("question_id") or attempt.get("questionId")
     if not question_id:
-        return
-    payload = (
-        _now(),
+        return None
+    return (
+        timestamp or _now(),
         university,
         roll_no,
         session_id,
@@ -510,34 +598,58 @@ def log_quiz_attempt(
             "explanation": attempt.get("explanation"),
         }),
     )
-    with _LOCK:
-        conn = _get_conn()
-        try:
-            conn.execute(
-                """
-                INSERT OR IGNORE INTO quiz_attempts (
-                    timestamp, university, roll_no, session_id, question_id, topic, difficulty, was_correct,
-                    selected_option, correct_option, latency_ms, source_label, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                payload,
-            )
-            conn.commit()
-        finally:
-            conn.close()
 
 
-def log_quiz_history(
+def log_quiz_attempt(
     session_id: str,
-    history: Sequence[Dict[str, Any]],
+    attempt: Dict[str, Any],
     source_label: Optional[str] = None,
+    latency_ms: Optional[int] = None,
     university: Optional[str] = None,
     roll_no: Optional[str] = None
 ) -> None:
-    if not history:
+    payload = _quiz_attempt_row(session_id, attempt, source_label, latency_ms, university, roll_no)
+    if payload is None:
         return
-    for attempt in history:
-        log_quiz_attempt(session_id, attempt, source_label=source_label, university=university, roll_no=roll_no)
+    _record_event(_QUIZ_ATTEMPT_INSERT, payload)
+
+
+def log_quiz_history(
+    session_id: str,
+    history: Sequence[Dict[str, Any]],
+    source_label: Optional[str] = None,
+    university: Optional[str] = None,
+    roll_no: Optional[str] = None
+) -> int:
+    """
+    Store a quiz history in one transaction. Attempts already recorded for this session and
+    question (``idx_quiz_attempt_unique``) are skipped; returns how many rows were new.
+    Attempts still queued by ``log_quiz_attempt`` are committed first, so they keep their
+    row (and source label) and are not counted. Single quiz steps should use
+    ``log_quiz_attempt``, which queues the row on the background writer and counts nothing.
+    """
+    timestamp = _now()
+    rows = [
+        row
+        for row in (
+            _quiz_attempt_row(session_id, attempt, source_label, None, university, roll_no, timestamp)
+            for attempt in history or ()
+        )
+        if row is not None
+    ]
+    if not rows:
+        return 0
+    if ANALYTICS_ASYNC:
+        _writer.flush(_READ_FLUSH_TIMEOUT)
+    with _LOCK:
+        conn = _get_conn()
+        try:
+            with conn:
+                cursor = conn.executemany(_QUIZ_ATTEMPT_INSERT, rows)
+            # executemany sums the rows each insert changed; ignored duplicates count as 0.
+            return max(cursor.rowcount, 0)
+        finally:
+            conn.close()
 
 
 def _simplify_source_label(source_label: Optional[str]) -> Optional[str]:
@@ -789,12 +901,13 @@ def _fetch_quiz_attempt_rows(
     )
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
-    query += " ORDER BY datetime(timestamp) DESC"
+    # Rows logged in one batch share a timestamp; id keeps them in insertion order.
+    query += " ORDER BY timestamp DESC, id DESC"
     if limit:
         query += " LIMIT ?"
         params.append(int(limit))
 
-    with _get_conn() as conn:
+    with _get_read_conn() as conn:
         conn.row_factory = sqlite3.Row
         rows = conn.execute(query, params).fetchall()
     rows.reverse()
@@ -815,9 +928,9 @@ def _get_latest_session_id(university: Optional[str] = None, roll_no: Optional[s
         query += " AND roll_no = ?"
         params.append(roll_no)
         
-    query += " ORDER BY datetime(timestamp) DESC LIMIT 1"
+    query += " ORDER BY timestamp DESC, id DESC LIMIT 1"
     
-    with _get_conn() as conn:
+    with _get_read_conn() as conn:
         row = conn.execute(query, params).fetchone()
     if row and row[0]:
         return str(row[0])
@@ -835,9 +948,9 @@ def _collect_session_overview(limit: int = 12, university: Optional[str] = None,
         query += " AND roll_no = ?"
         params.append(roll_no)
         
-    query += " ORDER BY datetime(timestamp) ASC"
+    query += " ORDER BY timestamp ASC, id ASC"
 
-    with _get_conn() as conn:
+    with _get_read_conn() as conn:
         conn.row_factory = sqlite3.Row
         rows = conn.execute(query, params).fetchall()
 
@@ -916,7 +1029,7 @@ def _collect_source_options(limit: Optional[int] = None, university: Optional[st
         
     query += " GROUP BY source_label ORDER BY attempts DESC"
 
-    with _get_conn() as conn:
+    with _get_read_conn() as conn:
         conn.row_factory = sqlite3.Row
         rows = conn.execute(query, params).fetchall()
 
@@ -951,16 +1064,16 @@ def get_quiz_analytics_options(university: Optional[str] = None, roll_no: Option
     }
 
 
-try:
-    from plotly.offline import plot as plotly_render
-    from plotly.subplots import make_subplots
-    import plotly.graph_objects as go
-    _PLOTLY_AVAILABLE = True
-except ImportError:
-    _PLOTLY_AVAILABLE = False
-    plotly_render = None
-    make_subplots = None
-    go = None
+@functools.lru_cache(maxsize=None)
+def _load_plotly() -> Optional[Tuple[Any, Any, Any]]:
+    """``(plot, make_subplots, graph_objects)``, imported on the first report rather than at startup."""
+    try:
+        from plotly.offline import plot as plotly_render
+        from plotly.subplots import make_subplots
+        import plotly.graph_objects as go
+    except ImportError:
+        return None
+    return plotly_render, make_subplots, go
 
 
 def render_quiz_performance_html(
@@ -973,8 +1086,6 @@ def render_quiz_performance_html(
     roll_no: Optional[str] = None
 ) -> str:
     """Return a student-friendly quiz performance report with recommendations."""
-    # Use global availability check
-    plotly_available = _PLOTLY_AVAILABLE
 
     resolved_scope = (scope or "session").strip().lower()
 
@@ -1028,8 +1139,9 @@ def render_quiz_performance_html(
     }
 
     chart_div = ""
-    if plotly_available and plotly_render and make_subplots and go:
-        chart_div = _build_quiz_performance_chart(records, stats, plotly_render, make_subplots, go)
+    plotly_modules = _load_plotly()
+    if plotly_modules:
+        chart_div = _build_quiz_performance_chart(records, stats, *plotly_modules)
     else:
         chart_div = (
             "<div class='notice'>Interactive charts require Plotly. Install it with "
@@ -1343,17 +1455,11 @@ def log_feedback_event(
         comment,
         _serialize(metadata),
     )
-    with _LOCK:
-        conn = _get_conn()
-        try:
-            conn.execute(
-                """
-                INSERT INTO feedback_events (
-                    timestamp, university, roll_no, session_id, object_type, object_id, feedback, comment, metadata
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                payload,
-            )
-            conn.commit()
-        finally:
-            conn.close()
+    _record_event(
+        """
+        INSERT INTO feedback_events (
+            timestamp, university, roll_no, session_id, object_type, object_id, feedback, comment, metadata
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        payload,
+    )
@@ -0,0 +1,182 @@
+"""
+Background writer for the analytics event log.
+
+Request handlers hand ``(sql, params)`` rows to a bounded in-memory queue and
+return immediately. One daemon thread drains the queue over a single
+long-lived SQLite connection, grouping consecutive rows of the same
+statement into ``executemany`` calls and committing once per batch: after
+``ANALYTICS_BATCH_SIZE`` rows, or ``ANALYTICS_FLUSH_MS`` after the first row
+of the batch arrived. When the queue is full new events are dropped and
+counted rather than blocking the request. ``flush`` waits for everything
+queued so far to be committed; ``close`` flushes and stops the thread (the
+next event starts a new one).
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from itertools import groupby
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_ASYNC = os.getenv("ANALYTICS_ASYNC", "true").lower() not in ("0", "false", "no")
+ANALYTICS_QUEUE_SIZE = int(os.getenv("ANALYTICS_QUEUE_SIZE", "10000"))
+ANALYTICS_BATCH_SIZE = int(os.getenv("ANALYTICS_BATCH_SIZE", "256"))
+ANALYTICS_FLUSH_MS = float(os.getenv("ANALYTICS_FLUSH_MS", "200"))
+
+Event = Tuple[str, Sequence[Any]]
+_STOP = object()
+
+
+class AnalyticsWriter:
+    def __init__(
+        self,
+        db_path: Path,
+        *,
+        max_queue: int = ANALYTICS_QUEUE_SIZE,
+        batch_size: int = ANALYTICS_BATCH_SIZE,
+        flush_ms: float = ANALYTICS_FLUSH_MS,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_ms) / 1000.0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max(1, max_queue))
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._enqueued = 0
+        self._written = 0
+        self._dropped = 0
+        self._failed = 0
+        self._batches = 0
+        self._atexit_registered = False
+
+    # --- Producer side ---
+
+    def submit(self, sql: str, params: Sequence[Any]) -> bool:
+        """Queue one row; False (and counted as dropped) when the queue is full."""
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait((sql, params))
+        except queue.Full:
+            with self._stats_lock:
+                self._dropped += 1
+            return False
+        with self._stats_lock:
+            self._enqueued += 1
+        return True
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every row queued so far is committed (or failed); False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """Flush pending rows, then stop the writer thread and close its connection."""
+        with self._thread_lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            if not self.flush(timeout):
+                logger.warning("Analytics writer closed with %d events still queued", self._queue.qsize())
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                return
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "queue_capacity": self._queue.maxsize,
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "dropped": self._dropped,
+                "failed": self._failed,
+                "batches": self._batches,
+                "avg_batch_size": round(self._written / self._batches, 2) if self._batches else 0.0,
+            }
+
+    # --- Writer thread ---
+
+    def _ensure_thread(self) -> None:
+        if self._thread is not None:
+            return
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="analytics-writer", daemon=True)
+                self._thread.start()
+                if not self._atexit_registered:
+                    atexit.register(self.close)
+                    self._atexit_registered = True
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _next_batch(self) -> Tuple[List[Event], bool]:
+        """Block for one row, then gather more until the batch is full or the flush interval ends."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _write(self, conn: Optional[sqlite3.Connection], batch: List[Event]) -> Optional[sqlite3.Connection]:
+        """Commit ``batch`` in one transaction; returns the connection to reuse (None after a failure)."""
+        try:
+            if conn is None:
+                conn = self._connect()
+            with conn:
+                for sql, rows in groupby(batch, key=lambda event: event[0]):
+                    conn.executemany(sql, [params for _, params in rows])
+        except sqlite3.Error as exc:
+            logger.warning("Dropping %d analytics events after a failed write: %s", len(batch), exc)
+            with self._stats_lock:
+                self._failed += len(batch)
+            if conn is not None:
+                conn.close()
+            return None
+        with self._stats_lock:
+            self._written += len(batch)
+            self._batches += 1
+        return conn
+
+    def _run(self) -> None:
+        conn: Optional[sqlite3.Connection] = None
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if batch:
+                    conn = self._write(conn, batch)
+                for _ in range(len(batch) + stopping):
+                    self._queue.task_done()
+        finally:
+            if conn is not None:
+                conn.close()
@@ -0,0 +1,203 @@
+"""
+Chunk-level embedding dedup store shared by every tenant and worker.
+
+Students of one university upload the same syllabi and slide decks, so most
+of their chunks have been embedded before. Vectors are kept per embedding
+model in an append-only float32 matrix that readers memory-map, and a SQLite
+table maps the SHA-256 of each chunk's text to its row. SQLite's write lock
+also serialises appends from several worker processes, so row numbers never
+collide. Only chunks missing from the store reach the embedding model.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_base_dir = Path(__file__).resolve().parent.parent
+_store_dir_setting = os.getenv("CHUNK_EMBED_CACHE_DIR")
+DEFAULT_STORE_DIR = Path(_store_dir_setting) if _store_dir_setting else _base_dir / "chunk_embeddings"
+CHUNK_EMBED_CACHE_ENABLED = os.getenv("CHUNK_EMBED_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+# Past this many rows the store stops growing (lookups keep working).
+CHUNK_EMBED_CACHE_MAX_ROWS = int(os.getenv("CHUNK_EMBED_CACHE_MAX_ROWS", "2000000"))
+
+VECTORS_FILE = "vectors.f32"
+INDEX_FILE = "index.db"
+INFO_FILE = "store.json"
+_LOOKUP_BATCH = 500
+
+
+def chunk_hash(text: str) -> bytes:
+    """Identity of a chunk: the first 16 bytes of the SHA-256 of its UTF-8 text."""
+    return hashlib.sha256(text.encode("utf-8")).digest()[:16]
+
+
+class ChunkEmbeddingStore:
+    def __init__(self, root: Path, model: str, max_rows: int = CHUNK_EMBED_CACHE_MAX_ROWS):
+        self.model = model
+        self.path = Path(root) / hashlib.sha256(model.encode()).hexdigest()[:16]
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._dim: Optional[int] = None
+        self._matrix: Optional[np.memmap] = None
+        self._hits = 0
+        self._misses = 0
+        with closing(self._connect()) as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS chunks (hash BLOB PRIMARY KEY, row INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO counters (name, value) VALUES ('rows', 0)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path / INDEX_FILE, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _dimension(self) -> Optional[int]:
+        if self._dim is None:
+            try:
+                self._dim = int(json.loads((self.path / INFO_FILE).read_text())["dim"])
+            except (OSError, ValueError, KeyError):
+                return None
+        return self._dim
+
+    def _rows(self, needed: int) -> Optional[np.memmap]:
+        """Memory map covering at least ``needed`` rows, re-mapped when other workers have appended."""
+        dim = self._dimension()
+        if dim is None:
+            return None
+        with self._lock:
+            if self._matrix is None or len(self._matrix) < needed:
+                available = (self.path / VECTORS_FILE).stat().st_size // (dim * 4)
+                if available == 0:
+                    return None
+                self._matrix = np.memmap(self.path / VECTORS_FILE, dtype="float32", mode="r", shape=(available, dim))
+            return self._matrix
+
+    def lookup(self, hashes: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        """Return the stored vector for every hash that is already known."""
+        unique = list(dict.fromkeys(hashes))
+        rows: Dict[bytes, int] = {}
+        if unique and self._dimension() is not None:
+            with closing(self._connect()) as conn:
+                for start in range(0, len(unique), _LOOKUP_BATCH):
+                    batch = unique[start:start + _LOOKUP_BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    rows.update(
+                        conn.execute(f"SELECT hash, row FROM chunks WHERE hash IN ({placeholders})", batch).fetchall()
+                    )
+        found: Dict[bytes, np.ndarray] = {}
+        if rows:
+            matrix = self._rows(max(rows.values()) + 1)
+            if matrix is not None:
+                found = {key: np.array(matrix[row]) for key, row in rows.items() if row < len(matrix)}
+        with self._lock:
+            self._hits += len(found)
+            self._misses += len(unique) - len(found)
+        return found
+
+    def add(self, hashes: Sequence[bytes], vectors: np.ndarray) -> int:
+        """Append vectors for hashes not stored yet; returns how many rows were written."""
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        if not len(hashes) or vectors.ndim != 2:
+            return 0
+        dim = self._dimension()
+        if dim is None:
+            info_path = self.path / INFO_FILE
+            if not info_path.exists():
+                tmp_path = info_path.with_suffix(f".{os.getpid()}.tmp")
+                tmp_path.write_text(json.dumps({"model": self.model, "dim": int(vectors.shape[1])}))
+                os.replace(tmp_path, info_path)
+            self._dim = None
+            dim = self._dimension()
+        if dim != vectors.shape[1]:
+            logger.warning("Chunk embedding store for %s holds %s-d vectors, got %d-d", self.model, dim, vectors.shape[1])
+            return 0
+
+        conn = self._connect()
+        try:
+            # BEGIN IMMEDIATE takes SQLite's write lock, serialising appenders across processes.
+            conn.execute("BEGIN IMMEDIATE")
+            next_row = conn.execute("SELECT value FROM counters WHERE name='rows'").fetchone()[0]
+            fresh, seen = [], set()
+            for position, key in enumerate(hashes):
+                if key in seen:
+                    continue
+                seen.add(key)
+                fresh.append((key, position))
+            known = set()
+            for start in range(0, len(fresh), _LOOKUP_BATCH):
+                batch = [key for key, _ in fresh[start:start + _LOOKUP_BATCH]]
+                placeholders = ",".join("?" * len(batch))
+                known.update(row[0] for row in conn.execute(f"SELECT hash FROM chunks WHERE hash IN ({placeholders})", batch))
+            fresh = [(key, position) for key, position in fresh if key not in known]
+            fresh = fresh[: max(0, self.max_rows - next_row)]
+            if not fresh:
+                conn.execute("ROLLBACK")
+                return 0
+            block = vectors[[position for _, position in fresh]]
+            mode = "r+b" if (self.path / VECTORS_FILE).exists() else "w+b"
+            with open(self.path / VECTORS_FILE, mode) as handle:
+                # Offsets come from the committed row counter, so rows left by a crashed writer are overwritten.
+                handle.seek(next_row * dim * 4)
+                handle.write(block.tobytes())
+                handle.flush()
+                os.fsync(handle.fileno())
+            conn.executemany(
+                "INSERT INTO chunks (hash, row) VALUES (?, ?)",
+                [(key, next_row + offset) for offset, (key, _) in enumerate(fresh)],
+            )
+            conn.execute("UPDATE counters SET value=? WHERE name='rows'", (next_row + len(fresh),))
+            conn.execute("COMMIT")
+            return len(fresh)
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def stats(self) -> Dict[str, object]:
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT value FROM counters WHERE name='rows'").fetchone()[0]
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "model": self.model,
+                "rows": rows,
+                "dim": self._dimension(),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_stores: Dict[str, ChunkEmbeddingStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_chunk_embedding_store(model: str) -> Optional[ChunkEmbeddingStore]:
+    """Shared store for one embedding model, or None when ``CHUNK_EMBED_CACHE_ENABLED`` is off."""
+    if not CHUNK_EMBED_CACHE_ENABLED:
+        return None
+    with _stores_lock:
+        store = _stores.get(model)
+        if store is None:
+            store = _stores[model] = ChunkEmbeddingStore(DEFAULT_STORE_DIR, model)
+        return store
+
+
+def chunk_embedding_stats() -> List[Dict[str, object]]:
+    with _stores_lock:
+        stores = list(_stores.values())
+    return [store.stats() for store in stores]
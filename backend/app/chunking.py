@@ -0,0 +1,275 @@
+"""
+Pluggable text chunking for ingestion.
+
+Every strategy returns character ``(start, end)`` offsets into the extracted
+text instead of copies, so later stages slice only what they need and the
+offsets can be stored next to each chunk.
+
+Strategies (``CHUNK_STRATEGY``):
+
+* ``fixed`` - fixed-width character windows with ``CHUNK_OVERLAP`` characters
+  of overlap (the original behaviour, with the overlap actually applied).
+* ``sentence`` - whole sentences packed up to ``CHUNK_SIZE`` characters; the
+  trailing sentences of a chunk that fit in ``CHUNK_OVERLAP`` start the next.
+* ``heading`` - sentence packing that never lets a chunk cross into a new
+  section unless the whole section fits, so headings stay with their body.
+* ``tokens`` - sentence packing against the embedding model's token window
+  (``CHUNK_TOKEN_BUDGET`` / ``CHUNK_TOKEN_OVERLAP``).
+
+Further strategies can be added with ``register_strategy``.
+"""
+
+import importlib
+import logging
+import os
+import re
+from itertools import accumulate
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "heading").strip().lower()
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
+# all-MiniLM-L6-v2 truncates input after 256 word pieces; larger chunks are embedded partially.
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "256"))
+CHUNK_TOKEN_OVERLAP = int(os.getenv("CHUNK_TOKEN_OVERLAP", "32"))
+# Hugging Face tokenizer used by the "tokens" strategy; unset means a word-piece approximation.
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER")
+
+Span = Tuple[int, int]
+TokenCounter = Callable[[str], int]
+# strategy(text, size, overlap, count_tokens) -> spans
+Strategy = Callable[[str, int, int, TokenCounter], List[Span]]
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n\s*\n|\n(?=\s*(?:[-*•]|\d+[.)])\s)")
+_HEADING_LINE = re.compile(
+    r"^[ \t]*#{1,6}[ \t]+\S[^\n]*$"  # Markdown
+    r"|^[ \t]*\d+(?:\.\d+)*[.)]?[ \t]+[A-Z][^\n.!?]{2,80}$"  # numbered: "2.1 Cell Respiration"
+    r"|^[ \t]*[A-Z][A-Z\d \t\-:,&/()]{3,80}$"  # ALL CAPS
+    r"|(?<=\n\n)[ \t]*[A-Z][^\n.!?]{2,60}$",  # short title-like line opening a paragraph
+    re.MULTILINE,
+)
+_WORD = re.compile(r"\S+")
+_APPROX_PIECE = re.compile(r"\w{1,6}|[^\w\s]")
+
+
+def approximate_tokens(text: str) -> int:
+    """Word-piece count estimate: punctuation marks count once, long words once per six characters."""
+    return len(_APPROX_PIECE.findall(text))
+
+
+def _trimmed(text: str, start: int, end: int) -> Optional[Span]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+
+def fixed_spans(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[Span]:
+    """Fixed-width windows; consecutive windows share ``overlap`` characters."""
+    size = max(1, size)
+    step = size - min(max(0, overlap), size - 1)
+    spans: List[Span] = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        spans.append((start, end))
+        if end == len(text):
+            break
+        start += step
+    return spans
+
+
+def sentence_units(text: str, start: int = 0, end: Optional[int] = None) -> List[Span]:
+    """Sentence (and list item / paragraph) spans inside ``text[start:end]``, whitespace trimmed."""
+    end = len(text) if end is None else end
+    units: List[Span] = []
+    cursor = start
+    for match in _SENTENCE_BREAK.finditer(text, start, end):
+        unit = _trimmed(text, cursor, match.start())
+        if unit:
+            units.append(unit)
+        cursor = match.end()
+    unit = _trimmed(text, cursor, end)
+    if unit:
+        units.append(unit)
+    return units
+
+
+def _cost_function(text: str, units: Sequence[Span], count_tokens: Optional[TokenCounter]) -> Callable[[int, int], int]:
+    """``cost(i, j)`` is the size of the chunk made of ``units[i:j]``, in characters or tokens."""
+    if count_tokens is None:
+        return lambda i, j: units[j - 1][1] - units[i][0]
+    prefix = [0, *accumulate(count_tokens(text[a:b]) for a, b in units)]
+    return lambda i, j: prefix[j] - prefix[i]
+
+
+def _split_oversized(
+    text: str, units: List[Span], budget: int, count_tokens: Optional[TokenCounter]
+) -> List[Span]:
+    """Break units larger than the budget into word runs so packing can always make progress."""
+    cost = _cost_function(text, units, count_tokens)
+    result: List[Span] = []
+    for index, unit in enumerate(units):
+        if cost(index, index + 1) <= budget:
+            result.append(unit)
+            continue
+        words = [match.span() for match in _WORD.finditer(text, unit[0], unit[1])]
+        result.extend(_pack(text, words, budget, 0, count_tokens))
+    return result
+
+
+def _pack(
+    text: str, units: List[Span], budget: int, overlap: int, count_tokens: Optional[TokenCounter]
+) -> List[Span]:
+    """Greedily pack consecutive units up to ``budget``; the tail fitting in ``overlap`` is repeated."""
+    cost = _cost_function(text, units, count_tokens)
+    spans: List[Span] = []
+    first = 0
+    while first < len(units):
+        last = first + 1
+        while last < len(units) and cost(first, last + 1) <= budget:
+            last += 1
+        spans.append((units[first][0], units[last - 1][1]))
+        if last == len(units):
+            break
+        resume = last
+        while resume - 1 > first and cost(resume - 1, last) <= overlap:
+            resume -= 1
+        first = resume
+    return spans
+
+
+def _sentence_strategy(text: str, size: int, overlap: int, count_tokens: Optional[TokenCounter] = None) -> List[Span]:
+    units = _split_oversized(text, sentence_units(text), size, count_tokens)
+    return _pack(text, units, size, overlap, count_tokens)
+
+
+def section_starts(text: str) -> List[int]:
+    """Offsets of heading lines: Markdown, numbered, all-caps, or short unpunctuated lines opening a paragraph."""
+    return [match.start() for match in _HEADING_LINE.finditer(text) if match.group().strip()]
+
+
+def _heading_strategy(text: str, size: int, overlap: int, count_tokens: Optional[TokenCounter] = None) -> List[Span]:
+    bounds = [0, *(start for start in section_starts(text) if start > 0), len(text)]
+    sections = [
+        units
+        for units in (
+            _split_oversized(text, sentence_units(text, bounds[i], bounds[i + 1]), size, count_tokens)
+            for i in range(len(bounds) - 1)
+        )
+        if units
+    ]
+    spans: List[Span] = []
+    group: List[Span] = []
+    group_cost = 0
+    for units in sections:
+        section_cost = count_tokens(text[units[0][0]:units[-1][1]]) if count_tokens else units[-1][1] - units[0][0]
+        joined_cost = group_cost + section_cost if count_tokens else units[-1][1] - (group[0][0] if group else 0)
+        # A section joins the running group only if the group still fits in one chunk afterwards.
+        if group and joined_cost > size:
+            spans.extend(_pack(text, group, size, overlap, count_tokens))
+            group, group_cost = [], 0
+        group.extend(units)
+        group_cost = group_cost + section_cost if count_tokens else group[-1][1] - group[0][0]
+    if group:
+        spans.extend(_pack(text, group, size, overlap, count_tokens))
+    return spans
+
+
+def _fixed_strategy(text: str, size: int, overlap: int, count_tokens: Optional[TokenCounter] = None) -> List[Span]:
+    return fixed_spans(text, size, overlap)
+
+
+def _token_strategy(text: str, size: int, overlap: int, count_tokens: Optional[TokenCounter] = None) -> List[Span]:
+    return _sentence_strategy(text, size, overlap, count_tokens or approximate_tokens)
+
+
+_STRATEGIES: Dict[str, Strategy] = {
+    "fixed": _fixed_strategy,
+    "sentence": _sentence_strategy,
+    "heading": _heading_strategy,
+    "tokens": _token_strategy,
+}
+_TOKEN_STRATEGIES = {"tokens"}
+
+
+def register_strategy(name: str, strategy: Strategy, *, token_budget: bool = False) -> None:
+    """Make ``strategy`` selectable by name; ``token_budget`` strategies get token-based defaults."""
+    _STRATEGIES[name] = strategy
+    if token_budget:
+        _TOKEN_STRATEGIES.add(name)
+    else:
+        _TOKEN_STRATEGIES.discard(name)
+
+
+def strategy_names() -> List[str]:
+    return list(_STRATEGIES)
+
+
+def load_token_counter(name: Optional[str] = CHUNK_TOKENIZER) -> Tuple[TokenCounter, str]:
+    """Token counter for ``name`` (a Hugging Face tokenizer) and its label; approximate when unavailable."""
+    if name:
+        try:
+            tokenizer = importlib.import_module("transformers").AutoTokenizer.from_pretrained(name)
+        except Exception as exc:
+            logger.warning("Tokenizer %s unavailable (%s); approximating token counts", name, exc)
+        else:
+            return (lambda text: len(tokenizer.encode(text, add_special_tokens=False))), name
+    return approximate_tokens, "approx"
+
+
+class Chunker:
+    """A chunking strategy bound to its size/overlap settings."""
+
+    def __init__(
+        self,
+        strategy: str = CHUNK_STRATEGY,
+        size: Optional[int] = None,
+        overlap: Optional[int] = None,
+        count_tokens: Optional[TokenCounter] = None,
+        tokenizer_name: Optional[str] = None,
+    ):
+        if strategy not in _STRATEGIES:
+            raise ValueError(f"Unknown chunking strategy {strategy!r}; expected one of {', '.join(_STRATEGIES)}")
+        self.strategy = strategy
+        self.uses_tokens = strategy in _TOKEN_STRATEGIES
+        default_size, default_overlap = (
+            (CHUNK_TOKEN_BUDGET, CHUNK_TOKEN_OVERLAP) if self.uses_tokens else (CHUNK_SIZE, CHUNK_OVERLAP)
+        )
+        self.size = max(1, size if size is not None else default_size)
+        self.overlap = max(0, min(overlap if overlap is not None else default_overlap, self.size - 1))
+        if self.uses_tokens and count_tokens is None:
+            count_tokens, tokenizer_name = load_token_counter()
+        self.count_tokens = count_tokens if self.uses_tokens else None
+        self.tokenizer_name = tokenizer_name if self.uses_tokens else None
+
+    @property
+    def config_tag(self) -> str:
+        """Identifies the chunk boundaries this chunker produces (part of the embedding cache key)."""
+        parts = [self.strategy, str(self.size), str(self.overlap)]
+        if self.tokenizer_name:
+            parts.append(self.tokenizer_name)
+        return ":".join(parts)
+
+    def spans(self, text: str) -> List[Span]:
+        if not text:
+            return []
+        return _STRATEGIES[self.strategy](text, self.size, self.overlap, self.count_tokens)
+
+
+_default_chunker: Optional[Chunker] = None
+
+
+def get_chunker() -> Chunker:
+    """Process-wide chunker configured from the environment (falls back to ``heading`` on a bad name)."""
+    global _default_chunker
+    if _default_chunker is None:
+        try:
+            _default_chunker = Chunker()
+        except ValueError as exc:
+            logger.warning("%s; using the heading strategy", exc)
+            _default_chunker = Chunker("heading")
+    return _default_chunker
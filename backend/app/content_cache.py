@@ -0,0 +1,231 @@
+"""
+Content-addressed cache of ingestion work.
+
+Entries are keyed by the SHA-256 of the uploaded bytes together with the
+ingestion pipeline version, so the same handout uploaded again (forced
+re-upload, another student, or a full reindex) skips extraction, OCR and
+embedding. Each entry directory holds the extracted text, the extraction
+details and, per embedding model and chunking configuration, the chunk
+boundaries and a float32 embedding matrix.
+
+The cache is bounded by total size on disk; least recently used entries are
+evicted first. ``purge()`` (exposed to admins and ``scripts/content_cache.py``)
+empties it.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_base_dir = Path(__file__).resolve().parent.parent
+_cache_dir_setting = os.getenv("CONTENT_CACHE_DIR")
+DEFAULT_CACHE_DIR = Path(_cache_dir_setting) if _cache_dir_setting else _base_dir / "content_cache"
+CONTENT_CACHE_MAX_MB = float(os.getenv("CONTENT_CACHE_MAX_MB", "2048"))
+CONTENT_CACHE_ENABLED = os.getenv("CONTENT_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+# Eviction trims the cache to this share of its limit so it does not run on every store.
+EVICT_TARGET_RATIO = 0.9
+# Bump whenever extraction output changes so stale entries stop matching.
+INGEST_PIPELINE_VERSION = "1"
+
+TEXT_FILE = "text.txt"
+DETAILS_FILE = "details.json"
+ENTRY_STAMP_FILE = "entry.json"
+
+
+def _dir_size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class ContentCache:
+    def __init__(
+        self,
+        root: Path = DEFAULT_CACHE_DIR,
+        max_bytes: Optional[int] = None,
+        pipeline_version: str = INGEST_PIPELINE_VERSION,
+    ):
+        self.root = Path(root)
+        self.max_bytes = int(max_bytes if max_bytes is not None else CONTENT_CACHE_MAX_MB * 1024 * 1024)
+        self.pipeline_version = pipeline_version
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    # --- Keys & paths ---
+
+    def entry_key(self, file_hash: str) -> str:
+        return hashlib.sha256(f"{file_hash}:{self.pipeline_version}".encode()).hexdigest()
+
+    def _entry_dir(self, file_hash: str) -> Path:
+        key = self.entry_key(file_hash)
+        return self.root / key[:2] / key
+
+    @staticmethod
+    def embedding_tag(model: str, chunk_config: str) -> str:
+        return hashlib.sha256(f"{model}\0{chunk_config}".encode()).hexdigest()[:16]
+
+    def _touch(self, entry: Path) -> None:
+        try:
+            os.utime(entry / ENTRY_STAMP_FILE)
+        except OSError:
+            pass
+
+    def _record(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+    # --- Extraction ---
+
+    def load_extraction(self, file_hash: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        entry = self._entry_dir(file_hash)
+        try:
+            text = (entry / TEXT_FILE).read_text(encoding="utf-8")
+            details = json.loads((entry / DETAILS_FILE).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._record(False)
+            return None
+        self._touch(entry)
+        self._record(True)
+        return text, details
+
+    def store_extraction(self, file_hash: str, text: str, details: Dict[str, Any]) -> None:
+        entry = self._entry_dir(file_hash)
+        entry.mkdir(parents=True, exist_ok=True)
+        before = _dir_size(entry)
+        _write_atomic(entry / TEXT_FILE, text.encode("utf-8"))
+        _write_atomic(entry / DETAILS_FILE, json.dumps(details, ensure_ascii=False).encode("utf-8"))
+        stamp = {"file_hash": file_hash, "pipeline_version": self.pipeline_version, "created_at": time.time()}
+        _write_atomic(entry / ENTRY_STAMP_FILE, json.dumps(stamp).encode("utf-8"))
+        self._grow(_dir_size(entry) - before)
+
+    # --- Chunks & embeddings ---
+
+    def load_embeddings(self, file_hash: str, tag: str) -> Optional[Tuple[List[Tuple[int, int]], np.ndarray]]:
+        entry = self._entry_dir(file_hash)
+        try:
+            spans = [tuple(span) for span in json.loads((entry / f"chunks-{tag}.json").read_text(encoding="utf-8"))]
+            vectors = np.load(entry / f"embeddings-{tag}.npy", allow_pickle=False)
+        except (OSError, ValueError):
+            self._record(False)
+            return None
+        if len(vectors) != len(spans):
+            self._record(False)
+            return None
+        self._touch(entry)
+        self._record(True)
+        return spans, vectors
+
+    def store_embeddings(self, file_hash: str, tag: str, spans: List[Tuple[int, int]], vectors: np.ndarray) -> None:
+        entry = self._entry_dir(file_hash)
+        if not (entry / ENTRY_STAMP_FILE).exists():
+            # Embeddings are only meaningful next to the text they were computed from.
+            return
+        before = _dir_size(entry)
+        _write_atomic(entry / f"chunks-{tag}.json", json.dumps([list(span) for span in spans]).encode("utf-8"))
+        tmp_path = entry / f".embeddings-{tag}.{uuid.uuid4().hex}.npy"
+        np.save(tmp_path, np.asarray(vectors, dtype="float32"), allow_pickle=False)
+        os.replace(tmp_path, entry / f"embeddings-{tag}.npy")
+        self._grow(_dir_size(entry) - before)
+
+    # --- Size management ---
+
+    def _entries(self) -> List[Path]:
+        if not self.root.exists():
+            return []
+        return [entry for bucket in self.root.iterdir() if bucket.is_dir() for entry in bucket.iterdir() if entry.is_dir()]
+
+    def size_bytes(self) -> int:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(_dir_size(entry) for entry in self._entries())
+            return self._size
+
+    def _grow(self, delta: int) -> None:
+        with self._lock:
+            if self._size is not None:
+                self._size += delta
+        # An unknown size is computed from disk, which already includes the new files.
+        if self.size_bytes() > self.max_bytes:
+            self.evict()
+
+    def evict(self, target_bytes: Optional[int] = None) -> int:
+        """Drop least recently used entries until the cache fits ``target_bytes``."""
+        target = int(self.max_bytes * EVICT_TARGET_RATIO) if target_bytes is None else target_bytes
+        ranked = []
+        for entry in self._entries():
+            stamp = entry / ENTRY_STAMP_FILE
+            used_at = stamp.stat().st_mtime if stamp.exists() else 0.0
+            ranked.append((used_at, entry, _dir_size(entry)))
+        ranked.sort(key=lambda item: item[0])
+
+        total = sum(size for _, _, size in ranked)
+        removed = 0
+        for _, entry, size in ranked:
+            if total <= target:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+        with self._lock:
+            self._size = total
+            self._evictions += removed
+        if removed:
+            logger.info("Content cache evicted %d entr%s", removed, "y" if removed == 1 else "ies")
+        return removed
+
+    def purge(self) -> Dict[str, int]:
+        """Remove every cached entry."""
+        entries = self._entries()
+        freed = self.size_bytes()
+        for entry in entries:
+            shutil.rmtree(entry, ignore_errors=True)
+        with self._lock:
+            self._size = 0
+        return {"entries_removed": len(entries), "bytes_freed": freed}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            counters = {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+        return {
+            "path": str(self.root),
+            "pipeline_version": self.pipeline_version,
+            "entries": len(self._entries()),
+            "size_bytes": self.size_bytes(),
+            "max_bytes": self.max_bytes,
+            **counters,
+        }
+
+
+_content_cache: Optional[ContentCache] = ContentCache() if CONTENT_CACHE_ENABLED else None
+
+
+def get_content_cache() -> Optional[ContentCache]:
+    """Process-wide cache instance, or None when ``CONTENT_CACHE_ENABLED`` is off."""
+    return _content_cache
@@ -0,0 +1,225 @@
+"""
+Registry of local (CPU) embedding backends.
+
+``EMBED_BACKEND`` picks the implementation used when Ollama is not
+configured, or as its fallback:
+
+* ``torch`` - the sentence-transformers model in fp32 PyTorch (reference).
+* ``onnx`` - the same model exported to ONNX, run with ONNX Runtime.
+* ``onnx-int8`` - the ONNX model with int8 dynamically quantized weights.
+
+Backends are created without loading anything; the model (and torch or
+onnxruntime) is imported on the first ``encode`` call. Each exposes
+``EMBED_BATCH_SIZE`` and ``EMBED_THREADS``. ``scripts/benchmark_embeddings.py``
+reports chunks/sec and cosine agreement with the torch reference so the
+fastest backend that meets the quality bar can be chosen.
+"""
+
+import importlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_TRANSFORMER_MODEL = os.getenv("EMBEDDER_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch").strip().lower()
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0"))  # 0 = the runtime's default
+# Files inside the model repository (or local model directory) used by the ONNX backends.
+EMBED_ONNX_FILE = os.getenv("EMBED_ONNX_FILE", "onnx/model.onnx")
+EMBED_ONNX_INT8_FILE = os.getenv("EMBED_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+
+
+class EmbeddingBackend:
+    """Encodes texts into L2-normalised float32 vectors with one local model."""
+
+    name = "base"
+
+    def __init__(
+        self,
+        model_name: str = SENTENCE_TRANSFORMER_MODEL,
+        batch_size: int = EMBED_BATCH_SIZE,
+        threads: int = EMBED_THREADS,
+    ):
+        self.model_name = model_name
+        self.batch_size = max(1, batch_size)
+        self.threads = max(0, threads)
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @property
+    def tag(self) -> str:
+        """Identifies the vectors this backend produces (cache keys, chunk-store partitions)."""
+        return f"st-{self.name}:{self.model_name}"
+
+    def _load(self) -> None:
+        raise NotImplementedError
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+    def load(self) -> "EmbeddingBackend":
+        with self._lock:
+            if not self._loaded:
+                logger.info("Loading %s embedding backend for %s", self.name, self.model_name)
+                self._load()
+                self._loaded = True
+        return self
+
+    def encode(self, texts: Sequence[str]) -> np.ndarray:
+        self.load()
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype="float32")
+        return np.ascontiguousarray(self._encode(texts), dtype="float32")
+
+
+class TorchBackend(EmbeddingBackend):
+    name = "torch"
+
+    @property
+    def tag(self) -> str:
+        # Unchanged from before the registry so existing cached vectors stay valid.
+        return f"st:{self.model_name}"
+
+    def _load(self) -> None:
+        torch = importlib.import_module("torch")
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        sentence_transformers = importlib.import_module("sentence_transformers")
+        self._model = sentence_transformers.SentenceTransformer(self.model_name, device="cpu")
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True)
+
+
+def _model_file(model_name: str, filename: str) -> Path:
+    """Path of ``filename`` in a local model directory or the (cached) Hugging Face repository."""
+    local = Path(model_name)
+    if local.is_dir():
+        path = local / filename
+        if not path.exists():
+            raise FileNotFoundError(path)
+        return path
+    hub = importlib.import_module("huggingface_hub")
+    return Path(hub.hf_hub_download(model_name, filename))
+
+
+def _model_config(model_name: str, filename: str) -> Dict[str, Any]:
+    try:
+        return json.loads(_model_file(model_name, filename).read_text())
+    except Exception:
+        return {}
+
+
+class OnnxBackend(EmbeddingBackend):
+    """ONNX Runtime inference with the model's own tokenizer and pooling settings."""
+
+    name = "onnx"
+
+    def _onnx_path(self) -> Path:
+        return _model_file(self.model_name, EMBED_ONNX_FILE)
+
+    def _load(self) -> None:
+        ort = importlib.import_module("onnxruntime")
+        options = ort.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(str(self._onnx_path()), options, providers=["CPUExecutionProvider"])
+        self._input_names = {node.name for node in self._session.get_inputs()}
+
+        transformers = importlib.import_module("transformers")
+        self._tokenizer = transformers.AutoTokenizer.from_pretrained(self.model_name)
+        max_length = _model_config(self.model_name, "sentence_bert_config.json").get("max_seq_length")
+        self._max_length = int(max_length or min(getattr(self._tokenizer, "model_max_length", 512), 512))
+        pooling = _model_config(self.model_name, "1_Pooling/config.json")
+        self._cls_pooling = bool(pooling.get("pooling_mode_cls_token")) and not pooling.get("pooling_mode_mean_tokens")
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        outputs = []
+        for start in range(0, len(texts), self.batch_size):
+            encoded = self._tokenizer(
+                texts[start:start + self.batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self._max_length,
+                return_tensors="np",
+            )
+            feeds = {name: np.asarray(value, dtype="int64") for name, value in encoded.items() if name in self._input_names}
+            hidden = self._session.run(None, feeds)[0]
+            if self._cls_pooling:
+                pooled = hidden[:, 0]
+            else:
+                mask = feeds["attention_mask"][..., None].astype("float32")
+                pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            outputs.append(pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None))
+        return np.vstack(outputs)
+
+
+class QuantizedOnnxBackend(OnnxBackend):
+    """ONNX backend on int8 weights; quantizes the fp32 export locally when the repo has no int8 file."""
+
+    name = "onnx-int8"
+
+    def _onnx_path(self) -> Path:
+        try:
+            return _model_file(self.model_name, EMBED_ONNX_INT8_FILE)
+        except Exception:
+            pass
+        source = _model_file(self.model_name, EMBED_ONNX_FILE)
+        target = source.with_name(f"{source.stem}_qint8_local.onnx")
+        if not target.exists():
+            logger.info("Quantizing %s to int8 at %s", source, target)
+            quantization = importlib.import_module("onnxruntime.quantization")
+            tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+            quantization.quantize_dynamic(str(source), str(tmp_path), weight_type=quantization.QuantType.QInt8)
+            os.replace(tmp_path, target)
+        return target
+
+
+_BACKENDS: Dict[str, Callable[..., EmbeddingBackend]] = {
+    TorchBackend.name: TorchBackend,
+    OnnxBackend.name: OnnxBackend,
+    QuantizedOnnxBackend.name: QuantizedOnnxBackend,
+}
+
+
+def register_backend(name: str, factory: Callable[..., EmbeddingBackend]) -> None:
+    """Make ``factory(model_name=..., batch_size=..., threads=...)`` selectable as ``EMBED_BACKEND=name``."""
+    _BACKENDS[name] = factory
+
+
+def backend_names() -> List[str]:
+    return list(_BACKENDS)
+
+
+def create_backend(name: str, **options: Any) -> EmbeddingBackend:
+    try:
+        factory = _BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown embedding backend {name!r}; expected one of {', '.join(_BACKENDS)}") from None
+    return factory(**options)
+
+
+_default_backend: Optional[EmbeddingBackend] = None
+_default_lock = threading.Lock()
+
+
+def get_embedding_backend() -> EmbeddingBackend:
+    """Process-wide backend selected by ``EMBED_BACKEND`` (torch when the name is unknown); not loaded yet."""
+    global _default_backend
+    with _default_lock:
+        if _default_backend is None:
+            try:
+                _default_backend = create_backend(EMBED_BACKEND)
+            except ValueError as exc:
+                logger.warning("%s; using torch", exc)
+                _default_backend = create_backend(TorchBackend.name)
+        return _default_backend
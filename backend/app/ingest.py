@@ -1,21 +1,33 @@
-import importlib
+import bisect
+import hashlib
 import io
+import mmap
 import os
+import queue
 import re
 import logging
+import sqlite3
+import threading
+import time
 import zipfile
-from collections import Counter
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
 from xml.etree import ElementTree as ET
 from datetime import datetime
 from threading import Lock
-from typing import List, Dict, Optional, Any
+from typing import BinaryIO, Callable, Iterable, Iterator, List, Dict, Optional, Any, Sequence, Set, Tuple, Union
 # import PyPDF2 lazily inside PDF extraction to allow running tests without the package installed
 from .vector_store import ChromaVectorStore
 from .rag import add_to_index
 from .analytics import derive_chunk_topics
+from .pdf_extraction import extract_pdf_pages
+from .content_cache import ContentCache, get_content_cache
+from .chunk_embeddings import chunk_hash, get_chunk_embedding_store
+from .chunking import Chunker, Span, get_chunker
+from .tokenization import tokenize
+from .ollama_embeddings import get_ollama_embedder
+from .embedding_backends import get_embedding_backend
 import numpy as np
-import requests
-from sentence_transformers import SentenceTransformer
 
 # Lightweight English stop-word list used when extracting keywords from ingested content.
 STOP_WORDS: set[str] = {
@@ -194,42 +206,79 @@ STOP_WORDS: set[str] = {
     "yourselves",
 }
 
-CHUNK_SIZE = 1000
-CHUNK_OVERLAP = 200
 logger = logging.getLogger(__name__)
 
-OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL")
-SENTENCE_TRANSFORMER_MODEL = os.getenv("EMBEDDER_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
 
-_embedder: SentenceTransformer | None = None
-_embedder_lock = Lock()
-
-
-def extract_text_from_pdf_bytes(file_bytes: bytes) -> str:
-    try:
-        import PyPDF2
-    except Exception as e:
-        raise RuntimeError("PyPDF2 is required for PDF extraction. Install it with 'pip install PyPDF2'.") from e
-    reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-    texts = []
-    for page in reader.pages:
-        try:
-            texts.append(page.extract_text() or "")
-        except Exception:
-            continue
-    result = "\n\n".join(texts)
-    
-    # If no usable text was extracted, attempt OCR as a secondary path.
-    if not result.strip() or result.count("Scanned with") > 5:
-        ocr_text = _ocr_pdf_bytes(file_bytes)
-        if ocr_text.strip():
-            return ocr_text
+QUERY_EMBED_CACHE_SIZE = int(os.getenv("QUERY_EMBED_CACHE_SIZE", "2048"))
+QUERY_EMBED_CACHE_TTL = float(os.getenv("QUERY_EMBED_CACHE_TTL", "900"))
+QUERY_EMBED_BATCH_WINDOW_MS = float(os.getenv("QUERY_EMBED_BATCH_WINDOW_MS", "5"))
+QUERY_EMBED_MAX_BATCH = int(os.getenv("QUERY_EMBED_MAX_BATCH", "32"))
+# Chunks embedded per call during ingestion; also the granularity of "embedding i/n" progress.
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+
+# Called as progress(stage, current, total) while a document moves through the pipeline.
+ProgressCallback = Callable[[str, int, int], None]
+# Extractors accept in-memory bytes or a read-only memory map of a spooled upload.
+FileData = Union[bytes, mmap.mmap]
+
+
+class _MappedStream(io.RawIOBase):
+    """Seekable read-only stream over a memory map; each read copies only the requested range."""
+
+    def __init__(self, mapped: mmap.mmap):
+        self._mapped = mapped
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        with memoryview(buffer) as view:
+            end = min(self._pos + len(view), len(self._mapped))
+            count = max(0, end - self._pos)
+            view[:count] = self._mapped[self._pos:end]
+        self._pos += count
+        return count
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._mapped)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+def _byte_stream(file_bytes: FileData) -> BinaryIO:
+    """Seekable stream over file data; memory maps are read in place rather than copied whole."""
+    if isinstance(file_bytes, mmap.mmap):
+        return io.BufferedReader(_MappedStream(file_bytes))
+    return io.BytesIO(file_bytes)
+
+
+def extract_text_from_pdf_bytes(
+    file_bytes: FileData,
+    progress: Optional[ProgressCallback] = None,
+    file_path: Optional[str] = None,
+) -> str:
+    # Native text per page, with OCR only for pages that have no text layer. A spooled upload
+    # (``file_path``, holding ``file_bytes``) is opened in place instead of being copied again.
+    pages = extract_pdf_pages(file_path or _byte_stream(file_bytes), progress=progress)
+    result = "\n\n".join(pages)
+
+    if not result.strip():
         raise ValueError(
             "The PDF appears to be scanned images. Tried OCR but no text was recovered. "
             "Install Tesseract and optional dependencies (pypdfium2, pillow, pytesseract) or upload an OCR-converted PDF."
         )
-    
+
     return result
 
 
@@ -265,7 +314,12 @@ def _extract_text_from_pptx_zip(zf: zipfile.ZipFile) -> str:
     return "\n".join(collected)
 
 
-def extract_text_auto(file_bytes: bytes, source_name: str | None = None) -> tuple[str, Dict[str, Any]]:
+def extract_text_auto(
+    file_bytes: FileData,
+    source_name: str | None = None,
+    progress: Optional[ProgressCallback] = None,
+    file_path: Optional[str] = None,
+) -> tuple[str, Dict[str, Any]]:
     """Best-effort text extraction with lightweight structural hints."""
 
     details: Dict[str, Any] = {
@@ -277,7 +331,7 @@ def extract_text_auto(file_bytes: bytes, source_name: str | None = None) -> tupl
     # If bytes look like a PDF, use PDF extractor first.
     if file_bytes[:4] == b"%PDF":
         details["fileType"] = "pdf"
-        return extract_text_from_pdf_bytes(file_bytes), details
+        return extract_text_from_pdf_bytes(file_bytes, progress=progress, file_path=file_path), details
 
     lower_name = (source_name or "").lower()
 
@@ -291,8 +345,8 @@ def extract_text_auto(file_bytes: bytes, source_name: str | None = None) -> tupl
 
     # Handle docx/pptx (OpenXML zip formats)
     try:
-        if zipfile.is_zipfile(io.BytesIO(file_bytes)):
-            with zipfile.ZipFile(io.BytesIO(file_bytes)) as zf:
+        if zipfile.is_zipfile(_byte_stream(file_bytes)):
+            with zipfile.ZipFile(_byte_stream(file_bytes)) as zf:
                 members = zf.namelist()
                 if any(name.startswith('word/') for name in members) or lower_name.endswith('.docx'):
                     docx_text = _extract_text_from_docx_zip(zf)
@@ -311,7 +365,8 @@ def extract_text_auto(file_bytes: bytes, source_name: str | None = None) -> tupl
 
     # Default: attempt UTF-8 decode
     try:
-        txt = file_bytes.decode("utf-8", errors="ignore")
+        with memoryview(file_bytes) as view:
+            txt = str(view, "utf-8", errors="ignore")
         txt = txt.lstrip("\ufeff")
         txt = txt.replace("\r\n", "\n").replace("\r", "\n")
         if txt.strip():
@@ -329,16 +384,13 @@ def extract_text_auto(file_bytes: bytes, source_name: str | None = None) -> tupl
     return "", details
 
 
-def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP):
-    tokens = []
-    start = 0
-    L = len(text)
-    while start < L:
-        end = min(start + chunk_size, L)
-        chunk = text[start:end]
-        tokens.append(chunk)
-        start = max(end - overlap, end)
-    return tokens
+def chunk_spans(text: str, chunker: Optional[Chunker] = None) -> List[Span]:
+    """Character ``(start, end)`` offsets of the chunks of ``text`` (see app.chunking)."""
+    return (chunker or get_chunker()).spans(text)
+
+
+def chunk_text(text: str, chunker: Optional[Chunker] = None) -> List[str]:
+    return [text[start:end] for start, end in chunk_spans(text, chunker)]
 
 
 def _hash_embedding(text: str, dim: int = 384):
@@ -356,101 +408,207 @@ def _hash_embedding(text: str, dim: int = 384):
     return vec.tolist()
 
 
-def _get_sentence_transformer() -> SentenceTransformer:
-    global _embedder
-    with _embedder_lock:
-        if _embedder is None:
-            logger.info("Loading sentence-transformer model: %s", SENTENCE_TRANSFORMER_MODEL)
-            _embedder = SentenceTransformer(SENTENCE_TRANSFORMER_MODEL)
-    return _embedder
+def _primary_embed_tag() -> str:
+    return f"ollama:{OLLAMA_EMBED_MODEL}" if OLLAMA_EMBED_MODEL else get_embedding_backend().tag
 
 
-def _embed_with_ollama(texts: List[str]) -> List[List[float]]:
-    embeddings: List[List[float]] = []
-    url = f"{OLLAMA_BASE_URL.rstrip('/')}/api/embeddings"
-    for text in texts:
-        response = requests.post(
-            url,
-            json={"model": OLLAMA_EMBED_MODEL, "prompt": text},
-            timeout=60,
-        )
-        response.raise_for_status()
-        payload = response.json()
-        embeddings.append(payload.get("embedding", []))
-    return embeddings
+def _embed_locally(texts: List[str]) -> Tuple[List[List[float]], str]:
+    backend = get_embedding_backend()
+    try:
+        return backend.encode(texts).tolist(), backend.tag
+    except Exception as exc:
+        logger.warning("Local %s embedding failed; using hash fallback. Error: %s", backend.name, exc)
+    return [_hash_embedding(text) for text in texts], "hash"
+
 
+def _embed_texts_tagged(texts: List[str]) -> Tuple[List[List[float]], str]:
+    """Embed texts and report which backend produced the vectors (``ollama:…``, a local backend tag or ``hash``)."""
+    if not OLLAMA_EMBED_MODEL:
+        return _embed_locally(texts)
+    fallback_tags: List[str] = []
 
-def _embed_with_sentence_transformer(texts: List[str]) -> List[List[float]]:
-    model = _get_sentence_transformer()
-    vectors = model.encode(texts, normalize_embeddings=True)
-    return vectors.tolist()
+    def fallback(batch: List[str]) -> List[List[float]]:
+        vectors, tag = _embed_locally(batch)
+        fallback_tags.append(tag)
+        return vectors
+
+    # Ollama batches that fail after retries are embedded locally one batch at a time.
+    vectors = get_ollama_embedder(OLLAMA_EMBED_MODEL).embed(texts, fallback=fallback)
+    if not fallback_tags:
+        return vectors, f"ollama:{OLLAMA_EMBED_MODEL}"
+    # Partly fallback vectors must not be cached under the Ollama model's name.
+    return vectors, "hash" if "hash" in fallback_tags else fallback_tags[0]
 
 
 def embed_texts(texts: List[str]) -> List[List[float]]:
-    """Embed text snippets using Ollama embeddings or a local sentence-transformer."""
+    """Embed text snippets using Ollama embeddings or the local embedding backend."""
     if not texts:
         return []
-    if OLLAMA_EMBED_MODEL:
+    return _embed_texts_tagged(texts)[0]
+
+
+def _active_embed_model() -> str:
+    return OLLAMA_EMBED_MODEL or get_embedding_backend().tag
+
+
+def _normalize_query(text: str) -> str:
+    return " ".join((text or "").split())
+
+
+class QueryEmbeddingService:
+    """Embeds short queries through a shared micro-batching queue with an LRU/TTL cache in front.
+
+    Concurrent single-query callers that arrive within ``batch_window_ms`` of each other are merged
+    into one ``embed_fn`` call, so the model runs one forward pass (or Ollama one round trip) per batch.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+        model_name: Callable[[], str] = _active_embed_model,
+        cache_size: int = QUERY_EMBED_CACHE_SIZE,
+        ttl_seconds: float = QUERY_EMBED_CACHE_TTL,
+        batch_window_ms: float = QUERY_EMBED_BATCH_WINDOW_MS,
+        max_batch: int = QUERY_EMBED_MAX_BATCH,
+    ) -> None:
+        self._embed_fn = embed_fn
+        self._model_name = model_name
+        self.cache_size = max(0, cache_size)
+        self.ttl_seconds = ttl_seconds
+        self.batch_window = max(0.0, batch_window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._cache: "OrderedDict[str, Tuple[float, List[float]]]" = OrderedDict()
+        self._cache_lock = Lock()
+        self._inflight: Dict[str, Future] = {}
+        self._queue: "queue.Queue[Tuple[str, str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = Lock()
+        self._hits = 0
+        self._misses = 0
+        self._batches = 0
+        self._batched_queries = 0
+
+    def _cache_key(self, normalized: str) -> str:
+        # Case-folded so "Photosynthesis" and "photosynthesis " share one cache entry.
+        return hashlib.sha256(f"{self._model_name()}\0{normalized.casefold()}".encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str) -> Optional[List[float]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires_at, vector = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return vector
+
+    def _cache_put(self, key: str, vector: List[float]) -> None:
+        if not self.cache_size:
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.ttl_seconds, vector)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def embed(self, text: str) -> List[float]:
+        """Return the embedding of one query, from cache or from the next micro-batch."""
+        normalized = _normalize_query(text)
+        key = self._cache_key(normalized)
+        with self._cache_lock:
+            cached = self._cache_get(key)
+            if cached is not None:
+                self._hits += 1
+                return cached
+            self._misses += 1
+            # Identical queries already waiting on a batch share its result.
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                self._queue.put((key, normalized, future))
+                self._ensure_worker()
+        return future.result()
+
+    def _ensure_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="query-embedder", daemon=True)
+                self._worker.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch: List[Tuple[str, str, Future]]) -> None:
+        vectors: Optional[List[List[float]]] = None
+        error: Optional[BaseException] = None
         try:
-            return _embed_with_ollama(texts)
-        except requests.RequestException as exc:
-            logger.warning("Ollama embedding failed; falling back to sentence-transformer. Error: %s", exc)
-    try:
-        return _embed_with_sentence_transformer(texts)
-    except Exception as exc:
-        logger.warning("Sentence-transformer embedding failed; using hash fallback. Error: %s", exc)
-    return [_hash_embedding(text) for text in texts]
+            vectors = (self._embed_fn or embed_texts)([normalized for _, normalized, _ in batch])
+        except Exception as exc:
+            error = exc
+        with self._cache_lock:
+            self._batches += 1
+            self._batched_queries += len(batch)
+            for key, _, _ in batch:
+                self._inflight.pop(key, None)
+        for row, (key, _, future) in enumerate(batch):
+            if vectors is None:
+                future.set_exception(error)  # type: ignore[arg-type]
+                continue
+            self._cache_put(key, vectors[row])
+            future.set_result(vectors[row])
+
+    def clear(self) -> None:
+        with self._cache_lock:
+            self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cache_lock:
+            lookups = self._hits + self._misses
+            return {
+                "model": self._model_name(),
+                "cache_size": len(self._cache),
+                "cache_capacity": self.cache_size,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "batches": self._batches,
+                "avg_batch_size": round(self._batched_queries / self._batches, 2) if self._batches else 0.0,
+            }
 
 
-def _ocr_pdf_bytes(file_bytes: bytes) -> str:
-    """Convert PDF pages to text using OCR. Requires optional OCR dependencies."""
-    try:
-        pypdfium2 = importlib.import_module("pypdfium2")
-    except ImportError as exc:
-        raise RuntimeError(
-            "pypdfium2 is required for OCR fallback. Install it with 'pip install pypdfium2'."
-        ) from exc
-    try:
-        pytesseract = importlib.import_module("pytesseract")
-    except ImportError as exc:
-        raise RuntimeError(
-            "pytesseract is required for OCR fallback. Install it with 'pip install pytesseract'."
-        ) from exc
-    try:
-        importlib.import_module("PIL.Image")
-    except ImportError as exc:
-        raise RuntimeError(
-            "pillow is required for OCR fallback image handling. Install it with 'pip install pillow'."
-        ) from exc
-
-    pdf_stream = io.BytesIO(file_bytes)
-    document = pypdfium2.PdfDocument(pdf_stream)
-    collected: List[str] = []
-    try:
-        for index in range(len(document)):
-            page = document[index]
-            render = page.render(scale=2.0)
-            try:
-                pil_image = render.to_pil()
-            finally:
-                render.close()
-            text = pytesseract.image_to_string(pil_image)
-            if text.strip():
-                collected.append(text)
-            page.close()
-    finally:
-        document.close()
-    return "\n\n".join(collected)
-
-
-def _extract_spreadsheet_text(file_bytes: bytes, lower_name: str) -> tuple[str, List[Dict[str, Any]]]:
+_query_embedder = QueryEmbeddingService()
+
+
+def embed_query(text: str) -> List[float]:
+    """Embed a single retrieval query through the shared batching/caching service."""
+    return _query_embedder.embed(text)
+
+
+def query_embedding_stats() -> Dict[str, Any]:
+    return _query_embedder.stats()
+
+
+def _extract_spreadsheet_text(file_bytes: FileData, lower_name: str) -> tuple[str, List[Dict[str, Any]]]:
     tables: List[Dict[str, Any]] = []
     try:
         import pandas as pd  # type: ignore
     except ImportError:
         return "", tables
 
-    buffer = io.BytesIO(file_bytes)
+    buffer = _byte_stream(file_bytes)
     try:
         if lower_name.endswith('.csv'):
             frames = {'Sheet1': pd.read_csv(buffer)}
@@ -480,13 +638,13 @@ def _extract_spreadsheet_text(file_bytes: bytes, lower_name: str) -> tuple[str,
     return "\n\n".join(table_texts), tables
 
 
-def _extract_with_tika(file_bytes: bytes) -> str:
+def _extract_with_tika(file_bytes: FileData) -> str:
     try:
         from tika import parser  # type: ignore
     except Exception:
         return ""
     try:
-        parsed = parser.from_buffer(file_bytes)
+        parsed = parser.from_buffer(bytes(file_bytes))
     except Exception:
         return ""
     content = parsed.get("content") or ""
@@ -535,10 +693,10 @@ def _extract_examples(paragraphs: List[str]) -> List[str]:
     return examples[:20]
 
 
-def _extract_keywords(text: str, limit: int = 20) -> List[str]:
-    tokens = re.findall(r"[A-Za-z][\w-]+", text.lower())
-    filtered = [token for token in tokens if len(token) >= 4 and token not in STOP_WORDS]
-    counts = Counter(filtered)
+def _extract_keywords(text: str, limit: int = 20, counts: Optional[Counter] = None) -> List[str]:
+    if counts is None:
+        tokens = re.findall(r"[A-Za-z][\w-]+", text.lower())
+        counts = Counter(token for token in tokens if len(token) >= 4 and token not in STOP_WORDS)
     ranked = [term for term, _ in counts.most_common(limit * 2)]
     unique: List[str] = []
     for term in ranked:
@@ -555,6 +713,7 @@ def extract_structured_content(
     tables: Optional[List[Dict[str, Any]]] = None,
     source_name: Optional[str] = None,
     file_type: Optional[str] = None,
+    term_counts: Optional[Counter] = None,
 ) -> Dict[str, Any]:
     normalized = (text or "").replace("\r\n", "\n").replace("\r", "\n")
     lines = [line.strip() for line in normalized.splitlines()]
@@ -562,7 +721,7 @@ def extract_structured_content(
     headings = _extract_headings(lines)
     definitions = _extract_definitions(paragraphs)
     examples = _extract_examples(paragraphs)
-    keywords = _extract_keywords(normalized)
+    keywords = _extract_keywords(normalized, counts=term_counts)
 
     tables = tables or []
 
@@ -582,19 +741,108 @@ def extract_structured_content(
     }
 
 
-def _derive_chunk_keywords(text: str, limit: int = 6) -> List[str]:
-    tokens = re.findall(r"[A-Za-z][\w-]+", text.lower())
-    filtered = [token for token in tokens if len(token) >= 4 and token not in STOP_WORDS]
-    counts = Counter(filtered)
+def _derive_chunk_keywords(text: str, limit: int = 6, counts: Optional[Counter] = None) -> List[str]:
+    if counts is None:
+        tokens = re.findall(r"[A-Za-z][\w-]+", text.lower())
+        counts = Counter(token for token in tokens if len(token) >= 4 and token not in STOP_WORDS)
     ranked = [term for term, _ in counts.most_common(limit)]
     return ranked[:limit]
 
 
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    """Regex alternation shaped like a trie of ``phrases``, so shared prefixes are matched only once."""
+    trie: Dict[str, Any] = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class _PhraseMatcher:
+    """Reports which of a fixed set of phrases occur in a text, using one compiled regex scan."""
+
+    def __init__(self, phrases: Iterable[str]):
+        unique = list(dict.fromkeys(phrases))
+        self.matches_empty = "" in unique
+        self.phrases = [phrase for phrase in unique if phrase]
+        # A match is the longest phrase starting at that position; shorter phrases that are
+        # prefixes of it occur there too.
+        self._prefixes = {
+            phrase: [other for other in self.phrases if other != phrase and phrase.startswith(other)]
+            for phrase in self.phrases
+        }
+        self._pattern = re.compile(_trie_pattern(self.phrases)) if self.phrases else None
+
+    def _occurrences(self, text: str) -> Iterator[Tuple[int, str]]:
+        if self._pattern is None:
+            return
+        search = self._pattern.search
+        match = search(text)
+        while match is not None:
+            yield match.start(), match.group()
+            # Resume just past the match start so phrases overlapping this one are still seen.
+            match = search(text, match.start() + 1)
+
+    def find(self, text: str) -> Set[str]:
+        found: Set[str] = {""} if self.matches_empty else set()
+        for _, phrase in self._occurrences(text):
+            if phrase not in found:
+                found.add(phrase)
+                found.update(self._prefixes[phrase])
+        return found
+
+    def find_in_spans(self, text: str, spans: Sequence[Span]) -> List[Set[str]]:
+        """``find`` for each ``text[start:end]``, from a single scan of ``text``."""
+        occurrences = list(self._occurrences(text))
+        starts = [start for start, _ in occurrences]
+        results = []
+        for span_start, span_end in spans:
+            found: Set[str] = {""} if self.matches_empty else set()
+            position = bisect.bisect_left(starts, span_start)
+            while position < len(occurrences) and starts[position] < span_end:
+                start, phrase = occurrences[position]
+                room = span_end - start
+                # A phrase running past the chunk end may still have prefixes inside it.
+                for candidate in (phrase, *self._prefixes[phrase]):
+                    if len(candidate) <= room:
+                        found.add(candidate)
+                position += 1
+            results.append(found)
+        return results
+
+
+def _first_rank(values: Sequence[str]) -> Dict[str, int]:
+    """Lower-cased value -> index of its first occurrence, preserving "first in list order" lookups."""
+    ranks: Dict[str, int] = {}
+    for index, value in enumerate(values):
+        ranks.setdefault(value.lower(), index)
+    return ranks
+
+
 def _annotate_chunks(
     chunks: List[str],
     structured: Dict[str, Any],
     chunk_topics: List[Dict[str, Any]],
+    term_counts: Optional[Sequence[Counter]] = None,
+    text: Optional[str] = None,
+    spans: Optional[Sequence[Span]] = None,
 ) -> List[Dict[str, Any]]:
+    """
+    Tag each chunk with the first heading, definition and example it contains, plus keywords.
+
+    Pass the document ``text`` and chunk ``spans`` to locate phrases with one scan of the
+    document instead of one per chunk.
+    """
     annotations: List[Dict[str, Any]] = []
     headings = structured.get("headings", [])
     examples = structured.get("examples", [])
@@ -606,13 +854,31 @@ def _annotate_chunks(
         if isinstance(entry, dict)
     }
 
+    # Headings, definition terms and examples are compiled into one matcher per document.
+    heading_ranks = _first_rank(headings)
+    definition_ranks = _first_rank([definition.get("term", "") for definition in definitions])
+    example_ranks = _first_rank(examples)
+    matcher = _PhraseMatcher([*heading_ranks, *definition_ranks, *example_ranks])
+    lowered = text.lower() if text is not None and spans is not None else None
+    if lowered is not None and len(lowered) == len(text):
+        found_per_chunk = matcher.find_in_spans(lowered, spans)
+    else:
+        # Lower-casing changed offsets (rare non-ASCII text) or no offsets were given.
+        found_per_chunk = [matcher.find(chunk.lower()) for chunk in chunks]
+
+    def first_found(ranks: Dict[str, int], found: Set[str]) -> Optional[int]:
+        return min((ranks[phrase] for phrase in found if phrase in ranks), default=None)
+
     for idx, chunk in enumerate(chunks):
-        lowered = chunk.lower()
-        heading = next((h for h in headings if h.lower() in lowered), None)
-        keywords = _derive_chunk_keywords(chunk)
-        definition = next((d for d in definitions if d.get("term", "").lower() in lowered), None)
-        example = next((e for e in examples if e.lower() in lowered), None)
-        contains_table = any('|' in line or '\t' in line for line in chunk.splitlines())
+        found = found_per_chunk[idx]
+        heading_index = first_found(heading_ranks, found)
+        definition_index = first_found(definition_ranks, found)
+        example_index = first_found(example_ranks, found)
+        heading = headings[heading_index] if heading_index is not None else None
+        definition = definitions[definition_index] if definition_index is not None else None
+        example = examples[example_index] if example_index is not None else None
+        keywords = _derive_chunk_keywords(chunk, counts=term_counts[idx] if term_counts is not None else None)
+        contains_table = "|" in chunk or "\t" in chunk
 
         annotations.append(
             {
@@ -648,26 +914,158 @@ def _build_semantic_blueprint(
     }
 
 
+def _embed_batch_deduplicated(batch: List[str]) -> Tuple[List[List[float]], str, int]:
+    """
+    Embed a batch, reusing vectors of chunks the configured model has embedded before.
+
+    Returns the vectors, the backend tag of any newly computed ones and how many
+    chunks actually reached the model.
+    """
+    tag = _primary_embed_tag()
+    store = get_chunk_embedding_store(tag)
+    if store is None:
+        vectors, used = _embed_texts_tagged(batch)
+        return vectors, used, len(batch)
+
+    hashes = [chunk_hash(text) for text in batch]
+    try:
+        known = store.lookup(hashes)
+    except (OSError, sqlite3.Error) as exc:
+        logger.warning("Chunk embedding store lookup failed: %s", exc)
+        known = {}
+    novel: Dict[bytes, str] = {}
+    for key, text in zip(hashes, batch):
+        if key not in known and key not in novel:
+            novel[key] = text
+
+    fresh: Dict[bytes, List[float]] = {}
+    used = tag
+    if novel:
+        vectors, used = _embed_texts_tagged(list(novel.values()))
+        fresh = dict(zip(novel, vectors))
+        if used == tag:
+            try:
+                store.add(list(fresh), np.asarray(vectors, dtype="float32"))
+            except (OSError, sqlite3.Error) as exc:
+                logger.warning("Chunk embedding store append failed: %s", exc)
+    embeddings = [known[key].tolist() if key in known else fresh[key] for key in hashes]
+    return embeddings, used, len(novel)
+
+
+def _embed_chunks(
+    chunks: List[str], progress: Optional[ProgressCallback] = None
+) -> Tuple[List[List[float]], bool, int]:
+    """
+    Embed ingestion chunks in fixed-size batches so callers can report progress.
+
+    Also returns whether every new vector came from the configured model (i.e. the
+    result is safe to cache under that model's name) and how many chunks were
+    actually sent to the model after deduplication.
+    """
+    embeddings: List[List[float]] = []
+    primary = True
+    embedded = 0
+    total = len(chunks)
+    step = INGEST_EMBED_BATCH if progress else max(total, 1)
+    if progress:
+        progress("embedding", 0, total)
+    for start in range(0, total, step):
+        vectors, tag, computed = _embed_batch_deduplicated(chunks[start:start + step])
+        embeddings.extend(vectors)
+        embedded += computed
+        primary = primary and (computed == 0 or tag == _primary_embed_tag())
+        if progress:
+            progress("embedding", len(embeddings), total)
+    return embeddings, primary, embedded
+
+
+def _extract_with_cache(
+    file_bytes: FileData,
+    source_name: str | None,
+    digest: Optional[str],
+    cache_status: Dict[str, str],
+    progress: Optional[ProgressCallback],
+    file_path: Optional[str] = None,
+) -> tuple[str, Dict[str, Any]]:
+    cache = get_content_cache()
+    if cache and digest:
+        cached = cache.load_extraction(digest)
+        if cached:
+            cache_status["extraction"] = "hit"
+            return cached
+        cache_status["extraction"] = "miss"
+    text, details = extract_text_auto(file_bytes, source_name, progress=progress, file_path=file_path)
+    if cache and digest and text.strip():
+        try:
+            cache.store_extraction(digest, text, details)
+        except (OSError, TypeError, ValueError) as exc:
+            logger.warning("Could not cache extracted text: %s", exc)
+    return text, details
+
+
+def _embed_with_cache(
+    chunks: List[str],
+    spans: List[Tuple[int, int]],
+    digest: Optional[str],
+    cache_status: Dict[str, str],
+    progress: Optional[ProgressCallback],
+) -> Tuple[List[List[float]], int]:
+    """Embeddings for the chunks plus the number of chunks that had to be embedded from scratch."""
+    cache = get_content_cache()
+    tag = ContentCache.embedding_tag(_primary_embed_tag(), get_chunker().config_tag)
+    if cache and digest:
+        cached = cache.load_embeddings(digest, tag)
+        if cached and cached[0] == spans:
+            cache_status["embeddings"] = "hit"
+            if progress:
+                progress("embedding", len(chunks), len(chunks))
+            return cached[1].tolist(), 0
+        cache_status["embeddings"] = "miss"
+    embeddings, primary, embedded = _embed_chunks(chunks, progress)
+    if cache and digest and primary:
+        try:
+            cache.store_embeddings(digest, tag, spans, np.asarray(embeddings, dtype="float32"))
+        except (OSError, ValueError) as exc:
+            logger.warning("Could not cache chunk embeddings: %s", exc)
+    return embeddings, embedded
+
+
 def ingest_bytes(
-    file_bytes: bytes,
+    file_bytes: FileData,
     store: ChromaVectorStore,
     source_name: str | None = None,
     *,
     with_metrics: bool = False,
     metadata_overrides: Optional[Dict[str, Any]] = None,
+    progress: Optional[ProgressCallback] = None,
+    content_hash: Optional[str] = None,
+    file_path: Optional[str] = None,
 ) -> Dict[str, Any] | int:
-    text, extraction_details = extract_text_auto(file_bytes, source_name)
-    token_list = re.findall(r"[A-Za-z][\w-]+", text)
-    token_count = len(token_list)
-    chunks = chunk_text(text)
-    chunk_topics = derive_chunk_topics(chunks)
+    if progress:
+        progress("extracting", 0, 0)
+    # Identical bytes reuse cached extraction and embeddings (see app.content_cache).
+    digest = content_hash
+    if digest is None and get_content_cache() is not None:
+        digest = hashlib.sha256(file_bytes).hexdigest()
+    cache_status = {"extraction": "off", "embeddings": "off"}
+    text, extraction_details = _extract_with_cache(file_bytes, source_name, digest, cache_status, progress, file_path)
+    if progress:
+        progress("chunking", 0, 0)
+    spans = chunk_spans(text)
+    chunks = [text[start:end] for start, end in spans]
+    # One tokenization pass feeds token counts, chunk topics, chunk keywords and document keywords.
+    tokenized = tokenize(text, spans, STOP_WORDS)
+    token_count = tokenized.token_count
+    chunk_terms = tokenized.chunk_term_counts
+    chunk_topics = derive_chunk_topics(chunks, term_counts=chunk_terms)
     structured = extract_structured_content(
         text,
         tables=extraction_details.get("tables"),
         source_name=source_name,
         file_type=extraction_details.get("fileType"),
+        term_counts=tokenized.term_counts,
     )
-    chunk_annotations = _annotate_chunks(chunks, structured, chunk_topics)
+    chunk_annotations = _annotate_chunks(chunks, structured, chunk_topics, chunk_terms, text, spans)
     semantic_blueprint = _build_semantic_blueprint(structured, chunk_topics)
 
     if not chunks:
@@ -683,7 +1081,9 @@ def ingest_bytes(
         }
         return metrics if with_metrics else 0
 
-    embeddings = embed_texts(chunks)
+    embeddings, embedded = _embed_with_cache(chunks, spans, digest, cache_status, progress)
+    if progress:
+        progress("indexing", 0, 0)
     ingested_at = datetime.utcnow().isoformat()
     source = source_name or 'document'
     docs = []
@@ -692,7 +1092,7 @@ def ingest_bytes(
     # Prepare overrides once
     overrides = metadata_overrides or {}
 
-    for i, (c, e) in enumerate(zip(chunks, embeddings)):
+    for i, (c, e, (char_start, char_end)) in enumerate(zip(chunks, embeddings, spans)):
         annotation = chunk_annotations[i] if i < len(chunk_annotations) else {}
         topic_hint = topic_map.get(i)
         
@@ -701,6 +1101,8 @@ def ingest_bytes(
             "chunk_index": i,
             "ingested_at": ingested_at,
             "topic": topic_hint,
+            "char_start": char_start,
+            "char_end": char_end,
             **{k: v for k, v in annotation.items() if v},
             **overrides # Helper to context storage
         }
@@ -727,17 +1129,35 @@ def ingest_bytes(
             "structured_content": structured,
             "semantic_blueprint": semantic_blueprint,
             "ingested_at": ingested_at,
+            "content_cache": cache_status,
+            "embedding_dedup": {
+                "chunks": len(chunks),
+                "embedded": embedded,
+                "ratio": round(1 - embedded / len(chunks), 4),
+            },
         }
     return len(docs)
 
 
 # Backwards-compatible alias used by main.py
 def ingest_pdf_bytes(
-    file_bytes: bytes,
+    file_bytes: FileData,
     store: ChromaVectorStore,
     source_name: str | None = None,
     *,
     with_metrics: bool = False,
     metadata_overrides: Optional[Dict[str, Any]] = None,
+    progress: Optional[ProgressCallback] = None,
+    content_hash: Optional[str] = None,
+    file_path: Optional[str] = None,
 ):
-    return ingest_bytes(file_bytes, store, source_name, with_metrics=with_metrics, metadata_overrides=metadata_overrides)
+    return ingest_bytes(
+        file_bytes,
+        store,
+        source_name,
+        with_metrics=with_metrics,
+        metadata_overrides=metadata_overrides,
+        progress=progress,
+        content_hash=content_hash,
+        file_path=file_path,
+    )
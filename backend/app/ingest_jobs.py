@@ -0,0 +1,373 @@
+"""
+Background ingestion jobs.
+
+Uploads are spooled to the student's data directory (see ``app.uploads``)
+and recorded in the ``ingest_jobs`` table before the HTTP request returns.
+A bounded pool of worker threads runs the ingestion pipeline, writing
+stage-level progress back to the row so clients can poll it. Jobs that were queued or running
+when the process stopped are picked up again on the next start.
+
+Several server processes may share the table. A worker claims a queued job
+with a conditional UPDATE, so only one process runs it, and records itself as
+the job's ``owner``. While the job runs, a heartbeat thread refreshes its
+``heartbeat_at`` lease. Only running jobs whose lease is older than
+``INGEST_JOB_LEASE`` seconds belong to a dead process; they are re-queued on
+start and by the heartbeat of any live process.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "100"))
+INGEST_JOB_LEASE = float(os.getenv("INGEST_JOB_LEASE", "60"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+ACTIVE_STATES = (JOB_QUEUED, JOB_RUNNING)
+
+# runner(job, progress) -> result dict stored on the job once it completes.
+JobRunner = Callable[[Dict[str, Any], Callable[[str, int, int], None]], Dict[str, Any]]
+
+
+class IngestQueueFull(RuntimeError):
+    """Raised when too many jobs are already waiting for a worker."""
+
+
+def describe_stage(stage: str, current: int = 0, total: int = 0) -> str:
+    """Human readable progress label, e.g. ``ocr page 12/80`` or ``embedding 300/900``."""
+    if not total:
+        return stage
+    if stage == "ocr":
+        return f"ocr page {current}/{total}"
+    return f"{stage} {current}/{total}"
+
+
+def _connect_app_db() -> sqlite3.Connection:
+    from app.routers.auth import get_db_connection
+
+    return get_db_connection()
+
+
+class IngestJobManager:
+    def __init__(
+        self,
+        runner: JobRunner,
+        *,
+        connect: Callable[[], sqlite3.Connection] = _connect_app_db,
+        workers: int = INGEST_WORKERS,
+        max_pending: int = INGEST_MAX_PENDING,
+        lease_seconds: float = INGEST_JOB_LEASE,
+    ):
+        self._runner = runner
+        self._connect = connect
+        self._workers = max(1, workers)
+        self._max_pending = max_pending
+        self._lease = max(1.0, lease_seconds)
+        # Unique per manager, so two managers in one process never share leases.
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._heartbeat: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._pending = 0
+        self._schema_ready = False
+
+    def _db(self) -> sqlite3.Connection:
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        if not self._schema_ready:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingest_jobs (
+                    id TEXT PRIMARY KEY,
+                    university TEXT NOT NULL,
+                    roll_no TEXT NOT NULL,
+                    user_id INTEGER,
+                    filename TEXT NOT NULL,
+                    course TEXT,
+                    force_upload INTEGER DEFAULT 0,
+                    upload_path TEXT NOT NULL,
+                    file_size INTEGER,
+                    file_hash TEXT,
+                    status TEXT NOT NULL,
+                    owner TEXT,
+                    heartbeat_at TEXT,
+                    stage TEXT,
+                    progress_current INTEGER DEFAULT 0,
+                    progress_total INTEGER DEFAULT 0,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ingest_jobs_owner ON ingest_jobs (university, roll_no, created_at)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_ingest_jobs_status ON ingest_jobs (status)")
+            conn.commit()
+            self._schema_ready = True
+        return conn
+
+    # --- Lifecycle ---
+
+    def start(self) -> int:
+        """Start the worker pool and pick up queued jobs and jobs whose owner's lease expired."""
+        with self._lock:
+            if self._executor is not None:
+                return 0
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="ingest-job")
+            self._stopping.clear()
+            self._heartbeat = threading.Thread(target=self._heartbeat_loop, name="ingest-heartbeat", daemon=True)
+            self._heartbeat.start()
+        self._requeue_expired()
+        conn = self._db()
+        try:
+            rows = conn.execute(
+                "SELECT id FROM ingest_jobs WHERE status=? ORDER BY created_at", (JOB_QUEUED,)
+            ).fetchall()
+        finally:
+            conn.close()
+        for row in rows:
+            self._dispatch(row["id"])
+        if rows:
+            logger.info("Resumed %d unfinished ingestion job(s)", len(rows))
+        return len(rows)
+
+    def stop(self, wait: bool = True) -> None:
+        """Stop accepting work. Jobs still queued stay in the table and resume on the next start."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            heartbeat, self._heartbeat = self._heartbeat, None
+            self._pending = 0
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+        # Running jobs keep their lease until the executor has finished them.
+        self._stopping.set()
+        if heartbeat is not None:
+            heartbeat.join(timeout=5)
+
+    # --- Leases ---
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopping.wait(self._lease / 3):
+            try:
+                self._update_where(
+                    "owner=? AND status=?", (self.owner, JOB_RUNNING), heartbeat_at=datetime.utcnow().isoformat()
+                )
+                for job_id in self._requeue_expired():
+                    self._dispatch(job_id)
+            except sqlite3.Error as exc:
+                logger.warning("Ingestion job heartbeat failed: %s", exc)
+
+    def _requeue_expired(self) -> List[str]:
+        """Re-queue running jobs whose owner stopped renewing its lease; returns their ids."""
+        cutoff = (datetime.utcnow() - timedelta(seconds=self._lease)).isoformat()
+        expired = "status=? AND (heartbeat_at IS NULL OR heartbeat_at < ?)"
+        conn = self._db()
+        try:
+            ids = [row["id"] for row in conn.execute(f"SELECT id FROM ingest_jobs WHERE {expired}", (JOB_RUNNING, cutoff))]
+            requeued = []
+            for job_id in ids:
+                # Conditional, so a lease renewed meanwhile (or another process re-queuing first) wins.
+                cursor = conn.execute(
+                    f"UPDATE ingest_jobs SET status=?, owner=NULL, stage=?, updated_at=? WHERE id=? AND {expired}",
+                    (JOB_QUEUED, "queued (resumed)", datetime.utcnow().isoformat(), job_id, JOB_RUNNING, cutoff),
+                )
+                if cursor.rowcount == 1:
+                    requeued.append(job_id)
+            conn.commit()
+        finally:
+            conn.close()
+        if requeued:
+            logger.info("Re-queued %d ingestion job(s) whose worker lease expired", len(requeued))
+        return requeued
+
+    # --- Submission & status ---
+
+    def submit(
+        self,
+        *,
+        university: str,
+        roll_no: str,
+        user_id: Optional[int],
+        filename: str,
+        upload_path: Path,
+        file_size: int,
+        file_hash: Optional[str] = None,
+        course: Optional[str] = None,
+        force_upload: bool = False,
+    ) -> Dict[str, Any]:
+        """Record a queued job for an already spooled upload and hand it to the worker pool."""
+        with self._lock:
+            if self._pending >= self._max_pending:
+                raise IngestQueueFull(f"{self._pending} ingestion jobs are already waiting")
+            self._pending += 1
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow().isoformat()
+        try:
+            conn = self._db()
+            try:
+                conn.execute(
+                    """
+                    INSERT INTO ingest_jobs (
+                        id, university, roll_no, user_id, filename, course, force_upload,
+                        upload_path, file_size, file_hash, status, stage, created_at, updated_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (
+                        job_id,
+                        university,
+                        roll_no,
+                        user_id,
+                        filename,
+                        course,
+                        int(force_upload),
+                        str(upload_path),
+                        file_size,
+                        file_hash,
+                        JOB_QUEUED,
+                        "queued",
+                        now,
+                        now,
+                    ),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+        self._dispatch(job_id, counted=True)
+        return self.get(job_id, university, roll_no)
+
+    def get(self, job_id: str, university: str, roll_no: str) -> Optional[Dict[str, Any]]:
+        """Return a job owned by the given student, or None."""
+        conn = self._db()
+        try:
+            row = conn.execute(
+                "SELECT * FROM ingest_jobs WHERE id=? AND university=? AND roll_no=?",
+                (job_id, university, roll_no),
+            ).fetchone()
+        finally:
+            conn.close()
+        return self._serialize(row) if row else None
+
+    def list_jobs(self, university: str, roll_no: str, limit: int = 20) -> List[Dict[str, Any]]:
+        conn = self._db()
+        try:
+            rows = conn.execute(
+                "SELECT * FROM ingest_jobs WHERE university=? AND roll_no=? ORDER BY created_at DESC LIMIT ?",
+                (university, roll_no, limit),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [self._serialize(row) for row in rows]
+
+    @staticmethod
+    def _serialize(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "stage": row["stage"],
+            "progress": {"current": row["progress_current"] or 0, "total": row["progress_total"] or 0},
+            "filename": row["filename"],
+            "file_size": row["file_size"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    # --- Execution ---
+
+    def _dispatch(self, job_id: str, counted: bool = False) -> None:
+        with self._lock:
+            executor = self._executor
+            if executor is None:
+                # Not started yet (or stopping): the job stays queued and is resumed by start().
+                if counted:
+                    self._pending -= 1
+                return
+            if not counted:
+                self._pending += 1
+        executor.submit(self._run, job_id)
+
+    def _update_where(self, condition: str, params: tuple, **fields: Any) -> int:
+        fields["updated_at"] = datetime.utcnow().isoformat()
+        assignments = ", ".join(f"{column}=?" for column in fields)
+        conn = self._db()
+        try:
+            cursor = conn.execute(f"UPDATE ingest_jobs SET {assignments} WHERE {condition}", (*fields.values(), *params))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        self._update_where("id=?", (job_id,), **fields)
+
+    def _claim(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Atomically move a queued job to running under this manager; None if another worker got it."""
+        claimed = self._update_where(
+            "id=? AND status=?",
+            (job_id, JOB_QUEUED),
+            status=JOB_RUNNING,
+            owner=self.owner,
+            heartbeat_at=datetime.utcnow().isoformat(),
+            stage="starting",
+            progress_current=0,
+            progress_total=0,
+        )
+        if not claimed:
+            return None
+        conn = self._db()
+        try:
+            row = conn.execute("SELECT * FROM ingest_jobs WHERE id=?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return dict(row)
+
+    def _run(self, job_id: str) -> None:
+        with self._lock:
+            self._pending = max(0, self._pending - 1)
+        job = self._claim(job_id)
+        if job is None:
+            return
+
+        def progress(stage: str, current: int = 0, total: int = 0) -> None:
+            self._update(
+                job_id,
+                stage=describe_stage(stage, current, total),
+                progress_current=current,
+                progress_total=total,
+            )
+
+        upload_path = Path(job["upload_path"])
+        try:
+            if not upload_path.exists():
+                raise FileNotFoundError(f"Uploaded file for job {job_id} is missing")
+            result = self._runner(job, progress)
+        except Exception as exc:
+            logger.exception("Ingestion job %s failed", job_id)
+            self._update(job_id, status=JOB_FAILED, stage="failed", error=str(exc) or exc.__class__.__name__)
+        else:
+            self._update(job_id, status=JOB_COMPLETED, stage="done", result=json.dumps(result))
+        finally:
+            upload_path.unlink(missing_ok=True)
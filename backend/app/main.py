@@ -1,10 +1,13 @@
+import logging
 import os
 import re
 import time
+from contextlib import asynccontextmanager
 from typing import Optional, List, Literal, Dict, Any, Union
 from datetime import datetime, timedelta
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Query, Depends
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import RedirectResponse, HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, ConfigDict
@@ -14,8 +17,10 @@ from app.routers.auth import get_current_user
 from app.dependencies import get_student_filter, ensure_admin
 
 from .analytics import (
+    close_analytics_writer,
     log_feedback_event,
     log_ingestion_event,
+    log_quiz_attempt,
     log_quiz_history,
     log_quiz_question_event,
     log_retrieval_event,
@@ -26,34 +31,94 @@ from .analytics import (
     resolve_session_id,
     get_quiz_analytics_options,
 )
-from .vector_store import ChromaVectorStore
-from .ingest import ingest_pdf_bytes, embed_texts
+from .vector_store import close_vector_stores, get_vector_store
+from .streaming import sse_event, sse_response, stream_message
+from .pdf_extraction import shutdown_pdf_pool
+from .ollama_embeddings import close_ollama_embedders
+from .uploads import (
+    MAX_UPLOAD_SIZE_BYTES,
+    MAX_UPLOAD_SIZE_MB,
+    UploadLimitMiddleware,
+    UploadTooLarge,
+    mapped_file,
+    spool_upload,
+    student_upload_dir,
+)
+from .embedding_backends import get_embedding_backend
+from .ingest import OLLAMA_EMBED_MODEL, ingest_pdf_bytes, embed_query, query_embedding_stats
 from .rag import (
+    get_rag_index,
     retrieve as rag_retrieve,
     retrieve_texts as rag_retrieve_texts,
     reset_index as reset_rag_index,
     dump_metadata as rag_dump_metadata,
 )
-from .utils import generate_answer_with_context, generate_summary, generate_adaptive_quiz_question
+from .utils import (
+    aclose_async_http_client,
+    agenerate_adaptive_quiz_question,
+    agenerate_answer_with_context,
+    agenerate_summary,
+    astream_answer_with_context,
+    astream_summary,
+)
 
 from app.routers import auth, admin, documents
 
 # Configure FastAPI with larger request body size limit
 # Set to 100MB to accommodate 50MB files + multipart overhead
 
-import os
-print("-" * 60)
-print(f"RUNNING MAIN FILE FROM: {os.path.abspath(__file__)}")
-print("-" * 60)
+logger = logging.getLogger(__name__)
+
+# Heavy dependencies (chromadb, the embedding model, the RAG index) load on first use;
+# set this to load them during startup instead of on the first request.
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() not in ("0", "false", "no")
+
+
+def warm_up() -> None:
+    """Open the vector store and RAG index and load the local embedding model ahead of traffic."""
+    steps = [("vector store", get_vector_store), ("RAG index", get_rag_index)]
+    if not OLLAMA_EMBED_MODEL:
+        steps.append(("embedding backend", lambda: get_embedding_backend().load()))
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as exc:
+            logger.warning("Warm-up of the %s failed; it will load on first use. Error: %s", name, exc)
+        else:
+            logger.info("Warmed up the %s in %.2fs", name, time.perf_counter() - started)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info("Starting application from %s", os.path.abspath(__file__))
+    # Start ingestion workers and pick up uploads left unfinished by the previous process
+    await run_in_threadpool(documents.ingest_jobs.start)
+    if WARMUP_ON_STARTUP:
+        await run_in_threadpool(warm_up)
+    yield
+    # Running jobs are not awaited; they stay "running" in the table and resume on next start
+    documents.ingest_jobs.stop(wait=False)
+    shutdown_pdf_pool()
+    close_ollama_embedders()
+    close_vector_stores()
+    # Commit analytics events still queued for the background writer
+    await run_in_threadpool(close_analytics_writer)
+    # Release pooled LLM connections held by this worker's event loop
+    await aclose_async_http_client()
+
 
 app = FastAPI(
     title="Smart Campus Assistant",
+    lifespan=lifespan,
     version="1.0.0",
     # Allow larger request bodies for file uploads
     # Default is 16MB, we increase to 100MB
 )
 
 # --- Middleware ---
+# Registered before CORS so its 413 responses still carry CORS headers
+app.add_middleware(UploadLimitMiddleware, paths=("/ingest-file", "/ingest-file-legacy"), max_bytes=MAX_UPLOAD_SIZE_BYTES)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -162,8 +227,6 @@ def root():
 def health():
     return JSONResponse({"status": "ok"})
 
-store = ChromaVectorStore()
-
 
 def _derive_context_sources(hits: List[Dict[str, Any]]) -> List[str]:
     seen: List[str] = []
@@ -186,6 +249,7 @@ class QARequest(BaseModel):
     sources: Optional[List[str]] = None
     conversation: Optional[List[ConversationTurn]] = None
     session_id: Optional[str] = Field(default=None, alias="sessionId")
+    stream: bool = False
 
 
 class SummaryRequest(BaseModel):
@@ -193,6 +257,7 @@ class SummaryRequest(BaseModel):
     top_k: Optional[int] = 8
     sources: Optional[List[str]] = None
     session_id: Optional[str] = Field(default=None, alias="sessionId")
+    stream: bool = False
 
 
 class QuizHistoryTurn(BaseModel):
@@ -357,10 +422,6 @@ class FeedbackRequest(BaseModel):
     session_id: Optional[str] = Field(default=None, alias="sessionId")
 
 # --- File Upload Configuration ---
-# Maximum file size: 50MB (configurable via environment variable)
-MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "50"))
-MAX_UPLOAD_SIZE_BYTES = MAX_UPLOAD_SIZE_MB * 1024 * 1024
-
 @app.post("/ingest-file-legacy", include_in_schema=False)
 async def ingest_file(
     request: Request,
@@ -379,24 +440,24 @@ async def ingest_file(
     )
 
     start_time = time.perf_counter()
-    content = await file.read()
-    file_size = len(content)
     file_type = os.path.splitext(file.filename or "")[1].lower() or None
 
-    # Validate file size BEFORE processing
-    if file_size > MAX_UPLOAD_SIZE_BYTES:
+    # Size is enforced while the upload is spooled to disk, before any processing
+    try:
+        upload = await spool_upload(file, student_upload_dir(current_user.university, current_user.roll_no))
+    except UploadTooLarge as exc:
         duration_ms = int((time.perf_counter() - start_time) * 1000)
         log_ingestion_event(
             session_id=session_id,
             file_name=file.filename or "uploaded-document",
             file_type=file_type,
-            file_size=file_size,
+            file_size=exc.received,
             chunk_count=0,
             token_count=0,
             duration_ms=duration_ms,
             status="failed",
             course=course,
-            error=f"File too large: {file_size / (1024*1024):.2f}MB exceeds limit of {MAX_UPLOAD_SIZE_MB}MB",
+            error=f"File too large: exceeded limit of {MAX_UPLOAD_SIZE_MB}MB",
             university=current_user.university,
             roll_no=current_user.roll_no,
         )
@@ -406,19 +467,18 @@ async def ingest_file(
             {
                 "fileName": file.filename,
                 "error": "file_too_large",
-                "fileSize": file_size,
+                "fileSize": exc.received,
                 "maxSize": MAX_UPLOAD_SIZE_BYTES
             },
             university=current_user.university,
             roll_no=current_user.roll_no,
         )
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large. Maximum size is {MAX_UPLOAD_SIZE_MB}MB, but file is {file_size / (1024*1024):.2f}MB"
-        )
+        raise HTTPException(status_code=413, detail=str(exc))
+    file_size = upload.size
 
     # Validate file is not empty
     if file_size == 0:
+        upload.discard()
         raise HTTPException(
             status_code=400,
             detail="File is empty. Please upload a file with content."
@@ -426,17 +486,20 @@ async def ingest_file(
 
 
     try:
-        result = ingest_pdf_bytes(
-            content,
-            store,
-            source_name=file.filename,
-            with_metrics=True,
-            metadata_overrides={
-                "university": current_user.university,
-                "roll_no": current_user.roll_no,
-                "u_id": current_user.id,
-            }
-        )
+        with mapped_file(upload.path) as content:
+            result = ingest_pdf_bytes(
+                content,
+                get_vector_store(),
+                source_name=file.filename,
+                with_metrics=True,
+                content_hash=upload.sha256,
+                file_path=str(upload.path),
+                metadata_overrides={
+                    "university": current_user.university,
+                    "roll_no": current_user.roll_no,
+                    "u_id": current_user.id,
+                }
+            )
     except ValueError as exc:
         duration_ms = int((time.perf_counter() - start_time) * 1000)
         log_ingestion_event(
@@ -461,6 +524,8 @@ async def ingest_file(
             roll_no=current_user.roll_no,
         )
         raise HTTPException(status_code=400, detail=str(exc))
+    finally:
+        upload.discard()
 
     if not isinstance(result, dict):
         # Fallback for legacy behaviour; wrap value in metrics dict
@@ -532,12 +597,12 @@ def list_documents(student_filter: Dict[str, Any] = Depends(get_student_filter))
     List all documents for the current student only.
     Students can ONLY see their own uploaded documents.
     """
-    stats = store.stats(filters=student_filter)
+    stats = get_vector_store().stats(filters=student_filter)
     return {"sources": stats.get("sources", []), "total_docs": stats.get("docs", 0)}
 
 
 @app.get("/documents-legacy/{source_id}", response_model=DocumentDetailResponse, include_in_schema=False)
-def get_document_detail(
+async def get_document_detail(
     source_id: str, 
     limit: int = 12, 
     student_filter: Dict[str, Any] = Depends(get_student_filter)
@@ -546,7 +611,7 @@ def get_document_detail(
     Get details of a specific document.
     Students can ONLY access their own documents.
     """
-    matches = store.get_documents_by_source(source_id, filters=student_filter)
+    matches = await run_in_threadpool(get_vector_store().get_documents_by_source, source_id, filters=student_filter)
     if not matches:
         raise HTTPException(status_code=404, detail="Document not found")
 
@@ -554,7 +619,7 @@ def get_document_detail(
     limited = matches[: max(1, limit)]
 
     chunk_texts = [doc["text"] for doc in limited]
-    summary_text = generate_summary(chunk_texts[: min(8, len(chunk_texts))]) if chunk_texts else None
+    summary_text = await agenerate_summary(chunk_texts[: min(8, len(chunk_texts))]) if chunk_texts else None
 
     chunks: List[DocumentChunk] = []
     for idx, doc in enumerate(limited):
@@ -596,15 +661,21 @@ def ingest_form():
 def reset_store(admin_user: Student = Depends(ensure_admin)):
     # Clear all stored documents/embeddings
     # ONLY ADMINS CAN DO THIS
-    store.clear()
+    get_vector_store().clear()
     reset_rag_index()
-    return {"status": "ok", **store.stats()}
+    return {"status": "ok", **get_vector_store().stats()}
 
 
 @app.get("/stats", include_in_schema=True)
 def stats(student_filter: Dict[str, Any] = Depends(get_student_filter)):
     # Basic stats about the vector store - scoped to student
-    return store.stats(filters=student_filter)
+    return get_vector_store().stats(filters=student_filter)
+
+
+@app.get("/stats/embeddings", include_in_schema=True)
+def embedding_stats(admin_user: Student = Depends(ensure_admin)):
+    # Query embedding cache and batching counters are process-wide, so only admins see them
+    return query_embedding_stats()
 
 
 @app.get("/analytics/quiz", response_class=HTMLResponse, include_in_schema=True)
@@ -638,8 +709,131 @@ def quiz_analytics_options(student_filter: Dict[str, Any] = Depends(get_student_
     )
 
 
+def _retrieve_qa_hits(
+    req: "QARequest", student_filter: Dict[str, Any]
+) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    # Embedding and index lookups block, so async routes run this in the threadpool.
+    q_emb = embed_query(req.question)
+    rag_hits = _format_rag_hits(
+        rag_retrieve(q_emb, top_k=req.top_k or 5, allowed_sources=req.sources, filters=student_filter)
+    )
+    hits = rag_hits or get_vector_store().similarity_search(
+        q_emb,
+        top_k=req.top_k or 5,
+        allowed_sources=req.sources,
+        filters=student_filter,
+    )
+    return hits, rag_hits
+
+
+def _retrieve_summary_contexts(req: "SummaryRequest", student_filter: Dict[str, Any]) -> tuple[List[str], str]:
+    contexts: List[str] = []
+    retrieval_mode = "direct"
+    if req.topic:
+        q_emb = embed_query(req.topic)
+        contexts = rag_retrieve_texts(
+            q_emb,
+            top_k=req.top_k or 8,
+            allowed_sources=req.sources,
+            filters=student_filter,
+        )
+        if contexts:
+            retrieval_mode = "rag"
+        else:
+            hits = get_vector_store().similarity_search(
+                q_emb,
+                top_k=req.top_k or 8,
+                allowed_sources=req.sources,
+                filters=student_filter,
+            )
+            contexts = [h["text"] for h in hits]
+            if contexts:
+                retrieval_mode = "vector"
+    else:
+        docs = get_vector_store().get_all_documents(limit=req.top_k or 8, sources=req.sources, filters=student_filter)
+        contexts = [d["text"] for d in docs]
+        if contexts:
+            retrieval_mode = "vector"
+    return contexts, retrieval_mode
+
+
+def _log_qa_completed(
+    session_id: str,
+    req: "QARequest",
+    hits: List[Dict[str, Any]],
+    used_rag: bool,
+    answer: str,
+    latency_ms: int,
+    student_filter: Dict[str, Any],
+    first_token_ms: Optional[int] = None,
+) -> None:
+    answer_token_count = len(re.findall(r"[A-Za-z][\w-]+", answer)) if answer else 0
+    metadata: Dict[str, Any] = {
+        "requestedSources": req.sources,
+        "retrievalMode": "rag" if used_rag else "vector",
+    }
+    if req.stream:
+        metadata["streamed"] = True
+    log_retrieval_event(
+        session_id,
+        "qa",
+        req.question,
+        hits,
+        latency_ms,
+        req.top_k or 5,
+        topic=req.question,
+        answer_tokens=answer_token_count,
+        metadata=metadata,
+        university=student_filter.get("university"),
+        roll_no=student_filter.get("roll_no"),
+        first_token_ms=first_token_ms,
+    )
+    log_user_event(
+        "qa_completed",
+        session_id,
+        {"question": req.question, "latencyMs": latency_ms},
+        university=student_filter.get("university"),
+        roll_no=student_filter.get("roll_no"),
+    )
+
+
+def _log_summary_completed(
+    session_id: str,
+    req: "SummaryRequest",
+    context_count: int,
+    retrieval_mode: str,
+    latency_ms: int,
+    student_filter: Dict[str, Any],
+    first_token_ms: Optional[int] = None,
+) -> None:
+    metadata: Dict[str, Any] = {
+        "topK": req.top_k,
+        "sources": req.sources,
+        "retrievalMode": retrieval_mode,
+    }
+    if req.stream:
+        metadata["streamed"] = True
+    log_summary_event(
+        session_id,
+        req.topic,
+        context_count,
+        latency_ms,
+        metadata=metadata,
+        university=student_filter.get("university"),
+        roll_no=student_filter.get("roll_no"),
+        first_token_ms=first_token_ms,
+    )
+    log_user_event(
+        "summary_completed",
+        session_id,
+        {"topic": req.topic, "latencyMs": latency_ms, "contextCount": context_count},
+        university=student_filter.get("university"),
+        roll_no=student_filter.get("roll_no"),
+    )
+
+
 @app.post("/qa")
-def qa(
+async def qa(
     req: QARequest, 
     request: Request, 
     student_filter: Dict[str, Any] = Depends(get_student_filter)
@@ -652,7 +846,8 @@ def qa(
         raise HTTPException(status_code=400, detail="Question is required")
 
     session_id = req.session_id or resolve_session_id(request)
-    log_user_event(
+    await run_in_threadpool(
+        log_user_event,
         "qa_started",
         session_id,
         {"question": req.question, "topK": req.top_k, "sources": req.sources},
@@ -661,22 +856,14 @@ def qa(
     )
 
     start_time = time.perf_counter()
-    q_emb = embed_texts([req.question])[0]
-    rag_hits = _format_rag_hits(
-        rag_retrieve(q_emb, top_k=req.top_k or 5, allowed_sources=req.sources, filters=student_filter)
-    )
-    hits = rag_hits or store.similarity_search(
-        q_emb,
-        top_k=req.top_k or 5,
-        allowed_sources=req.sources,
-        filters=student_filter,
-    )
+    hits, rag_hits = await run_in_threadpool(_retrieve_qa_hits, req, student_filter)
 
     if not hits:
         latency_ms = int((time.perf_counter() - start_time) * 1000)
         selected = ", ".join(req.sources or []) or "any stored document"
         msg = f"I couldn't find relevant content in {selected}. Try ingesting or expanding your search."
-        log_retrieval_event(
+        await run_in_threadpool(
+            log_retrieval_event,
             session_id,
             "qa",
             req.question,
@@ -688,49 +875,52 @@ def qa(
             university=student_filter.get("university"),
             roll_no=student_filter.get("roll_no"),
         )
-        log_user_event(
+        await run_in_threadpool(
+            log_user_event,
             "qa_no_results",
             session_id,
             {"question": req.question, "latencyMs": latency_ms},
             university=student_filter.get("university"),
             roll_no=student_filter.get("roll_no"),
         )
+        if req.stream:
+            return sse_response(stream_message(msg))
         return {"answer": msg, "sources": []}
 
     contexts = [h["text"] + f"\n[source: {h.get('meta', {}).get('source')}]" for h in hits]
     history = [turn.dict() for turn in (req.conversation or [])]
-    answer = generate_answer_with_context(req.question, contexts, conversation=history)
+    sources = [h.get('meta', {}) for h in hits]
+
+    if req.stream:
+        async def event_stream():
+            yield sse_event("sources", {"sources": sources})
+            first_token_ms: Optional[int] = None
+            parts: List[str] = []
+            async for piece in astream_answer_with_context(req.question, contexts, conversation=history):
+                if first_token_ms is None:
+                    first_token_ms = int((time.perf_counter() - start_time) * 1000)
+                parts.append(piece)
+                yield sse_event("token", {"text": piece})
+            latency_ms = int((time.perf_counter() - start_time) * 1000)
+            await run_in_threadpool(
+                _log_qa_completed,
+                session_id, req, hits, bool(rag_hits), "".join(parts), latency_ms, student_filter, first_token_ms,
+            )
+            yield sse_event("done", {"latencyMs": latency_ms, "firstTokenMs": first_token_ms})
+
+        return sse_response(event_stream())
+
+    answer = await agenerate_answer_with_context(req.question, contexts, conversation=history)
 
     latency_ms = int((time.perf_counter() - start_time) * 1000)
-    answer_token_count = len(re.findall(r"[A-Za-z][\w-]+", answer)) if answer else 0
-    log_retrieval_event(
-        session_id,
-        "qa",
-        req.question,
-        hits,
-        latency_ms,
-        req.top_k or 5,
-        topic=req.question,
-        answer_tokens=answer_token_count,
-        metadata={
-            "requestedSources": req.sources,
-            "retrievalMode": "rag" if rag_hits else "vector",
-        },
-        university=student_filter.get("university"),
-        roll_no=student_filter.get("roll_no"),
-    )
-    log_user_event(
-        "qa_completed",
-        session_id,
-        {"question": req.question, "latencyMs": latency_ms},
-        university=student_filter.get("university"),
-        roll_no=student_filter.get("roll_no"),
+    await run_in_threadpool(
+        _log_qa_completed, session_id, req, hits, bool(rag_hits), answer, latency_ms, student_filter
     )
-    return {"answer": answer, "sources": [h.get('meta', {}) for h in hits]}
+    return {"answer": answer, "sources": sources}
 
 
 @app.post("/summary")
-def summary(
+async def summary(
     req: SummaryRequest, 
     request: Request, 
     student_filter: Dict[str, Any] = Depends(get_student_filter)
@@ -740,7 +930,8 @@ def summary(
     Complete isolation - only uses current student's content.
     """
     session_id = req.session_id or resolve_session_id(request)
-    log_user_event(
+    await run_in_threadpool(
+        log_user_event,
         "summary_requested",
         session_id,
         {"topic": req.topic, "topK": req.top_k, "sources": req.sources},
@@ -749,62 +940,36 @@ def summary(
     )
 
     start_time = time.perf_counter()
-    contexts: List[str] = []
-    retrieval_mode = "direct"
-    if req.topic:
-        q_emb = embed_texts([req.topic])[0]
-        contexts = rag_retrieve_texts(
-            q_emb,
-            top_k=req.top_k or 8,
-            allowed_sources=req.sources,
-            filters=student_filter,
-        )
-        if contexts:
-            retrieval_mode = "rag"
-        else:
-            hits = store.similarity_search(
-                q_emb,
-                top_k=req.top_k or 8,
-                allowed_sources=req.sources,
-                filters=student_filter,
+    contexts, retrieval_mode = await run_in_threadpool(_retrieve_summary_contexts, req, student_filter)
+
+    if req.stream:
+        async def event_stream():
+            yield sse_event("sources", {"contextCount": len(contexts), "retrievalMode": retrieval_mode})
+            first_token_ms: Optional[int] = None
+            async for piece in astream_summary(contexts):
+                if first_token_ms is None:
+                    first_token_ms = int((time.perf_counter() - start_time) * 1000)
+                yield sse_event("token", {"text": piece})
+            latency_ms = int((time.perf_counter() - start_time) * 1000)
+            await run_in_threadpool(
+                _log_summary_completed,
+                session_id, req, len(contexts), retrieval_mode, latency_ms, student_filter, first_token_ms,
             )
-            contexts = [h["text"] for h in hits]
-            if contexts:
-                retrieval_mode = "vector"
-    else:
-        docs = store.get_all_documents(limit=req.top_k or 8, sources=req.sources, filters=student_filter)
-        contexts = [d["text"] for d in docs]
-        if contexts:
-            retrieval_mode = "vector"
+            yield sse_event("done", {"latencyMs": latency_ms, "firstTokenMs": first_token_ms})
+
+        return sse_response(event_stream())
 
-    summary_text = generate_summary(contexts)
+    summary_text = await agenerate_summary(contexts)
     latency_ms = int((time.perf_counter() - start_time) * 1000)
 
-    log_summary_event(
-        session_id,
-        req.topic,
-        len(contexts),
-        latency_ms,
-        metadata={
-            "topK": req.top_k,
-            "sources": req.sources,
-            "retrievalMode": retrieval_mode,
-        },
-        university=student_filter.get("university"),
-        roll_no=student_filter.get("roll_no"),
-    )
-    log_user_event(
-        "summary_completed",
-        session_id,
-        {"topic": req.topic, "latencyMs": latency_ms, "contextCount": len(contexts)},
-        university=student_filter.get("university"),
-        roll_no=student_filter.get("roll_no"),
+    await run_in_threadpool(
+        _log_summary_completed, session_id, req, len(contexts), retrieval_mode, latency_ms, student_filter
     )
     return {"summary": summary_text}
 
 
 @app.post("/quiz")
-def quiz_batch(
+async def quiz_batch(
     req: QuizBatchRequest, 
     request: Request, 
     student_filter: Dict[str, Any] = Depends(get_student_filter)
@@ -815,7 +980,8 @@ def quiz_batch(
     """
     topic = req.topic or "General study skills"
     session_id = req.session_id or resolve_session_id(request)
-    log_user_event(
+    await run_in_threadpool(
+        log_user_event,
         "quiz_batch_requested",
         session_id,
         {"topic": topic, "numQuestions": req.num_questions, "topK": req.top_k},
@@ -823,8 +989,8 @@ def quiz_batch(
         roll_no=student_filter.get("roll_no"),
     )
     
-    contexts, hits, selected_sources = _collect_quiz_context(
-        topic, req.top_k, req.sources, source_mode='all', filters=student_filter
+    contexts, hits, selected_sources = await run_in_threadpool(
+        _collect_quiz_context, topic, req.top_k, req.sources, source_mode='all', filters=student_filter
     )
     context_source_names = selected_sources if selected_sources else _derive_context_sources(hits)
     history: List[QuizHistoryTurn] = []
@@ -841,7 +1007,7 @@ def quiz_batch(
             elif isinstance(recorded_turn, dict):
                 history_payload.append(recorded_turn)
         focus_concept = _infer_focus_concept(topic, history)
-        payload = generate_adaptive_quiz_question(
+        payload = await agenerate_adaptive_quiz_question(
             topic=topic,
             contexts=contexts,
             difficulty=difficulty,
@@ -851,7 +1017,8 @@ def quiz_batch(
             source_names=context_source_names,
         )
         questions.append(_format_quiz_block(payload))
-        log_quiz_question_event(
+        await run_in_threadpool(
+            log_quiz_question_event,
             session_id,
             payload,
             total,
@@ -874,7 +1041,8 @@ def quiz_batch(
             )
         )
 
-    log_user_event(
+    await run_in_threadpool(
+        log_user_event,
         "quiz_batch_completed",
         session_id,
         {"topic": topic, "questionCount": len(questions)},
@@ -886,7 +1054,7 @@ def quiz_batch(
 
 
 @app.post("/quiz/next", response_model=Union[QuizQuestionStepResponse, QuizSummaryResponse])
-def quiz_next(
+async def quiz_next(
     req: QuizNextRequest, 
     request: Request, 
     student_filter: Dict[str, Any] = Depends(get_student_filter)
@@ -899,7 +1067,8 @@ def quiz_next(
     total_questions = req.total_questions or 5
     session_id = req.session_id or resolve_session_id(request)
 
-    log_user_event(
+    await run_in_threadpool(
+        log_user_event,
         "quiz_step_requested",
         session_id,
         {
@@ -926,13 +1095,15 @@ def quiz_next(
             history_dicts.append(payload)
 
     if len(history) >= total_questions:
-        log_quiz_history(
+        await run_in_threadpool(
+            log_quiz_history,
             session_id, 
             history_dicts, 
             university=student_filter.get("university"), 
             roll_no=student_filter.get("roll_no")
         )
-        log_user_event(
+        await run_in_threadpool(
+            log_user_event,
             "quiz_completed",
             session_id,
             {"topic": req.topic, "totalQuestions": total_questions},
@@ -945,7 +1116,8 @@ def quiz_next(
     difficulty = _resolve_next_difficulty(req.knowledge_level, history)
 
     retrieval_start = time.perf_counter()
-    contexts, hits, selected_sources = _collect_quiz_context(
+    contexts, hits, selected_sources = await run_in_threadpool(
+        _collect_quiz_context,
         req.topic,
         req.top_k,
         req.sources,
@@ -957,9 +1129,10 @@ def quiz_next(
     source_label = _describe_source_selection(selected_sources, hits)
 
     if history_dicts:
-        log_quiz_history(session_id, [history_dicts[-1]], source_label=source_label, university=student_filter.get("university"), roll_no=student_filter.get("roll_no"))
+        await run_in_threadpool(log_quiz_attempt, session_id, history_dicts[-1], source_label=source_label, university=student_filter.get("university"), roll_no=student_filter.get("roll_no"))
 
-    log_retrieval_event(
+    await run_in_threadpool(
+        log_retrieval_event,
         session_id,
         "quiz",
         req.topic or "Adaptive quiz",
@@ -978,7 +1151,7 @@ def quiz_next(
     focus_concept = _infer_focus_concept(req.topic, history)
     context_source_names = selected_sources if selected_sources else _derive_context_sources(hits)
     try:
-        payload = generate_adaptive_quiz_question(
+        payload = await agenerate_adaptive_quiz_question(
             topic=req.topic,
             contexts=contexts,
             difficulty=difficulty,
@@ -1005,7 +1178,8 @@ def quiz_next(
     )
 
     remaining = max(total_questions - len(history), 0)
-    log_quiz_question_event(
+    await run_in_threadpool(
+        log_quiz_question_event,
         session_id,
         payload,
         total_questions,
@@ -1144,7 +1318,7 @@ def _format_rag_hits(raw_hits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         meta = hit.get("meta") or {}
         formatted.append(
             {
-                "id": meta.get("id") or meta.get("chunk_id") or f"rag-{idx}",
+                "id": hit.get("id") or meta.get("id") or meta.get("chunk_id") or f"rag-{idx}",
                 "text": text,
                 "meta": meta,
                 "score": hit.get("score"),
@@ -1167,18 +1341,18 @@ def _collect_quiz_context(
     allowed_sources = selected_sources or sources
     hits: List[Dict[str, Any]]
     if topic:
-        q_emb = embed_texts([topic])[0]
+        q_emb = embed_query(topic)
         rag_hits = _format_rag_hits(
             rag_retrieve(q_emb, top_k=limit, allowed_sources=allowed_sources, filters=filters)
         )
-        hits = rag_hits or store.similarity_search(
+        hits = rag_hits or get_vector_store().similarity_search(
             q_emb,
             top_k=limit,
             allowed_sources=allowed_sources,
             filters=filters,
         )
     else:
-        hits = store.get_all_documents(limit=limit, sources=allowed_sources, filters=filters)
+        hits = get_vector_store().get_all_documents(limit=limit, sources=allowed_sources, filters=filters)
 
     contexts = []
     for hit in hits:
@@ -1201,12 +1375,12 @@ def _collect_quiz_context(
         contexts.append(formatted)
 
     if len(contexts) < limit and source_mode == 'latest':
-        stats_snapshot = store.stats(filters=filters)
+        stats_snapshot = get_vector_store().stats(filters=filters)
         all_sources = [entry.get("source") for entry in stats_snapshot.get("sources", []) if entry.get("source")]
         fallback_sources = [src for src in all_sources if src and (src not in (selected_sources or []))]
         if fallback_sources:
             needed = limit - len(contexts)
-            supplemental_hits = store.get_all_documents(limit=needed, sources=fallback_sources, filters=filters)
+            supplemental_hits = get_vector_store().get_all_documents(limit=needed, sources=fallback_sources, filters=filters)
             for extra_hit in supplemental_hits:
                 text = extra_hit.get("text")
                 if not text:
@@ -1246,7 +1420,7 @@ def _resolve_source_selection(
     explicit_list: Optional[List[str]],
     filters: Optional[Dict[str, Any]] = None,
 ) -> List[str]:
-    stats = store.stats(filters=filters)
+    stats = get_vector_store().stats(filters=filters)
     available = [entry.get("source") for entry in stats.get("sources", []) if entry.get("source")]
     if explicit_list:
         available = [src for src in available if src in explicit_list]
@@ -1365,7 +1539,7 @@ def dashboard_overview(student_filter: Dict[str, Any] = Depends(get_student_filt
     Dashboard overview for the current student only.
     Shows only the student's own documents, activity, and metrics.
     """
-    stats_snapshot = store.stats(filters=student_filter)
+    stats_snapshot = get_vector_store().stats(filters=student_filter)
     doc_count = stats_snapshot.get("docs", 0)
     sources = stats_snapshot.get("sources", [])
     source_count = len(sources)
@@ -1528,7 +1702,7 @@ def self_test_isolation(
         pass
 
     # Visible Data
-    stats = store.stats(filters=student_filter)
+    stats = get_vector_store().stats(filters=student_filter)
     visible_sources = stats.get("sources", [])
     
     return {
@@ -0,0 +1,190 @@
+"""
+Batched Ollama embedding client.
+
+Texts are sent in batches to ``/api/embed`` over one pooled ``requests``
+session, with at most ``OLLAMA_EMBED_CONCURRENCY`` requests in flight across
+all callers. Transient failures (connection errors, timeouts, 429 and 5xx)
+are retried with exponential backoff. A batch that still fails is handed to
+the caller's fallback embedder on its own, so one bad batch does not send a
+whole document to the fallback. Servers older than ``/api/embed`` are
+detected on the first 404 and served through the per-text ``/api/embeddings``
+endpoint instead.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, TypeVar
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+OLLAMA_EMBED_BATCH = int(os.getenv("OLLAMA_EMBED_BATCH", "32"))
+OLLAMA_EMBED_CONCURRENCY = int(os.getenv("OLLAMA_EMBED_CONCURRENCY", "4"))
+OLLAMA_EMBED_RETRIES = int(os.getenv("OLLAMA_EMBED_RETRIES", "3"))
+OLLAMA_EMBED_BACKOFF = float(os.getenv("OLLAMA_EMBED_BACKOFF", "0.5"))
+OLLAMA_EMBED_TIMEOUT = float(os.getenv("OLLAMA_EMBED_TIMEOUT", "60"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+Embedder = Callable[[List[str]], List[List[float]]]
+T = TypeVar("T")
+
+
+class _Retryable(Exception):
+    """A request failed in a way worth retrying."""
+
+
+class OllamaEmbeddingClient:
+    def __init__(
+        self,
+        model: str,
+        base_url: str = OLLAMA_BASE_URL,
+        *,
+        batch_size: int = OLLAMA_EMBED_BATCH,
+        concurrency: int = OLLAMA_EMBED_CONCURRENCY,
+        retries: int = OLLAMA_EMBED_RETRIES,
+        backoff: float = OLLAMA_EMBED_BACKOFF,
+        timeout: float = OLLAMA_EMBED_TIMEOUT,
+    ):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.retries = max(0, retries)
+        self.backoff = max(0.0, backoff)
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # The executor's worker count is the global cap on in-flight requests.
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="ollama-embed")
+        self._batch_endpoint: Optional[bool] = None  # unknown until the first response
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        self._fallback_batches = 0
+
+    # --- HTTP ---
+
+    def _post(self, path: str, payload: Dict[str, object]) -> requests.Response:
+        with self._lock:
+            self._requests += 1
+        try:
+            response = self.session.post(f"{self.base_url}{path}", json=payload, timeout=self.timeout)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            raise _Retryable(str(exc)) from exc
+        if response.status_code in RETRYABLE_STATUS:
+            raise _Retryable(f"HTTP {response.status_code} from {path}")
+        return response
+
+    def _with_retries(self, call: Callable[[], T]) -> T:
+        attempt = 0
+        while True:
+            try:
+                return call()
+            except _Retryable as exc:
+                if attempt >= self.retries:
+                    raise requests.ConnectionError(f"Ollama embedding failed after {attempt + 1} attempts: {exc}") from exc
+            with self._lock:
+                self._retries += 1
+            delay = self.backoff * (2 ** attempt)
+            time.sleep(delay + random.uniform(0, delay / 2))
+            attempt += 1
+
+    def _embed_batch_endpoint(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """Embed via ``/api/embed``; None when the server does not have that endpoint."""
+        response = self._post("/api/embed", {"model": self.model, "input": texts})
+        if response.status_code == 404 and "model" not in response.text.lower():
+            return None
+        response.raise_for_status()
+        vectors = response.json().get("embeddings") or []
+        if len(vectors) != len(texts):
+            raise requests.RequestException(f"Ollama returned {len(vectors)} embeddings for {len(texts)} inputs")
+        return vectors
+
+    def _embed_single_endpoint(self, text: str) -> List[float]:
+        response = self._post("/api/embeddings", {"model": self.model, "prompt": text})
+        response.raise_for_status()
+        vector = response.json().get("embedding")
+        if not vector:
+            raise requests.RequestException("Ollama returned an empty embedding")
+        return vector
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if self._batch_endpoint is not False:
+            vectors = self._with_retries(lambda: self._embed_batch_endpoint(texts))
+            if vectors is not None:
+                self._batch_endpoint = True
+                return vectors
+            logger.info("Ollama at %s has no /api/embed; using /api/embeddings per text", self.base_url)
+            self._batch_endpoint = False
+        return [self._with_retries(lambda text=text: self._embed_single_endpoint(text)) for text in texts]
+
+    # --- Public API ---
+
+    def embed(self, texts: Sequence[str], fallback: Optional[Embedder] = None) -> List[List[float]]:
+        """
+        Embed ``texts`` in order. Batches that fail after retries go to ``fallback``;
+        without one, the first failure is raised as ``requests.RequestException``.
+        """
+        texts = list(texts)
+        batches = [texts[start:start + self.batch_size] for start in range(0, len(texts), self.batch_size)]
+        futures = [self._executor.submit(self._embed_batch, batch) for batch in batches]
+        vectors: List[List[float]] = []
+        for batch, future in zip(batches, futures):
+            try:
+                vectors.extend(future.result())
+            except requests.RequestException as exc:
+                if fallback is None:
+                    for pending in futures:
+                        pending.cancel()
+                    raise
+                logger.warning("Ollama embedding batch of %d failed; using fallback. Error: %s", len(batch), exc)
+                with self._lock:
+                    self._fallback_batches += 1
+                # Runs on the caller's thread so fallback work never occupies an HTTP slot.
+                vectors.extend(fallback(batch))
+        return vectors
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "model": self.model,
+                "batch_endpoint": self._batch_endpoint,
+                "requests": self._requests,
+                "retries": self._retries,
+                "fallback_batches": self._fallback_batches,
+            }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+
+_clients: Dict[str, OllamaEmbeddingClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_ollama_embedder(model: str) -> OllamaEmbeddingClient:
+    """Process-wide client for ``model``, created on first use."""
+    with _clients_lock:
+        client = _clients.get(model)
+        if client is None:
+            client = _clients[model] = OllamaEmbeddingClient(model)
+        return client
+
+
+def close_ollama_embedders() -> None:
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
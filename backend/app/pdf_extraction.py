@@ -0,0 +1,298 @@
+"""
+Page-parallel PDF text extraction.
+
+Pages are read from the native text layer first; only pages whose text layer
+is empty (or holds nothing but a "Scanned with ..." watermark) are rendered and
+OCR'd. Large documents are fanned out page by page to a process pool sized to
+the available cores, results are reassembled in page order, and every page
+runs under a time budget so one pathological page cannot stall the upload.
+The budget is a SIGALRM timer, which only fires on a main thread; extraction
+called from any other thread (ingest jobs) therefore always runs in the pool,
+whose workers execute tasks on their main thread.
+"""
+
+import importlib
+import logging
+import multiprocessing
+import os
+import re
+import shutil
+import signal
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or _available_cores()
+# Documents shorter than this are handled in-process on the main thread, where the page budget
+# can fire; pool start-up would cost more than it saves.
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_PAGE_TIMEOUT = float(os.getenv("PDF_PAGE_TIMEOUT", "20"))
+OCR_PAGE_TIMEOUT = float(os.getenv("OCR_PAGE_TIMEOUT", "90"))
+OCR_RENDER_SCALE = float(os.getenv("OCR_RENDER_SCALE", "2.0"))
+
+_WATERMARK_LINE = re.compile(r"^\s*scanned with\b.*$", re.IGNORECASE | re.MULTILINE)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+class PageTimeout(Exception):
+    """A single page exceeded its extraction budget."""
+
+
+def page_needs_ocr(text: str) -> bool:
+    """True when a page has no usable text layer (blank, or only a scanner watermark)."""
+    return not _WATERMARK_LINE.sub("", text or "").strip()
+
+
+def _budget_enforceable() -> bool:
+    """True where ``_page_budget`` can interrupt work: the main thread, on POSIX."""
+    return hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread()
+
+
+@contextmanager
+def _page_budget(seconds: float) -> Iterator[None]:
+    """Interrupt the enclosed work after ``seconds`` (main thread on POSIX only, otherwise a no-op)."""
+    if seconds <= 0 or not _budget_enforceable():
+        yield
+        return
+
+    def _expire(signum, frame):
+        raise PageTimeout(f"page exceeded its {seconds:g}s budget")
+
+    previous = signal.signal(signal.SIGALRM, _expire)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+# --- Per-page work (runs in pool workers, or in-process for short documents) ---
+
+# Open documents per thread: pool workers reuse them across page tasks, and in-process
+# extraction running on several ingestion threads never shares a handle.
+_worker_state = threading.local()
+
+
+def _open_documents() -> Dict[str, Tuple[object, Callable[[], None]]]:
+    if not hasattr(_worker_state, "documents"):
+        _worker_state.documents = {}
+    return _worker_state.documents
+
+
+def _open_cached(kind: str, path: str):
+    """Keep the most recently used document of each kind open between page tasks."""
+    documents = _open_documents()
+    key = f"{kind}:{path}"
+    cached = documents.get(key)
+    if cached is None:
+        for stale in [name for name in documents if name.startswith(f"{kind}:")]:
+            documents.pop(stale)[1]()
+        if kind == "text":
+            import PyPDF2
+
+            handle = open(path, "rb")
+            cached = (PyPDF2.PdfReader(handle), handle.close)
+        else:
+            document = importlib.import_module("pypdfium2").PdfDocument(path)
+            cached = (document, document.close)
+        documents[key] = cached
+    return cached[0]
+
+
+def _release_documents() -> None:
+    documents = _open_documents()
+    while documents:
+        _, (_, close) = documents.popitem()
+        close()
+
+
+def _text_page(path: str, index: int, budget: float) -> Tuple[int, str]:
+    try:
+        with _page_budget(budget):
+            reader = _open_cached("text", path)
+            return index, reader.pages[index].extract_text() or ""
+    except PageTimeout as exc:
+        logger.warning("Text extraction of page %d skipped: %s", index + 1, exc)
+    except Exception as exc:
+        logger.warning("Text extraction of page %d failed: %s", index + 1, exc)
+    return index, ""
+
+
+def _ocr_page(path: str, index: int, budget: float, scale: float) -> Tuple[int, str]:
+    pytesseract = importlib.import_module("pytesseract")
+    try:
+        with _page_budget(budget + 5 if budget > 0 else 0):
+            document = _open_cached("render", path)
+            page = document[index]
+            try:
+                render = page.render(scale=scale)
+                try:
+                    image = render.to_pil()
+                finally:
+                    render.close()
+            finally:
+                page.close()
+            # Tesseract runs as a subprocess; its own timeout kills it even where signals are unavailable.
+            return index, pytesseract.image_to_string(image, timeout=budget or 0)
+    except Exception as exc:
+        logger.warning("OCR of page %d skipped: %s", index + 1, exc)
+    return index, ""
+
+
+def ensure_pdf_dependency():
+    """Import PyPDF2, raising a descriptive RuntimeError when it is missing."""
+    try:
+        return importlib.import_module("PyPDF2")
+    except ImportError as exc:
+        raise RuntimeError("PyPDF2 is required for PDF extraction. Install it with 'pip install PyPDF2'.") from exc
+
+
+def ensure_ocr_dependencies():
+    """Import the optional OCR stack, raising a descriptive RuntimeError when a piece is missing."""
+    for module, package, purpose in (
+        ("pypdfium2", "pypdfium2", "OCR fallback"),
+        ("pytesseract", "pytesseract", "OCR fallback"),
+        ("PIL.Image", "pillow", "OCR fallback image handling"),
+    ):
+        try:
+            importlib.import_module(module)
+        except ImportError as exc:
+            raise RuntimeError(
+                f"{package} is required for {purpose}. Install it with 'pip install {package}'."
+            ) from exc
+
+
+# --- Orchestration ---
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # Spawned workers do not inherit the server's threads or loaded models.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_pages(
+    task: Callable[..., Tuple[int, str]],
+    path: str,
+    pages: List[int],
+    args: tuple,
+    workers: int,
+    on_page: Callable[[int], None],
+) -> Dict[int, str]:
+    results: Dict[int, str] = {}
+    in_process = workers <= 1 or len(pages) < PDF_PARALLEL_MIN_PAGES
+    if in_process and _budget_enforceable():
+        try:
+            for index in pages:
+                _, text = task(path, index, *args)
+                results[index] = text
+                on_page(len(results))
+        finally:
+            _release_documents()
+        return results
+
+    pool = _get_pool(max(workers, 1))
+    try:
+        futures = [pool.submit(task, path, index, *args) for index in pages]
+        for future in futures:
+            index, text = future.result()
+            results[index] = text
+            on_page(len(results))
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); start a fresh pool for the next document.
+        shutdown_pdf_pool()
+        raise
+    return results
+
+
+@contextmanager
+def _as_path(source) -> Iterator[str]:
+    """Yield a filesystem path for the PDF so worker processes can open it themselves."""
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+    handle = tempfile.NamedTemporaryFile(prefix="sca_pdf_", suffix=".pdf", delete=False)
+    try:
+        with handle:
+            if isinstance(source, (bytes, bytearray)):
+                handle.write(source)
+            else:
+                source.seek(0)
+                shutil.copyfileobj(source, handle, 1024 * 1024)
+        yield handle.name
+    finally:
+        os.unlink(handle.name)
+
+
+def extract_pdf_pages(
+    source,
+    *,
+    progress: Optional[Callable[[str, int, int], None]] = None,
+    workers: Optional[int] = None,
+) -> List[str]:
+    """
+    Return the text of every page in order, OCR-ing only pages without a text layer.
+
+    ``source`` is a path, bytes, or a readable binary stream. Raises RuntimeError when
+    PyPDF2 is missing, or when pages need OCR, the OCR dependencies are missing and no
+    page had native text.
+    """
+    workers = workers or PDF_EXTRACT_WORKERS
+    PyPDF2 = ensure_pdf_dependency()
+    with _as_path(source) as path:
+        with open(path, "rb") as handle:
+            page_count = len(PyPDF2.PdfReader(handle).pages)
+        if page_count == 0:
+            return []
+
+        def report(stage: str, total: int) -> Callable[[int], None]:
+            return lambda done: progress(stage, done, total) if progress else None
+
+        texts = _run_pages(
+            _text_page, path, list(range(page_count)), (PDF_PAGE_TIMEOUT,), workers, report("extracting", page_count)
+        )
+        scanned = [index for index in range(page_count) if page_needs_ocr(texts[index])]
+
+        if scanned:
+            try:
+                ensure_ocr_dependencies()
+            except RuntimeError:
+                if len(scanned) == page_count:
+                    raise
+                logger.warning("%d page(s) have no text layer and OCR is unavailable; skipping them", len(scanned))
+            else:
+                recognised = _run_pages(
+                    _ocr_page, path, scanned, (OCR_PAGE_TIMEOUT, OCR_RENDER_SCALE), workers, report("ocr", len(scanned))
+                )
+                for index, text in recognised.items():
+                    if text.strip():
+                        texts[index] = text
+
+    return [texts[index] for index in range(page_count)]
@@ -1,25 +1,65 @@
-"""Lightweight FAISS-backed retrieval layer for fast context lookup."""
+"""Lightweight per-tenant retrieval layer over memory-mapped segments for fast context lookup."""
 
 from __future__ import annotations
 
+import bisect
+import functools
+import hashlib
+import importlib
 import json
 import logging
 import os
+import queue
+import re
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 from threading import Lock
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 import numpy as np
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: a tenant directory is only safe for one process
+    fcntl = None  # type: ignore[assignment]
+
 logger = logging.getLogger(__name__)
 
-try:
-    import faiss  # type: ignore
-except ImportError:  # pragma: no cover - handled at runtime
-    faiss = None  # type: ignore
+
+@functools.lru_cache(maxsize=None)
+def _load_faiss() -> Any:
+    """The ``faiss`` module, imported only once an approximate index mode needs it; None when missing."""
+    try:
+        return importlib.import_module("faiss")
+    except ImportError:  # pragma: no cover - handled at runtime
+        return None
 
 
 DEFAULT_DIMENSION = int(os.getenv("RAG_EMBED_DIMENSION", "384"))
+MAX_LOADED_TENANTS = int(os.getenv("RAG_MAX_LOADED_TENANTS", "256"))
+COMPACT_MIN_SEGMENTS = int(os.getenv("RAG_COMPACT_MIN_SEGMENTS", "8"))
+COMPACT_DEAD_RATIO = float(os.getenv("RAG_COMPACT_DEAD_RATIO", "0.3"))
+# Unlisted segment directories younger than this may still be written by another process.
+STALE_SEGMENT_SECONDS = float(os.getenv("RAG_STALE_SEGMENT_SECONDS", "3600"))
+
+# Approximate nearest-neighbour modes. "flat" keeps the exact scan; the others give large
+# segments a FAISS index once they hold at least RAG_ANN_MIN_VECTORS chunks.
+INDEX_MODES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+INDEX_MODE = os.getenv("RAG_INDEX_MODE", "flat").strip().lower()
+ANN_MIN_VECTORS = int(os.getenv("RAG_ANN_MIN_VECTORS", "20000"))
+ANN_TRAIN_SAMPLE = int(os.getenv("RAG_ANN_TRAIN_SAMPLE", "65536"))
+IVF_NLIST = int(os.getenv("RAG_IVF_NLIST", "0"))  # 0 = derive from the segment size
+PQ_M = int(os.getenv("RAG_PQ_M", "0"))  # 0 = dimension / 8
+HNSW_M = int(os.getenv("RAG_HNSW_M", "32"))
+DEFAULT_NPROBE = int(os.getenv("RAG_NPROBE", "16"))
+DEFAULT_EF_SEARCH = int(os.getenv("RAG_EF_SEARCH", "64"))
+PQ_RERANK_FACTOR = 4
 _base_dir = Path(__file__).resolve().parent.parent
 _store_dir_setting = os.getenv("RAG_INDEX_DIR")
 DEFAULT_STORE_DIR = Path(_store_dir_setting) if _store_dir_setting else _base_dir / "faiss_store"
@@ -28,137 +68,982 @@ INDEX_PATH = DEFAULT_STORE_DIR / "index.faiss"
 EMBED_PATH = DEFAULT_STORE_DIR / "embeddings.npy"
 META_PATH = DEFAULT_STORE_DIR / "metadata.json"
 
+INDEX_FILE = "index.faiss"
+EMBED_FILE = "embeddings.npy"
+META_FILE = "metadata.json"
+MANIFEST_FILE = "manifest.json"
+LOCK_FILE = ".lock"
+IDS_FILE = "ids.bin"
+IDS_OFFSETS_FILE = "ids.offsets.npy"
+DELETED_FILE = "deleted.npy"
+TEXTS_FILE = "texts.bin"
+TEXT_OFFSETS_FILE = "texts.offsets.npy"
+META_BLOB_FILE = "metadata.bin"
+META_OFFSETS_FILE = "metadata.offsets.npy"
+SOURCES_FILE = "sources.json"
+SOURCE_CODES_FILE = "source_codes.npy"
+ANN_FILE = "ann.faiss"
+ANN_INFO_FILE = "ann.json"
+TENANT_KEYS = ("university", "roll_no")
 
-class RAGIndex:
-    """Thread-safe retrieval index that uses FAISS when available and falls back to NumPy search."""
+TenantKey = Tuple[Optional[str], Optional[str]]
+
+
+def _tenant_key(values: Dict[str, Any]) -> TenantKey:
+    university = values.get("university")
+    roll_no = values.get("roll_no")
+    return (
+        None if university is None else str(university),
+        None if roll_no is None else str(roll_no),
+    )
+
+
+def _tenant_dirname(key: TenantKey) -> str:
+    # Sanitized names can collide ("a.b" vs "a_b"), so suffix a digest of the raw key.
+    raw = json.dumps(list(key))
+    digest = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:10]
+    readable = "__".join(re.sub(r"[^a-zA-Z0-9_-]", "_", part or "none") for part in key)
+    return f"{readable}-{digest}"
+
+
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vecs / norms
+
+
+def _default_nlist(n_vectors: int) -> int:
+    # ~4*sqrt(n) lists, while keeping at least 39 training points per centroid as FAISS expects.
+    return max(1, min(int(4 * np.sqrt(n_vectors)), n_vectors // 39))
+
+
+def _default_pq_m(dimension: int) -> int:
+    for m in (dimension // 8, 64, 48, 32, 16, 8):
+        if m and dimension % m == 0:
+            return m
+    return 1
+
+
+def ann_index_spec(mode: str, dimension: int, n_vectors: int, nlist: int = IVF_NLIST, pq_m: int = PQ_M, hnsw_m: int = HNSW_M) -> str:
+    """Return the ``faiss.index_factory`` description for an index mode."""
+    if mode == "hnsw":
+        return f"HNSW{hnsw_m},Flat"
+    nlist = nlist or _default_nlist(n_vectors)
+    if mode == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if mode == "ivf_pq":
+        return f"IVF{nlist},PQ{pq_m or _default_pq_m(dimension)}"
+    raise ValueError(f"Unsupported approximate index mode '{mode}'. Expected one of {INDEX_MODES[1:]}.")
+
+
+def build_ann_index(
+    vectors: np.ndarray,
+    mode: str,
+    *,
+    nlist: int = IVF_NLIST,
+    pq_m: int = PQ_M,
+    hnsw_m: int = HNSW_M,
+    train_sample: int = ANN_TRAIN_SAMPLE,
+    seed: int = 0,
+):
+    """Build, train (on a random sample) and fill an inner-product FAISS index over ``vectors``."""
+    faiss = _load_faiss()
+    if faiss is None:
+        raise RuntimeError("FAISS is required for approximate index modes. Install it with 'pip install faiss-cpu'.")
+    n_vectors, dimension = vectors.shape
+    spec = ann_index_spec(mode, dimension, n_vectors, nlist=nlist, pq_m=pq_m, hnsw_m=hnsw_m)
+    index = faiss.index_factory(dimension, spec, faiss.METRIC_INNER_PRODUCT)
+    if not index.is_trained:
+        if n_vectors > train_sample:
+            rows = np.sort(np.random.default_rng(seed).choice(n_vectors, train_sample, replace=False))
+            sample = vectors[rows]
+        else:
+            sample = vectors
+        index.train(np.ascontiguousarray(sample, dtype="float32"))
+    step = 65536
+    for start in range(0, n_vectors, step):
+        index.add(np.ascontiguousarray(vectors[start:start + step], dtype="float32"))
+    return index
+
+
+def ann_search_params(mode: str, nprobe: Optional[int] = None, ef_search: Optional[int] = None, selector: Any = None):
+    """Per-query FAISS search parameters (``nprobe`` for IVF modes, ``efSearch`` for HNSW)."""
+    faiss = _load_faiss()
+    if mode == "hnsw":
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = int(ef_search or DEFAULT_EF_SEARCH)
+    else:
+        params = faiss.SearchParametersIVF()
+        params.nprobe = int(nprobe or DEFAULT_NPROBE)
+    if selector is not None:
+        params.sel = selector
+    return params
+
+
+def _fallback_ids(metadatas: Sequence[Dict[str, Any]]) -> List[str]:
+    # Mirrors the ``f"{source}_{i}"`` ids ingest_bytes assigns, for chunks stored before ids existed.
+    return [
+        meta.get("id") or meta.get("chunk_id") or f"{meta.get('source') or 'document'}_{meta.get('chunk_index', row)}"
+        for row, meta in enumerate(metadatas)
+    ]
+
+
+def _write_json_atomic(path: Path, payload: Any) -> None:
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("w", encoding="utf-8") as fh:
+        json.dump(payload, fh)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+
+
+def _new_segment_name() -> str:
+    """Segment directory name that no other thread or process can pick."""
+    return f"seg-{os.getpid()}-{uuid.uuid4().hex[:12]}"
+
+
+@contextmanager
+def _dir_lock(directory: Path, shared: bool = False) -> Iterator[None]:
+    """Hold an ``fcntl`` lock on ``directory`` across processes (a no-op where fcntl is unavailable)."""
+    if fcntl is None:
+        yield
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    with (directory / LOCK_FILE).open("a") as fh:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _publish_dir(tmp_dir: Path, directory: Path) -> None:
+    if not directory.exists():
+        os.replace(tmp_dir, directory)
+        return
+    trash = directory.with_name(f".{directory.name}.old")
+    if trash.exists():
+        shutil.rmtree(trash)
+    os.replace(directory, trash)
+    os.replace(tmp_dir, directory)
+    shutil.rmtree(trash, ignore_errors=True)
+
+
+def _pack_blob(items: Iterable[bytes]) -> Tuple[bytes, np.ndarray]:
+    parts = list(items)
+    offsets = np.zeros(len(parts) + 1, dtype="int64")
+    if parts:
+        np.cumsum([len(part) for part in parts], out=offsets[1:])
+    return b"".join(parts), offsets
+
+
+class _BlobColumn:
+    """Variable-length byte records stored as one blob plus an int64 offsets array, both memory-mapped."""
+
+    def __init__(self, blob_path: Path, offsets_path: Path) -> None:
+        self.offsets = np.load(offsets_path, mmap_mode="r")
+        size = blob_path.stat().st_size
+        self.blob = np.memmap(blob_path, dtype="uint8", mode="r") if size else np.zeros(0, dtype="uint8")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx: int) -> bytes:
+        return self.blob[int(self.offsets[idx]):int(self.offsets[idx + 1])].tobytes()
+
+    def select(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the blob bytes and lengths of ``rows`` without decoding them."""
+        if len(rows) == len(self):
+            return np.asarray(self.blob), np.diff(np.asarray(self.offsets))
+        starts = np.asarray(self.offsets)[rows]
+        ends = np.asarray(self.offsets)[rows + 1]
+        parts = [self.blob[start:end] for start, end in zip(starts, ends)]
+        return (np.concatenate(parts) if parts else np.zeros(0, dtype="uint8")), ends - starts
+
+    @staticmethod
+    def write(blob_path: Path, offsets_path: Path, blob: Any, offsets: np.ndarray) -> None:
+        with blob_path.open("wb") as fh:
+            fh.write(blob if isinstance(blob, (bytes, bytearray)) else np.asarray(blob).tobytes())
+        np.save(offsets_path, offsets.astype("int64"))
+
+
+class _Segment:
+    """Immutable batch of chunks persisted once and never rewritten in place.
+
+    Embeddings and the id/text/metadata columns are memory-mapped, so opening a segment costs the
+    same regardless of its size and every worker shares the OS page cache. Sources are kept as a
+    small dictionary plus a per-row code so source filters never decode metadata. The tombstone
+    bitmap (``deleted.npy``) is the only mutable file and is replaced atomically.
+    """
 
-    def __init__(self, dimension: int = DEFAULT_DIMENSION) -> None:
+    def __init__(self, directory: Path) -> None:
+        self.name = directory.name
+        self.directory = directory
+        self.embeddings = np.load(directory / EMBED_FILE, mmap_mode="r")
+        self.ids = _BlobColumn(directory / IDS_FILE, directory / IDS_OFFSETS_FILE)
+        self.texts = _BlobColumn(directory / TEXTS_FILE, directory / TEXT_OFFSETS_FILE)
+        self.metadatas = _BlobColumn(directory / META_BLOB_FILE, directory / META_OFFSETS_FILE)
+        with (directory / SOURCES_FILE).open("r", encoding="utf-8") as fh:
+            self.sources: List[Optional[str]] = json.load(fh)
+        self.source_codes = np.load(directory / SOURCE_CODES_FILE, mmap_mode="r")
+        deleted_path = directory / DELETED_FILE
+        self.deleted = np.load(deleted_path) if deleted_path.exists() else np.zeros(len(self.texts), dtype=bool)
+        self._ann: Any = None
+        self._ann_mode: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def dead_count(self) -> int:
+        return int(self.deleted.sum())
+
+    def chunk_id(self, idx: int) -> str:
+        return self.ids[idx].decode("utf-8")
+
+    def text(self, idx: int) -> str:
+        return self.texts[idx].decode("utf-8")
+
+    def meta(self, idx: int) -> Dict[str, Any]:
+        return json.loads(self.metadatas[idx].decode("utf-8"))
+
+    def source_mask(self, allowed: Sequence[str]) -> np.ndarray:
+        codes = [code for code, source in enumerate(self.sources) if source in allowed]
+        return np.isin(self.source_codes, codes)
+
+    def ann_index(self, mode: str) -> Any:
+        """Return this segment's FAISS index for ``mode`` if one has been built, else None."""
+        if self._ann_mode == mode:
+            return self._ann
+        info_path = self.directory / ANN_INFO_FILE
+        faiss = _load_faiss()
+        if faiss is None or not info_path.exists():
+            return None
+        try:
+            with info_path.open("r", encoding="utf-8") as fh:
+                info = json.load(fh)
+            if info.get("mode") != mode:
+                return None
+            # IVF inverted lists can be memory-mapped like the rest of the segment.
+            flags = faiss.IO_FLAG_MMAP if mode.startswith("ivf") else 0
+            self._ann = faiss.read_index(str(self.directory / ANN_FILE), flags)
+        except Exception as exc:  # pragma: no cover - resilience only
+            logger.warning("Failed to read ANN index for segment %s. Error: %s", self.directory, exc)
+            return None
+        self._ann_mode = mode
+        return self._ann
+
+    def build_ann(self, mode: str, params: Dict[str, Any]) -> None:
+        index = build_ann_index(self.embeddings, mode, **params)
+        tmp_path = self.directory / f".{ANN_FILE}.tmp"
+        _load_faiss().write_index(index, str(tmp_path))
+        os.replace(tmp_path, self.directory / ANN_FILE)
+        _write_json_atomic(self.directory / ANN_INFO_FILE, {"mode": mode, "ntotal": int(index.ntotal)})
+        self._ann = None
+        self._ann_mode = None
+
+    def reload_deleted(self) -> None:
+        """Re-read the tombstones, which another process may have extended."""
+        deleted_path = self.directory / DELETED_FILE
+        self.deleted = np.load(deleted_path) if deleted_path.exists() else np.zeros(len(self.texts), dtype=bool)
+
+    def mark_deleted(self, rows: Sequence[int]) -> None:
+        self.deleted[list(rows)] = True
+        tmp_path = self.directory / f".{DELETED_FILE}.tmp"
+        with tmp_path.open("wb") as fh:
+            np.save(fh, self.deleted)
+        os.replace(tmp_path, self.directory / DELETED_FILE)
+
+    @classmethod
+    def open(cls, directory: Path) -> "_Segment":
+        if not directory.exists() and directory.with_name(f".{directory.name}.old").exists():
+            # Interrupted between the two renames of _publish_dir; the previous copy is intact.
+            os.replace(directory.with_name(f".{directory.name}.old"), directory)
+        if not (directory / TEXTS_FILE).exists() and (directory / META_FILE).exists():
+            cls._upgrade_json_segment(directory)
+        if not (directory / IDS_FILE).exists():
+            cls._derive_ids(directory)
+        return cls(directory)
+
+    @classmethod
+    def _upgrade_json_segment(cls, directory: Path) -> None:
+        """Rewrite a segment from the earlier single-JSON layout into the columnar layout."""
+        with (directory / META_FILE).open("r", encoding="utf-8") as fh:
+            payload = json.load(fh)
+        embeddings = np.load(directory / EMBED_FILE)
+        metadatas = payload.get("metadatas", [])
+        cls.write(directory, embeddings, _fallback_ids(metadatas), payload.get("texts", []), metadatas)
+
+    @staticmethod
+    def _derive_ids(directory: Path) -> None:
+        """Add the id column to a segment written before chunks were id-addressable."""
+        column = _BlobColumn(directory / META_BLOB_FILE, directory / META_OFFSETS_FILE)
+        metadatas = [json.loads(column[idx].decode("utf-8")) for idx in range(len(column))]
+        blob, offsets = _pack_blob(chunk_id.encode("utf-8") for chunk_id in _fallback_ids(metadatas))
+        _BlobColumn.write(directory / f".{IDS_FILE}.tmp", directory / IDS_OFFSETS_FILE, blob, offsets)
+        os.replace(directory / f".{IDS_FILE}.tmp", directory / IDS_FILE)
+
+    @staticmethod
+    def _tmp_dir(directory: Path) -> Path:
+        tmp_dir = directory.with_name(f".{directory.name}.tmp")
+        if tmp_dir.exists():
+            shutil.rmtree(tmp_dir)
+        tmp_dir.mkdir(parents=True)
+        return tmp_dir
+
+    @classmethod
+    def write(
+        cls,
+        directory: Path,
+        embeddings: np.ndarray,
+        ids: Sequence[str],
+        texts: Sequence[str],
+        metadatas: Sequence[Dict[str, Any]],
+    ) -> "_Segment":
+        # Build under a temporary name and rename, so a crash never leaves a half-written segment.
+        tmp_dir = cls._tmp_dir(directory)
+        np.save(tmp_dir / EMBED_FILE, np.ascontiguousarray(embeddings, dtype="float32"))
+        for blob_name, offsets_name, values in (
+            (IDS_FILE, IDS_OFFSETS_FILE, (chunk_id.encode("utf-8") for chunk_id in ids)),
+            (TEXTS_FILE, TEXT_OFFSETS_FILE, (text.encode("utf-8") for text in texts)),
+            (META_BLOB_FILE, META_OFFSETS_FILE, (json.dumps(meta, ensure_ascii=False).encode("utf-8") for meta in metadatas)),
+        ):
+            blob, offsets = _pack_blob(values)
+            _BlobColumn.write(tmp_dir / blob_name, tmp_dir / offsets_name, blob, offsets)
+
+        sources: List[Optional[str]] = []
+        codes: Dict[Optional[str], int] = {}
+        row_codes = np.empty(len(metadatas), dtype="int32")
+        for row, meta in enumerate(metadatas):
+            source = meta.get("source")
+            if source not in codes:
+                codes[source] = len(sources)
+                sources.append(source)
+            row_codes[row] = codes[source]
+        cls._write_sources(tmp_dir, sources, row_codes)
+        _publish_dir(tmp_dir, directory)
+        return cls(directory)
+
+    @classmethod
+    def merge(cls, directory: Path, segments: Sequence["_Segment"], keep: Sequence[np.ndarray]) -> "_Segment":
+        """Concatenate the ``keep`` rows of each segment column by column, without decoding anything."""
+        tmp_dir = cls._tmp_dir(directory)
+        np.save(
+            tmp_dir / EMBED_FILE,
+            np.concatenate([np.asarray(segment.embeddings[rows]) for segment, rows in zip(segments, keep)]),
+        )
+        for blob_name, offsets_name, attr in (
+            (IDS_FILE, IDS_OFFSETS_FILE, "ids"),
+            (TEXTS_FILE, TEXT_OFFSETS_FILE, "texts"),
+            (META_BLOB_FILE, META_OFFSETS_FILE, "metadatas"),
+        ):
+            blobs: List[np.ndarray] = []
+            lengths: List[np.ndarray] = []
+            for segment, rows in zip(segments, keep):
+                blob, sizes = getattr(segment, attr).select(rows)
+                blobs.append(blob)
+                lengths.append(sizes)
+            offsets = np.zeros(sum(len(sizes) for sizes in lengths) + 1, dtype="int64")
+            np.cumsum(np.concatenate(lengths), out=offsets[1:])
+            _BlobColumn.write(tmp_dir / blob_name, tmp_dir / offsets_name, np.concatenate(blobs), offsets)
+
+        sources: List[Optional[str]] = []
+        codes: Dict[Optional[str], int] = {}
+        remapped: List[np.ndarray] = []
+        for segment, rows in zip(segments, keep):
+            mapping = np.empty(len(segment.sources), dtype="int32")
+            for local_code, source in enumerate(segment.sources):
+                if source not in codes:
+                    codes[source] = len(sources)
+                    sources.append(source)
+                mapping[local_code] = codes[source]
+            remapped.append(mapping[np.asarray(segment.source_codes)[rows]])
+        cls._write_sources(tmp_dir, sources, np.concatenate(remapped))
+        _publish_dir(tmp_dir, directory)
+        return cls(directory)
+
+    @staticmethod
+    def _write_sources(directory: Path, sources: List[Optional[str]], row_codes: np.ndarray) -> None:
+        with (directory / SOURCES_FILE).open("w", encoding="utf-8") as fh:
+            json.dump(sources, fh)
+        np.save(directory / SOURCE_CODES_FILE, row_codes.astype("int32"))
+
+
+class _TenantIndex:
+    """Retrieval partition holding the chunks of a single (university, roll_no) pair.
+
+    Chunks live in append-only segment directories; ``manifest.json`` lists the live segments
+    in row order and is the only file replaced on each write. Chunks are addressed by their
+    stable id; deleting or re-adding an id tombstones the old row until compaction drops it.
+    Search is an exact inner-product scan over the memory-mapped segment matrices, bounded by
+    this tenant's own corpus.
+
+    Several server processes may share the directory. Segment names are unique per process,
+    every manifest or tombstone change happens under an ``fcntl`` lock on the directory after
+    re-reading the manifest, and a partition reloads whenever the manifest file changes.
+    """
+
+    def __init__(
+        self,
+        key: TenantKey,
+        directory: Path,
+        dimension: int,
+        index_mode: str = "flat",
+        ann_min_vectors: int = ANN_MIN_VECTORS,
+        ann_params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.key = key
+        self.directory = directory
         self.dimension = dimension
-        self._lock = Lock()
-        self._index = self._create_index()
-        self._embeddings: Optional[np.ndarray] = None
-        self._metadatas: List[Dict[str, Any]] = []
-        self._texts: List[str] = []
+        self.index_mode = index_mode if index_mode == "flat" or _load_faiss() is not None else "flat"
+        self.ann_min_vectors = ann_min_vectors
+        self.ann_params = ann_params or {}
+        self.lock = Lock()
+        self._compact_lock = Lock()
+        self._segments: List[_Segment] = []
+        self._offsets: List[int] = [0]
+        self._id_rows: Dict[str, Tuple[_Segment, int]] = {}
+        # (inode, mtime) of the manifest the in-memory segment list was built from.
+        self._manifest_seen: Optional[Tuple[int, int]] = None
         self._load_from_disk()
 
-    def _create_index(self):
-        if faiss is None:
-            logger.warning("FAISS not installed; falling back to in-memory cosine search.")
-            return None
-        return faiss.IndexFlatIP(self.dimension)
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    @property
+    def dead_count(self) -> int:
+        return sum(segment.dead_count for segment in self._segments)
+
+    @property
+    def dead_ratio(self) -> float:
+        total = len(self)
+        return self.dead_count / total if total else 0.0
+
+    def _adopt_flat_layout(self) -> None:
+        """Turn a pre-segment partition (flat files in the tenant directory) into its first segment."""
+        if not (self.directory / EMBED_FILE).exists() or not (self.directory / META_FILE).exists():
+            return
+        first = self.directory / "seg-000001"
+        first.mkdir(parents=True, exist_ok=True)
+        for name in (EMBED_FILE, META_FILE):
+            (self.directory / name).replace(first / name)
+        (self.directory / INDEX_FILE).unlink(missing_ok=True)
+        _write_json_atomic(self.directory / MANIFEST_FILE, {"key": list(self.key), "segments": [first.name]})
 
     def _load_from_disk(self) -> None:
-        if faiss is not None and INDEX_PATH.exists():
+        if not self.directory.exists():
+            return
+        with _dir_lock(self.directory):
+            if not (self.directory / MANIFEST_FILE).exists():
+                self._adopt_flat_layout()
+            self._sync()
+            self._remove_stale_dirs()
+
+    def _remove_stale_dirs(self) -> None:
+        """Delete leftovers of interrupted writes or compactions (caller holds the directory lock).
+
+        A directory the manifest does not list may be a segment another process is still writing
+        or about to publish, so only ones untouched for ``STALE_SEGMENT_SECONDS`` are removed.
+        """
+        listed = {segment.name for segment in self._segments}
+        cutoff = time.time() - STALE_SEGMENT_SECONDS
+        for path in self.directory.iterdir():
+            if path.is_dir() and path.name not in listed and path.stat().st_mtime < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _manifest_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = (self.directory / MANIFEST_FILE).stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _sync(self) -> None:
+        """Rebuild the segment list from the manifest if it changed on disk (caller holds ``lock``)."""
+        signature = self._manifest_signature()
+        if signature is None or signature == self._manifest_seen:
+            return
+        try:
+            with (self.directory / MANIFEST_FILE).open("r", encoding="utf-8") as fh:
+                manifest = json.load(fh)
+        except Exception as exc:  # pragma: no cover
+            logger.warning("Failed to read RAG manifest for %s; keeping the loaded copy. Error: %s", self.key, exc)
+            return
+
+        loaded = {segment.name: segment for segment in self._segments}
+        segments: List[_Segment] = []
+        for name in manifest.get("segments", []):
             try:
-                self._index = faiss.read_index(str(INDEX_PATH))
+                segment = loaded.get(name)
+                if segment is None:
+                    segment = _Segment.open(self.directory / name)
+                else:
+                    segment.reload_deleted()
+                segments.append(segment)
             except Exception as exc:  # pragma: no cover - resilience only
-                logger.warning("Failed to read FAISS index; starting fresh. Error: %s", exc)
-                self._index = self._create_index()
+                logger.warning("Skipping unreadable RAG segment %s for %s. Error: %s", name, self.key, exc)
+        self._set_segments(segments)
+        self._manifest_seen = signature
 
-        if EMBED_PATH.exists():
-            try:
-                self._embeddings = np.load(EMBED_PATH)
-            except Exception as exc:  # pragma: no cover
-                logger.warning("Failed to load cached embeddings; rebuilding. Error: %s", exc)
-                self._embeddings = None
+    def _refresh(self) -> None:
+        """Pick up writes made by other processes since the last look (caller holds ``lock``)."""
+        if self._manifest_signature() != self._manifest_seen:
+            # Shared, so a concurrent compaction cannot delete segments while they are opened.
+            with _dir_lock(self.directory, shared=True):
+                self._sync()
 
-        if META_PATH.exists():
-            try:
-                with META_PATH.open("r", encoding="utf-8") as fh:
-                    payload = json.load(fh)
-                self._texts = payload.get("texts", [])
-                self._metadatas = payload.get("metadatas", [])
-            except Exception as exc:  # pragma: no cover
-                logger.warning("Failed to load metadata cache; starting empty. Error: %s", exc)
-                self._texts = []
-                self._metadatas = []
-
-        if self._index is None and self._embeddings is None and self._texts:
-            # ensure embeddings array matches metadata length when FAISS unavailable
-            self._embeddings = np.zeros((0, self.dimension), dtype="float32")
-
-    def _persist(self) -> None:
-        if self._index is not None:
-            try:
-                faiss.write_index(self._index, str(INDEX_PATH))  # type: ignore[arg-type]
-            except Exception as exc:  # pragma: no cover
-                logger.warning("Failed to persist FAISS index. Error: %s", exc)
-        if self._embeddings is not None:
+    def _set_segments(self, segments: Sequence[_Segment]) -> None:
+        self._segments = []
+        self._offsets = [0]
+        self._id_rows = {}
+        for segment in segments:
+            self._append_segment(segment)
+
+    def _append_segment(self, segment: _Segment) -> None:
+        self._segments.append(segment)
+        self._offsets.append(self._offsets[-1] + len(segment))
+        for row in np.flatnonzero(~segment.deleted):
+            self._id_rows[segment.chunk_id(int(row))] = (segment, int(row))
+
+    def _write_manifest(self) -> None:
+        """Replace the manifest (caller holds ``lock`` and the directory lock)."""
+        _write_json_atomic(
+            self.directory / MANIFEST_FILE,
+            {"key": list(self.key), "segments": [segment.name for segment in self._segments]},
+        )
+        self._manifest_seen = self._manifest_signature()
+
+    def _tombstone(self, locations: Iterable[Tuple[_Segment, int]]) -> int:
+        by_segment: Dict[str, Tuple[_Segment, List[int]]] = {}
+        for segment, row in locations:
+            by_segment.setdefault(segment.name, (segment, []))[1].append(row)
+        for segment, rows in by_segment.values():
+            segment.mark_deleted(rows)
+        return sum(len(rows) for _, rows in by_segment.values())
+
+    def add(
+        self,
+        embeddings: np.ndarray,
+        ids: List[str],
+        texts: List[str],
+        metadatas: List[Dict[str, Any]],
+    ) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # The segment write is O(batch) and happens outside the locks; searches keep running.
+        segment = _Segment.write(self.directory / _new_segment_name(), embeddings, ids, texts, metadatas)
+        with self.lock, _dir_lock(self.directory):
+            self._sync()
+            # Re-adding an id is an update: the previous row becomes a tombstone.
+            replaced = [self._id_rows[chunk_id] for chunk_id in ids if chunk_id in self._id_rows]
+            self._tombstone(replaced)
+            self._append_segment(segment)
+            self._write_manifest()
+
+    def delete(self, ids: Optional[Sequence[str]] = None, source: Optional[str] = None) -> int:
+        with self.lock, _dir_lock(self.directory):
+            self._sync()
+            locations: List[Tuple[_Segment, int]] = []
+            if ids:
+                locations.extend(self._id_rows[chunk_id] for chunk_id in ids if chunk_id in self._id_rows)
+            if source is not None:
+                for segment in self._segments:
+                    rows = np.flatnonzero(segment.source_mask([source]) & ~segment.deleted)
+                    locations.extend((segment, int(row)) for row in rows)
+            unique = {(segment.name, row): (segment, row) for segment, row in locations}
+            for segment, row in unique.values():
+                self._id_rows.pop(segment.chunk_id(row), None)
+            removed = self._tombstone(unique.values())
+            if removed:
+                # Same segments; rewriting the manifest tells other processes to reload tombstones.
+                self._write_manifest()
+            return removed
+
+    def compact(self) -> bool:
+        """Merge segments and drop tombstoned rows; returns False when there is nothing to do."""
+        with self._compact_lock:
+            with self.lock:
+                self._refresh()
+                snapshot = list(self._segments)
+                deleted_before = [segment.deleted.copy() for segment in snapshot]
+            if len(snapshot) < 2 and not any(mask.any() for mask in deleted_before):
+                return False
+
+            keep = [np.flatnonzero(~mask) for mask in deleted_before]
+            merged = _Segment.merge(self.directory / _new_segment_name(), snapshot, keep)
+
+            with self.lock, _dir_lock(self.directory):
+                self._sync()
+                # Appends (from any process) only extend the list; anything else means another
+                # process compacted these segments meanwhile, and its result wins.
+                if [segment.name for segment in self._segments[:len(snapshot)]] != [s.name for s in snapshot]:
+                    shutil.rmtree(merged.directory, ignore_errors=True)
+                    return False
+
+                # Rows deleted while the merge ran must stay deleted in the merged segment.
+                late: List[int] = []
+                base = 0
+                for segment, before, rows in zip(snapshot, deleted_before, keep):
+                    newly = segment.deleted[rows] & ~before[rows]
+                    late.extend(int(pos) + base for pos in np.flatnonzero(newly))
+                    base += len(rows)
+                if late:
+                    merged.mark_deleted(late)
+
+                self._set_segments([merged] + self._segments[len(snapshot):])
+                self._write_manifest()
+                # Under the lock, so no process is opening them from the previous manifest.
+                for segment in snapshot:
+                    shutil.rmtree(self.directory / segment.name, ignore_errors=True)
+            return True
+
+    def pending_ann_segments(self) -> List[_Segment]:
+        if self.index_mode == "flat":
+            return []
+        with self.lock:
+            return [
+                segment
+                for segment in self._segments
+                if len(segment) >= self.ann_min_vectors and segment.ann_index(self.index_mode) is None
+            ]
+
+    def ensure_ann(self) -> int:
+        """Train and persist ANN indexes for large segments that lack one; returns how many were built."""
+        with self._compact_lock:
+            pending = self.pending_ann_segments()
+            for segment in pending:
+                segment.build_ann(self.index_mode, self.ann_params)
+            return len(pending)
+
+    def _locate(self, row: int) -> Tuple[_Segment, int]:
+        pos = bisect.bisect_right(self._offsets, row) - 1
+        return self._segments[pos], row - self._offsets[pos]
+
+    def _search_ann(
+        self,
+        segment: _Segment,
+        index: Any,
+        query: np.ndarray,
+        mask: np.ndarray,
+        fetch: int,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        selector = None
+        if not mask.all():
+            selector = _load_faiss().IDSelectorBatch(np.flatnonzero(mask).astype("int64"))
+        params = ann_search_params(self.index_mode, nprobe=nprobe, ef_search=ef_search, selector=selector)
+        if self.index_mode == "ivf_pq":
+            fetch *= PQ_RERANK_FACTOR
+        _, indices = index.search(query, min(fetch, len(segment)), params=params)
+        rows = indices[0][indices[0] >= 0]
+        # Re-score candidates exactly so results merge cleanly with flat-scanned segments.
+        return rows, np.asarray(segment.embeddings[rows]) @ query.squeeze(0)
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        allowed_sources: Optional[Sequence[str]],
+        extra_filters: Dict[str, Any],
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        with self.lock:
+            self._refresh()
+            if not len(self):
+                return []
+            vector = query.squeeze(0)
+            # Over-fetch when metadata filters are applied after scoring.
+            fetch = top_k * 4 if extra_filters else top_k
+            all_scores: List[np.ndarray] = []
+            all_rows: List[np.ndarray] = []
+            for segment, base in zip(self._segments, self._offsets):
+                if not len(segment):
+                    continue
+                mask = ~segment.deleted
+                if allowed_sources:
+                    mask &= segment.source_mask(allowed_sources)
+                index = segment.ann_index(self.index_mode) if self.index_mode != "flat" else None
+                if index is not None:
+                    if not mask.any():
+                        continue
+                    rows, scores = self._search_ann(segment, index, query, mask, fetch, nprobe, ef_search)
+                elif mask.all():
+                    rows = np.arange(len(segment))
+                    scores = segment.embeddings @ vector
+                else:
+                    rows = np.flatnonzero(mask)
+                    if not len(rows):
+                        continue
+                    scores = segment.embeddings[rows] @ vector
+                all_scores.append(scores)
+                all_rows.append(rows + base)
+            if not all_scores:
+                return []
+
+            scores = np.concatenate(all_scores)
+            rows = np.concatenate(all_rows)
+            order = np.argsort(scores)[::-1]
+            hits: List[Dict[str, Any]] = []
+            for pos in order:
+                hit = self._hit(int(rows[pos]), float(scores[pos]))
+                meta = hit["meta"]
+                if extra_filters and not all(meta.get(k) == v for k, v in extra_filters.items()):
+                    continue
+                hits.append(hit)
+                if len(hits) >= top_k:
+                    break
+            return hits
+
+    def _hit(self, row: int, score: float) -> Dict[str, Any]:
+        segment, local = self._locate(row)
+        return {
+            "id": segment.chunk_id(local),
+            "text": segment.text(local),
+            "meta": segment.meta(local),
+            "score": score,
+        }
+
+
+class _Compactor:
+    """Daemon thread that merges tenant segments off the request path."""
+
+    def __init__(self, owner: "RAGIndex") -> None:
+        self._owner = weakref.ref(owner)
+        self._queue: "queue.Queue[Optional[TenantKey]]" = queue.Queue()
+        self._pending: set = set()
+        self._pending_lock = Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, key: TenantKey) -> None:
+        with self._pending_lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="rag-compactor", daemon=True)
+                self._thread.start()
+        self._queue.put(key)
+
+    def stop(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        while True:
+            key = self._queue.get()
+            if key is None:
+                return
+            with self._pending_lock:
+                self._pending.discard(key)
+            owner = self._owner()
+            if owner is None:
+                return
             try:
-                np.save(EMBED_PATH, self._embeddings)
-            except Exception as exc:  # pragma: no cover
-                logger.warning("Failed to persist cached embeddings. Error: %s", exc)
+                owner.compact(key)
+            except Exception as exc:  # pragma: no cover - background resilience
+                logger.warning("RAG compaction failed for %s. Error: %s", key, exc)
+            finally:
+                del owner
+
+
+class RAGIndex:
+    """Thread-safe retrieval index partitioned per tenant, with lazily loaded LRU-cached partitions."""
+
+    def __init__(
+        self,
+        dimension: int = DEFAULT_DIMENSION,
+        store_dir: Path = DEFAULT_STORE_DIR,
+        max_loaded_tenants: int = MAX_LOADED_TENANTS,
+        compact_min_segments: int = COMPACT_MIN_SEGMENTS,
+        compact_dead_ratio: float = COMPACT_DEAD_RATIO,
+        background_compaction: bool = True,
+        index_mode: str = INDEX_MODE,
+        ann_min_vectors: int = ANN_MIN_VECTORS,
+        ann_params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        if index_mode not in INDEX_MODES:
+            raise ValueError(f"Unsupported RAG index mode '{index_mode}'. Expected one of {INDEX_MODES}.")
+        if index_mode != "flat" and _load_faiss() is None:
+            logger.warning("FAISS is not installed; RAG index mode '%s' falls back to exact search.", index_mode)
+            index_mode = "flat"
+        self.dimension = dimension
+        self.index_mode = index_mode
+        self.ann_min_vectors = max(1, ann_min_vectors)
+        self.ann_params = ann_params or {}
+        self.store_dir = Path(store_dir)
+        self.tenants_dir = self.store_dir / "tenants"
+        self.max_loaded_tenants = max(1, max_loaded_tenants)
+        self.compact_min_segments = max(2, compact_min_segments)
+        self.compact_dead_ratio = compact_dead_ratio
+        self._compactor = _Compactor(self) if background_compaction else None
+        self._lock = Lock()
+        self._tenants: "OrderedDict[TenantKey, _TenantIndex]" = OrderedDict()
+        # Evicted partitions still referenced by an in-flight request are reused rather than
+        # reloaded, so two copies of one tenant never write over each other.
+        self._live: "weakref.WeakValueDictionary[TenantKey, _TenantIndex]" = weakref.WeakValueDictionary()
+        self.tenants_dir.mkdir(parents=True, exist_ok=True)
+        self._migrate_global_index()
+
+    def _tenant_dir(self, key: TenantKey) -> Path:
+        return self.tenants_dir / _tenant_dirname(key)
+
+    def _get_tenant(self, key: TenantKey, create: bool = False) -> Optional[_TenantIndex]:
+        with self._lock:
+            tenant = self._tenants.get(key)
+            if tenant is not None:
+                self._tenants.move_to_end(key)
+                return tenant
+            tenant = self._live.get(key)
+            if tenant is None:
+                directory = self._tenant_dir(key)
+                if not create and not directory.exists():
+                    return None
+                tenant = _TenantIndex(
+                    key,
+                    directory,
+                    self.dimension,
+                    index_mode=self.index_mode,
+                    ann_min_vectors=self.ann_min_vectors,
+                    ann_params=self.ann_params,
+                )
+                self._live[key] = tenant
+            self._tenants[key] = tenant
+            while len(self._tenants) > self.max_loaded_tenants:
+                # Partitions are persisted on every write, so eviction only drops the cached copy.
+                self._tenants.popitem(last=False)
+            return tenant
+
+    def _migrate_global_index(self) -> None:
+        """Split a pre-partitioning single-file index into per-tenant partitions (one time)."""
+        legacy_meta = self.store_dir / META_FILE
+        legacy_embed = self.store_dir / EMBED_FILE
+        if not legacy_meta.exists():
+            return
         try:
-            with META_PATH.open("w", encoding="utf-8") as fh:
-                json.dump({"texts": self._texts, "metadatas": self._metadatas}, fh)
+            with legacy_meta.open("r", encoding="utf-8") as fh:
+                payload = json.load(fh)
+            embeddings = np.load(legacy_embed) if legacy_embed.exists() else None
         except Exception as exc:  # pragma: no cover
-            logger.warning("Failed to persist metadata cache. Error: %s", exc)
+            logger.warning("Failed to read legacy RAG index; skipping migration. Error: %s", exc)
+            return
 
-    @staticmethod
-    def _normalize(vecs: np.ndarray) -> np.ndarray:
-        norms = np.linalg.norm(vecs, axis=1, keepdims=True)
-        norms[norms == 0] = 1
-        return vecs / norms
+        texts = payload.get("texts", [])
+        metadatas = payload.get("metadatas", [])
+        if embeddings is not None and len(embeddings) == len(texts):
+            docs = [
+                {"text": text, "meta": meta, "embedding": vector}
+                for text, meta, vector in zip(texts, metadatas, embeddings)
+            ]
+            migrated = self.add_documents(docs)
+            logger.info("Migrated %d chunks from the global RAG index into tenant partitions", migrated)
+        else:
+            logger.warning("Legacy RAG index is inconsistent; discarding %d cached chunks", len(texts))
+
+        legacy_dir = self.store_dir / "legacy"
+        legacy_dir.mkdir(exist_ok=True)
+        for name in (INDEX_FILE, EMBED_FILE, META_FILE):
+            path = self.store_dir / name
+            if path.exists():
+                path.replace(legacy_dir / name)
 
     def add_documents(self, docs: Iterable[Dict[str, Any]]) -> int:
-        batch: List[Dict[str, Any]] = [doc for doc in docs if doc.get("embedding")]
+        batch: List[Dict[str, Any]] = [doc for doc in docs if doc.get("embedding") is not None]
         if not batch:
             return 0
 
-        embeddings = np.vstack([
-            np.asarray(doc["embedding"], dtype="float32") for doc in batch
-        ])
-        embeddings = self._normalize(embeddings)
-        texts = [doc.get("text", "") for doc in batch]
-        metadatas = [doc.get("meta", {}) for doc in batch]
+        grouped: Dict[TenantKey, List[Dict[str, Any]]] = {}
+        for doc in batch:
+            grouped.setdefault(_tenant_key(doc.get("meta") or {}), []).append(doc)
 
-        with self._lock:
-            if self._index is not None:
-                self._index.add(embeddings)
-            if self._embeddings is None:
-                self._embeddings = embeddings
-            else:
-                self._embeddings = np.vstack([self._embeddings, embeddings])
-            self._texts.extend(texts)
-            self._metadatas.extend(metadatas)
-            self._persist()
+        for key, tenant_docs in grouped.items():
+            embeddings = np.vstack([
+                np.asarray(doc["embedding"], dtype="float32") for doc in tenant_docs
+            ])
+            embeddings = _normalize(embeddings).astype("float32")
+            texts = [doc.get("text", "") for doc in tenant_docs]
+            metadatas = [doc.get("meta") or {} for doc in tenant_docs]
+            fallback = _fallback_ids(metadatas)
+            ids = [str(doc.get("id") or fallback[row]) for row, doc in enumerate(tenant_docs)]
+            tenant = self._get_tenant(key, create=True)
+            tenant.add(embeddings, ids, texts, metadatas)  # type: ignore[union-attr]
+            self._maybe_compact(key, tenant)  # type: ignore[arg-type]
 
         return len(batch)
 
+    def delete(
+        self,
+        ids: Optional[Sequence[str]] = None,
+        source: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> int:
+        """Tombstone chunks by id and/or source inside the tenant named by ``filters``."""
+        if not filters or "university" not in filters or "roll_no" not in filters:
+            raise RuntimeError(f"CRITICAL: Filters (university, roll_no) are mandatory for multi-tenant isolation. Got: {filters}")
+        if not ids and source is None:
+            return 0
+        key = _tenant_key(filters)
+        tenant = self._get_tenant(key)
+        if tenant is None:
+            return 0
+        removed = tenant.delete(ids=ids, source=source)
+        if removed:
+            self._maybe_compact(key, tenant)
+        return removed
+
+    def _maybe_compact(self, key: TenantKey, tenant: _TenantIndex) -> None:
+        if self._compactor is None:
+            return
+        if (
+            tenant.segment_count >= self.compact_min_segments
+            or tenant.dead_ratio >= self.compact_dead_ratio
+            or tenant.pending_ann_segments()
+        ):
+            self._compactor.schedule(key)
+
+    def compact(self, key: Optional[TenantKey] = None) -> int:
+        """Synchronously compact one tenant (or every tenant on disk); returns tenants compacted.
+
+        Large segments that lack an approximate index for the configured mode get one trained here,
+        so the expensive build never runs on the request path.
+        """
+        if key is not None:
+            tenant = self._get_tenant(key)
+            if tenant is None:
+                return 0
+            compacted = tenant.compact()
+            tenant.ensure_ann()
+            return int(bool(compacted))
+
+        compacted = 0
+        for path in self.tenants_dir.iterdir():
+            manifest_path = path / MANIFEST_FILE
+            if not manifest_path.exists():
+                continue
+            with manifest_path.open("r", encoding="utf-8") as fh:
+                tenant_key = tuple(json.load(fh).get("key") or (None, None))
+            compacted += self.compact(tenant_key)  # type: ignore[arg-type]
+        return compacted
+
+    def close(self) -> None:
+        if self._compactor is not None:
+            self._compactor.stop()
+
     def reset(self) -> None:
         with self._lock:
-            self._index = self._create_index()
-            self._embeddings = None
-            self._texts = []
-            self._metadatas = []
-            for path in (INDEX_PATH, EMBED_PATH, META_PATH):
-                if path.exists():
-                    try:
-                        path.unlink()
-                    except OSError:
-                        logger.warning("Unable to delete %s during reset", path)
-
-    def _search_numpy(
-        self,
-        query: np.ndarray,
-        top_k: int,
-        allowed_sources: Optional[Sequence[str]],
-    ) -> List[Tuple[int, float]]:
-        if self._embeddings is None or not len(self._texts):
-            return []
-        scores = self._embeddings @ query
-        order = scores.argsort()[::-1]
-        results: List[Tuple[int, float]] = []
-        for idx in order[:top_k * 5]:
-            meta = self._metadatas[idx] if idx < len(self._metadatas) else {}
-            if allowed_sources:
-                source = meta.get("source")
-                if source not in allowed_sources:
-                    continue
-            results.append((int(idx), float(scores[idx])))
-            if len(results) >= top_k:
-                break
-        return results
+            self._tenants.clear()
+            self._live.clear()
+            if self.tenants_dir.exists():
+                try:
+                    shutil.rmtree(self.tenants_dir)
+                except OSError:
+                    logger.warning("Unable to delete %s during reset", self.tenants_dir)
+            self.tenants_dir.mkdir(parents=True, exist_ok=True)
 
     def search(
         self,
@@ -166,84 +1051,66 @@ class RAGIndex:
         top_k: int = 5,
         allowed_sources: Optional[Sequence[str]] = None,
         filters: Optional[Dict[str, Any]] = None,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
     ) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` chunks of one tenant; ``nprobe``/``ef_search`` tune approximate modes."""
         if not filters or "university" not in filters or "roll_no" not in filters:
             raise RuntimeError(f"CRITICAL: Filters (university, roll_no) are mandatory for multi-tenant isolation. Got: {filters}")
 
-        if not query_embedding:
+        if query_embedding is None or not len(query_embedding):
             return []
         query = np.asarray(query_embedding, dtype="float32").reshape(1, -1)
-        query = self._normalize(query)
+        query = _normalize(query).astype("float32")
 
-        def check_filters(meta: Dict[str, Any]) -> bool:
-            if allowed_sources and meta.get("source") not in allowed_sources:
-                return False
-            # filters is guaranteed not None here
-            for k, v in filters.items():
-                 if meta.get(k) != v:
-                     return False
-            return True
+        tenant = self._get_tenant(_tenant_key(filters))
+        if tenant is None:
+            return []
+        extra_filters = {k: v for k, v in filters.items() if k not in TENANT_KEYS}
+        return tenant.search(query, top_k, allowed_sources, extra_filters, nprobe=nprobe, ef_search=ef_search)
 
+    def stats(self) -> Dict[str, Any]:
         with self._lock:
-            if self._index is not None and self._index.ntotal > 0:
-                distances, indices = self._index.search(query, top_k * 10) # Fetch more to allow for filtering
-                hits: List[Dict[str, Any]] = []
-                for raw_idx, score in zip(indices[0], distances[0]):
-                    if raw_idx < 0:
-                        continue
-                    meta = self._metadatas[raw_idx] if raw_idx < len(self._metadatas) else {}
-                    
-                    if not check_filters(meta):
-                        continue
+            loaded = list(self._tenants.values())
+        return {
+            "tenants": sum(1 for path in self.tenants_dir.iterdir() if path.is_dir()),
+            "loaded_tenants": len(loaded),
+            "loaded_chunks": sum(len(tenant) for tenant in loaded),
+            "loaded_segments": sum(tenant.segment_count for tenant in loaded),
+            "loaded_dead_chunks": sum(tenant.dead_count for tenant in loaded),
+            "index_mode": self.index_mode,
+        }
 
-                    hits.append(
-                        {
-                            "text": self._texts[raw_idx],
-                            "meta": meta,
-                            "score": float(score),
-                        }
-                    )
-                    if len(hits) >= top_k:
-                        break
-                if hits:
-                    return hits
-
-            # Fall back to numpy search when FAISS unavailable or returns nothing
-            # Simplified fallback logic reuse isn't easy without duplicating the filter check
-            # So generic implementation below for fallback:
-            if self._embeddings is None or not len(self._texts):
-                return []
-            
-            scores = self._embeddings @ query.squeeze(0)
-            order = scores.argsort()[::-1]
-            fallback_hits: List[Dict[str, Any]] = []
-            
-            for idx in order:
-                meta = self._metadatas[idx] if idx < len(self._metadatas) else {}
-                if not check_filters(meta):
-                    continue
-                
-                fallback_hits.append({
-                    "text": self._texts[idx],
-                    "meta": meta,
-                    "score": float(scores[idx])
-                })
-                if len(fallback_hits) >= top_k:
-                    break
-            
-            return fallback_hits
+
+_rag_index: Optional[RAGIndex] = None
+_rag_index_lock = Lock()
 
 
-_rag_index = RAGIndex()
+def get_rag_index() -> RAGIndex:
+    """Process-wide index, opened (migration, compactor thread) on first use rather than at import."""
+    global _rag_index
+    with _rag_index_lock:
+        if _rag_index is None:
+            _rag_index = RAGIndex()
+        return _rag_index
 
 
 def add_to_index(docs: Iterable[Dict[str, Any]]) -> int:
     """Add documents (text + embedding + metadata) to the persistent index."""
-    return _rag_index.add_documents(docs)
+    return get_rag_index().add_documents(docs)
+
+
+def remove_from_index(
+    source: Optional[str] = None,
+    ids: Optional[Sequence[str]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+) -> int:
+    """Tombstone a tenant's chunks by source and/or chunk id; returns the number removed."""
+    return get_rag_index().delete(ids=ids, source=source, filters=filters)
 
 
 def reset_index() -> None:
-    _rag_index.reset()
+    get_rag_index().reset()
 
 
 def retrieve(
@@ -251,8 +1118,17 @@ def retrieve(
     top_k: int = 5,
     allowed_sources: Optional[Sequence[str]] = None,
     filters: Optional[Dict[str, Any]] = None,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
 ) -> List[Dict[str, Any]]:
-    return _rag_index.search(query_embedding, top_k=top_k, allowed_sources=allowed_sources, filters=filters)
+    return get_rag_index().search(
+        query_embedding,
+        top_k=top_k,
+        allowed_sources=allowed_sources,
+        filters=filters,
+        nprobe=nprobe,
+        ef_search=ef_search,
+    )
 
 
 def retrieve_texts(
@@ -260,14 +1136,24 @@ def retrieve_texts(
     top_k: int = 5,
     allowed_sources: Optional[Sequence[str]] = None,
     filters: Optional[Dict[str, Any]] = None,
+    nprobe: Optional[int] = None,
+    ef_search: Optional[int] = None,
 ) -> List[str]:
-    hits = retrieve(query_embedding, top_k=top_k, allowed_sources=allowed_sources, filters=filters)
+    hits = retrieve(
+        query_embedding,
+        top_k=top_k,
+        allowed_sources=allowed_sources,
+        filters=filters,
+        nprobe=nprobe,
+        ef_search=ef_search,
+    )
     return [hit.get("text", "") for hit in hits if hit.get("text")]
 
 
 def dump_metadata() -> Dict[str, Any]:
+    index = get_rag_index()
     return {
-        "count": len(_rag_index._texts),  # type: ignore[attr-defined]
-        "dimension": _rag_index.dimension,
-        "index_path": str(INDEX_PATH.resolve()),
+        **index.stats(),
+        "dimension": index.dimension,
+        "index_path": str(index.tenants_dir.resolve()),
     }
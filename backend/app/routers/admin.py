@@ -4,6 +4,10 @@ import sqlite3
 from app.routers.auth import get_db_connection
 from app.dependencies import ensure_admin, get_student_filter
 from app.models.student import Student
+from app.content_cache import get_content_cache
+from app.chunk_embeddings import CHUNK_EMBED_CACHE_ENABLED, chunk_embedding_stats
+from app.vector_store import vector_store_stats
+from app.analytics import analytics_writer_stats
 from typing import Optional
 
 router = APIRouter()
@@ -289,3 +293,45 @@ async def delete_user(
         }
     finally:
         conn.close()
+
+@router.get("/content-cache")
+def content_cache_stats(admin_user: Student = Depends(ensure_admin)):
+    """
+    Admin-only view of the content-addressed extraction/embedding cache.
+    """
+    cache = get_content_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@router.get("/chunk-embeddings")
+def chunk_embedding_store_stats(admin_user: Student = Depends(ensure_admin)):
+    """
+    Admin-only view of the shared chunk embedding dedup store (one entry per embedding model in use).
+    """
+    return {"enabled": CHUNK_EMBED_CACHE_ENABLED, "stores": chunk_embedding_stats()}
+
+@router.get("/vector-stores")
+def vector_store_registry_stats(admin_user: Student = Depends(ensure_admin)):
+    """
+    Admin-only view of the open Chroma clients: collections, disk usage and file handles held.
+    """
+    return vector_store_stats()
+
+@router.get("/analytics-writer")
+def analytics_writer_status(admin_user: Student = Depends(ensure_admin)):
+    """
+    Admin-only view of the background analytics writer: queue depth, batches written and events dropped.
+    """
+    return analytics_writer_stats()
+
+@router.delete("/content-cache")
+def purge_content_cache(admin_user: Student = Depends(ensure_admin)):
+    """
+    Admin-only endpoint to empty the content cache.
+    Uploads afterwards are extracted and embedded from scratch until the cache refills.
+    """
+    cache = get_content_cache()
+    if cache is None:
+        return {"status": "disabled", "entries_removed": 0, "bytes_freed": 0}
+    return {"status": "success", **cache.purge()}
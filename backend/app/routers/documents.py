@@ -1,21 +1,26 @@
 import os
 import time
 import hashlib
-from typing import Dict, Any, List, Optional, Union
+from typing import Callable, Dict, Any, List, Optional, Union
 from datetime import datetime
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import sqlite3
 
 from app.models.student import Student
 from app.routers.auth import get_current_user, get_db_connection
 from app.dependencies import get_student_filter
-from app.vector_store import ChromaVectorStore
-from app.ingest import ingest_pdf_bytes, embed_texts
-from app.utils import generate_summary, generate_answer_with_context
+from app.vector_store import get_vector_store
+from app.ingest import FileData, ingest_pdf_bytes, embed_query
+from app.ingest_jobs import IngestJobManager, IngestQueueFull
+from app.uploads import UploadTooLarge, file_sha256, mapped_file, spool_upload, student_upload_dir
+from app.rag import remove_from_index
+from app.analytics import log_summary_event, resolve_session_id
+from app.utils import generate_summary, generate_answer_with_context, astream_summary
+from app.streaming import sse_event, sse_response, stream_message
 
 router = APIRouter()
-store = ChromaVectorStore()
 
 # --- Models ---
 class DocumentChunk(BaseModel):
@@ -48,19 +53,16 @@ def calculate_difficulty(text: str) -> str:
 def calculate_file_hash(content: bytes) -> str:
     return hashlib.sha256(content).hexdigest()
 
-@router.post("/ingest-file")
-async def ingest_file(
-    request: Request,
-    file: UploadFile = File(...),
-    course: Optional[str] = None,
-    current_user: Student = Depends(get_current_user),
-    student_filter: Dict[str, Any] = Depends(get_student_filter),
-    force_upload: bool = Query(False)
-):
-    start_time = time.perf_counter()
-    content = await file.read()
+def _run_ingest_job(job: Dict[str, Any], progress: Callable[[str, int, int], None]) -> Dict[str, Any]:
+    """Ingestion pipeline for one queued upload; the return value becomes the job result."""
+    with mapped_file(job["upload_path"]) as content:
+        return _ingest_spooled_upload(job, content, progress)
+
+
+def _ingest_spooled_upload(job: Dict[str, Any], content: FileData, progress: Callable[[str, int, int], None]) -> Dict[str, Any]:
+    university, roll_no, filename = job["university"], job["roll_no"], job["filename"]
     file_size = len(content)
-    file_hash = calculate_file_hash(content)
+    file_hash = job.get("file_hash") or file_sha256(job["upload_path"])
     
     conn = get_db_connection()
     cursor = conn.cursor()
@@ -69,18 +71,18 @@ async def ingest_file(
         # Check Name Duplicate
         cursor.execute(
             "SELECT id, content_hash, version_number, storage_path FROM documents WHERE university=? AND roll_no=? AND filename=? AND is_deleted=0",
-            (current_user.university, current_user.roll_no, file.filename)
+            (university, roll_no, filename)
         )
         existing_doc = cursor.fetchone()
         
         # Check Content Duplicate
         cursor.execute(
              "SELECT id FROM documents WHERE university=? AND roll_no=? AND content_hash=? AND is_deleted=0",
-             (current_user.university, current_user.roll_no, file_hash)
+             (university, roll_no, file_hash)
         )
         exact_match = cursor.fetchone()
         
-        if exact_match and not force_upload:
+        if exact_match and not job["force_upload"]:
             if existing_doc and existing_doc[0] == exact_match[0]:
                  # Same file, same content
                  return {
@@ -106,19 +108,24 @@ async def ingest_file(
             """, (doc_id,))
             new_version_num = old_ver + 1
         
-        storage_filename = f"{current_user.roll_no}_{int(time.time())}_{file.filename}"
+        # Derived from the job rather than the clock so a resumed job upserts the same chunk ids.
+        submitted_at = int(datetime.fromisoformat(job["created_at"]).timestamp())
+        storage_filename = f"{roll_no}_{submitted_at}_{filename}"
         
         # Ingest to Chroma
         result = ingest_pdf_bytes(
             content,
-            store,
+            get_vector_store(),
             source_name=storage_filename, 
             with_metrics=True,
+            progress=progress,
+            content_hash=file_hash,
+            file_path=job["upload_path"],
             metadata_overrides={
-                "university": current_user.university,
-                "roll_no": current_user.roll_no,
-                "u_id": current_user.id,
-                "original_filename": file.filename,
+                "university": university,
+                "roll_no": roll_no,
+                "u_id": job["user_id"],
+                "original_filename": filename,
                 "version": new_version_num
             }
         )
@@ -143,10 +150,17 @@ async def ingest_file(
             cursor.execute("""
                 INSERT INTO documents (university, roll_no, filename, storage_path, file_size, difficulty, created_at, version_number, content_hash)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (current_user.university, current_user.roll_no, file.filename, storage_filename, file_size, difficulty, created_at, new_version_num, file_hash))
+            """, (university, roll_no, filename, storage_filename, file_size, difficulty, created_at, new_version_num, file_hash))
             doc_id = cursor.lastrowid
 
         conn.commit()
+
+        if existing_doc and old_storage_path and old_storage_path != storage_filename:
+            # The superseded version must stop answering retrieval queries.
+            remove_from_index(
+                source=old_storage_path,
+                filters={"university": university, "roll_no": roll_no},
+            )
         
         return {
             "status": "success",
@@ -159,6 +173,59 @@ async def ingest_file(
     finally:
         conn.close()
 
+
+ingest_jobs = IngestJobManager(runner=_run_ingest_job)
+
+
+@router.post("/ingest-file", status_code=202)
+async def ingest_file(
+    request: Request,
+    file: UploadFile = File(...),
+    course: Optional[str] = None,
+    current_user: Student = Depends(get_current_user),
+    student_filter: Dict[str, Any] = Depends(get_student_filter),
+    force_upload: bool = Query(False)
+):
+    try:
+        upload = await spool_upload(file, student_upload_dir(current_user.university, current_user.roll_no))
+    except UploadTooLarge as exc:
+        raise HTTPException(status_code=413, detail=str(exc))
+    if upload.size == 0:
+        upload.discard()
+        raise HTTPException(status_code=400, detail="File is empty. Please upload a file with content.")
+
+    try:
+        job = await run_in_threadpool(
+            ingest_jobs.submit,
+            university=current_user.university,
+            roll_no=current_user.roll_no,
+            user_id=current_user.id,
+            filename=file.filename,
+            upload_path=upload.path,
+            file_size=upload.size,
+            file_hash=upload.sha256,
+            course=course,
+            force_upload=force_upload,
+        )
+    except IngestQueueFull as exc:
+        upload.discard()
+        raise HTTPException(status_code=503, detail=f"Ingestion queue is full, please retry shortly. {exc}")
+
+    return {**job, "status_url": f"/ingest-jobs/{job['job_id']}"}
+
+
+@router.get("/ingest-jobs")
+def list_ingest_jobs(limit: int = Query(20, ge=1, le=100), current_user: Student = Depends(get_current_user)):
+    return {"jobs": ingest_jobs.list_jobs(current_user.university, current_user.roll_no, limit=limit)}
+
+
+@router.get("/ingest-jobs/{job_id}")
+def get_ingest_job(job_id: str, current_user: Student = Depends(get_current_user)):
+    job = ingest_jobs.get(job_id, current_user.university, current_user.roll_no)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
+
 @router.get("/documents")
 def list_documents(current_user: Student = Depends(get_current_user)):
     conn = get_db_connection()
@@ -187,7 +254,7 @@ def list_documents(current_user: Student = Depends(get_current_user)):
         # (Optional: for legacy support, but user asked for DB management)
         if not docs:
             # Check store
-            stats = store.stats(filters={"university": current_user.university, "roll_no": current_user.roll_no})
+            stats = get_vector_store().stats(filters={"university": current_user.university, "roll_no": current_user.roll_no})
             sources = stats.get("sources", [])
             for s in sources:
                 docs.append({
@@ -237,11 +304,11 @@ def get_document_detail(
                 versions = [{"id": r[0], "version": r[1], "created_at": r[2]} for r in v_rows]
                 # Add current as well? UI handles it.
         
-        matches = store.get_documents_by_source(storage_path, filters={"university": current_user.university, "roll_no": current_user.roll_no})
+        matches = get_vector_store().get_documents_by_source(storage_path, filters={"university": current_user.university, "roll_no": current_user.roll_no})
         
         if not matches:
              # Try raw identifier
-             matches = store.get_documents_by_source(doc_identifier, filters={"university": current_user.university, "roll_no": current_user.roll_no})
+             matches = get_vector_store().get_documents_by_source(doc_identifier, filters={"university": current_user.university, "roll_no": current_user.roll_no})
         
         if not matches:
              if doc_id:
@@ -315,7 +382,8 @@ def delete_document(doc_identifier: str, current_user: Student = Depends(get_cur
         
         # Soft Delete in DB done.
         # Vector Store Delete
-        store.delete_document(storage_path, filters={"university": current_user.university, "roll_no": current_user.roll_no})
+        get_vector_store().delete_document(storage_path, filters={"university": current_user.university, "roll_no": current_user.roll_no})
+        remove_from_index(source=storage_path, filters={"university": current_user.university, "roll_no": current_user.roll_no})
         
         return {"status": "deleted", "id": doc_identifier}
     finally:
@@ -337,14 +405,14 @@ def similar_documents(doc_identifier: str, current_user: Student = Depends(get_c
                  storage_path = row[0]
                  filename = row[1]
 
-        source_docs = store.get_documents_by_source(storage_path, filters={"university": current_user.university, "roll_no": current_user.roll_no}, include_embeddings=True)
+        source_docs = get_vector_store().get_documents_by_source(storage_path, filters={"university": current_user.university, "roll_no": current_user.roll_no}, include_embeddings=True)
         if not source_docs:
              return {"similar": []}
              
         # Extract embedding and convert to list to avoid numpy ambiguity
         query_embedding = source_docs[0]["embedding"]
         query_embedding_list = list(query_embedding) if hasattr(query_embedding, 'tolist') else list(query_embedding)
-        hits = store.similarity_search(query_embedding_list, top_k=5, filters={"university": current_user.university, "roll_no": current_user.roll_no})
+        hits = get_vector_store().similarity_search(query_embedding_list, top_k=5, filters={"university": current_user.university, "roll_no": current_user.roll_no})
         
         similar = []
         seen = set()
@@ -362,12 +430,37 @@ def similar_documents(doc_identifier: str, current_user: Student = Depends(get_c
     finally:
         conn.close()
 
+async def _stream_summary(texts: List[str], sources: List[str], session_id: str, current_user: Student):
+    start_time = time.perf_counter()
+    yield sse_event("sources", {"sources": sources, "contextCount": len(texts)})
+    first_token_ms: Optional[int] = None
+    async for piece in astream_summary(texts):
+        if first_token_ms is None:
+            first_token_ms = int((time.perf_counter() - start_time) * 1000)
+        yield sse_event("token", {"text": piece})
+    latency_ms = int((time.perf_counter() - start_time) * 1000)
+    await run_in_threadpool(
+        log_summary_event,
+        session_id,
+        None,
+        len(texts),
+        latency_ms,
+        metadata={"sources": sources, "streamed": True},
+        university=current_user.university,
+        roll_no=current_user.roll_no,
+        first_token_ms=first_token_ms,
+    )
+    yield sse_event("done", {"latencyMs": latency_ms, "firstTokenMs": first_token_ms})
+
+
 class SummaryRequest(BaseModel):
     sources: List[str]
+    stream: bool = False
 
 @router.post("/summary")
 def get_summary_endpoint(
     req: SummaryRequest,
+    request: Request,
     current_user: Student = Depends(get_current_user)
 ):
     """
@@ -390,24 +483,24 @@ def get_summary_endpoint(
                 target_source = row[0]
             
             # Fetch documents using the resolved storage path
-            docs = store.get_documents_by_source(target_source, filters={"university": current_user.university, "roll_no": current_user.roll_no})
+            docs = get_vector_store().get_documents_by_source(target_source, filters={"university": current_user.university, "roll_no": current_user.roll_no})
             
             # Fallback: Try searching by original filename if storage_path yielded nothing
             # (Handles legacy documents where source might be stored as filenanme)
             if not docs and target_source != source:
                 print(f"DEBUG: Fallback search by filename for {source}")
-                docs = store.get_documents_by_source(source, filters={"university": current_user.university, "roll_no": current_user.roll_no})
+                docs = get_vector_store().get_documents_by_source(source, filters={"university": current_user.university, "roll_no": current_user.roll_no})
 
             # Fallback 2: Direct Collection Bypass (if metadata filter failed)
             # Safe because we resolved target_source from DB for this specific user
             if not docs and row:
                  print(f"DEBUG: Direct collection access for {target_source}")
-                 raw_results = store.collection.get(where={"source": target_source}, include=["documents", "metadatas"])
+                 raw_results = get_vector_store().collection.get(where={"source": target_source}, include=["documents", "metadatas"])
                  
                  # Fallback to direct filename access (Legacy support)
                  if not raw_results or not raw_results['ids']:
                      print(f"DEBUG: Direct access failed. Trying filename {source}")
-                     raw_results = store.collection.get(where={"source": source}, include=["documents", "metadatas"])
+                     raw_results = get_vector_store().collection.get(where={"source": source}, include=["documents", "metadatas"])
 
                  if raw_results and raw_results['ids']:
                       for i in range(len(raw_results['ids'])):
@@ -425,7 +518,12 @@ def get_summary_endpoint(
         conn.close()
 
         if not all_texts:
+             if req.stream:
+                 return sse_response(stream_message("📚 No content found for these sources."))
              return {"summary": "📚 No content found for these sources."}
+
+        if req.stream:
+            return sse_response(_stream_summary(all_texts, req.sources, resolve_session_id(request), current_user))
             
         summary = generate_summary(all_texts)
         return {"summary": summary}
@@ -441,8 +539,8 @@ def smart_search(
     current_user: Student = Depends(get_current_user)
 ):
     student_filter = {"university": current_user.university, "roll_no": current_user.roll_no}
-    q_emb = embed_texts([query])[0]
-    hits = store.similarity_search(q_emb, top_k=top_k, filters=student_filter)
+    q_emb = embed_query(query)
+    hits = get_vector_store().similarity_search(q_emb, top_k=top_k, filters=student_filter)
     
     # RAG Logic
     contexts = [h["text"] for h in hits]
@@ -0,0 +1,185 @@
+"""
+Per-tenant catalog of the sources held in a Chroma collection.
+
+Chroma cannot group or count by metadata, so listing a student's documents
+used to fetch the metadata of every one of their chunks. The catalog keeps,
+next to the collection, one row per chunk id (tenant, source, bytes,
+``ingested_at``) and one aggregate row per ``(university, roll_no, source)``.
+``ChromaVectorStore`` updates both in a single SQLite transaction after each
+upsert or delete, so listing sources and counting chunks read only the
+tenant's aggregate rows. A collection written before the catalog existed is
+indexed once, on first use.
+"""
+
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE = "source_catalog.db"
+UNKNOWN_SOURCE = "Unknown"
+_BATCH = 500
+
+# (university, roll_no, source)
+SourceKey = Tuple[str, str, str]
+# (university, roll_no)
+TenantKey = Tuple[str, str]
+
+
+def _text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+def tenant_key(university: Any, roll_no: Any) -> TenantKey:
+    """Tenant identity as stored in the catalog (metadata values compared as text)."""
+    return _text(university), _text(roll_no)
+
+
+def chunk_entry(doc_id: str, meta: Optional[Dict[str, Any]], text: Optional[str]) -> Tuple[Any, ...]:
+    """Catalog row for one chunk: ``(id, university, roll_no, source, bytes, ingested_at)``."""
+    meta = meta or {}
+    return (
+        doc_id,
+        _text(meta.get("university")),
+        _text(meta.get("roll_no")),
+        _text(meta.get("source")) or UNKNOWN_SOURCE,
+        len((text or "").encode("utf-8")),
+        meta.get("ingested_at") or None,
+    )
+
+
+class SourceCatalog:
+    def __init__(self, directory: Path, collection: str):
+        self.path = Path(directory) / CATALOG_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.collection = collection
+        self._lock = threading.Lock()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS catalog_chunks ("
+                " collection TEXT NOT NULL, id TEXT NOT NULL, university TEXT NOT NULL, roll_no TEXT NOT NULL,"
+                " source TEXT NOT NULL, bytes INTEGER NOT NULL, ingested_at TEXT,"
+                " PRIMARY KEY (collection, id))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_catalog_chunks_source"
+                " ON catalog_chunks (collection, university, roll_no, source)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS source_catalog ("
+                " collection TEXT NOT NULL, university TEXT NOT NULL, roll_no TEXT NOT NULL, source TEXT NOT NULL,"
+                " chunks INTEGER NOT NULL, bytes INTEGER NOT NULL, latest_ingested_at TEXT,"
+                " PRIMARY KEY (collection, university, roll_no, source))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS catalog_state (collection TEXT PRIMARY KEY, built INTEGER NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # --- Writes ---
+
+    def _write(self, remove_ids: Iterable[str], entries: Iterable[Tuple[Any, ...]]) -> Set[TenantKey]:
+        """
+        Drop ``remove_ids``, add ``entries`` and refresh the affected aggregates in one transaction.
+        Returns the tenants whose sources changed, including previous owners of replaced ids.
+        """
+        entries = list(entries)
+        remove_ids = list(dict.fromkeys([*remove_ids, *(entry[0] for entry in entries)]))
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                touched: Set[SourceKey] = {entry[1:4] for entry in entries}
+                for start in range(0, len(remove_ids), _BATCH):
+                    batch = remove_ids[start:start + _BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    params = [self.collection, *batch]
+                    touched.update(
+                        conn.execute(
+                            "SELECT university, roll_no, source FROM catalog_chunks"
+                            f" WHERE collection = ? AND id IN ({placeholders})",
+                            params,
+                        ).fetchall()
+                    )
+                    conn.execute(f"DELETE FROM catalog_chunks WHERE collection = ? AND id IN ({placeholders})", params)
+                conn.executemany(
+                    "INSERT INTO catalog_chunks (collection, id, university, roll_no, source, bytes, ingested_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(self.collection, *entry) for entry in entries],
+                )
+                self._refresh(conn, touched)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return {(university, roll_no) for university, roll_no, _ in touched}
+
+    def _refresh(self, conn: sqlite3.Connection, keys: Iterable[SourceKey]) -> None:
+        for university, roll_no, source in keys:
+            params = (self.collection, university, roll_no, source)
+            chunks, size, latest = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0), MAX(ingested_at) FROM catalog_chunks"
+                " WHERE collection = ? AND university = ? AND roll_no = ? AND source = ?",
+                params,
+            ).fetchone()
+            if chunks:
+                conn.execute(
+                    "INSERT OR REPLACE INTO source_catalog"
+                    " (collection, university, roll_no, source, chunks, bytes, latest_ingested_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (*params, chunks, size, latest),
+                )
+            else:
+                conn.execute(
+                    "DELETE FROM source_catalog WHERE collection = ? AND university = ? AND roll_no = ? AND source = ?",
+                    params,
+                )
+
+    def record_upsert(self, entries: Iterable[Tuple[Any, ...]]) -> Set[TenantKey]:
+        """Record chunks written to the collection (see ``chunk_entry``); existing ids are replaced."""
+        return self._write((), entries)
+
+    def record_delete(self, ids: Iterable[str]) -> Set[TenantKey]:
+        return self._write(ids, ())
+
+    def reset(self, built: bool) -> None:
+        """Forget every entry of this collection; ``built=False`` makes the next read rebuild it."""
+        with self._lock, closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM catalog_chunks WHERE collection = ?", (self.collection,))
+            conn.execute("DELETE FROM source_catalog WHERE collection = ?", (self.collection,))
+            conn.execute(
+                "INSERT OR REPLACE INTO catalog_state (collection, built) VALUES (?, ?)", (self.collection, int(built))
+            )
+            conn.execute("COMMIT")
+
+    def mark_built(self) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute("INSERT OR REPLACE INTO catalog_state (collection, built) VALUES (?, 1)", (self.collection,))
+
+    # --- Reads ---
+
+    def is_built(self) -> bool:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT built FROM catalog_state WHERE collection = ?", (self.collection,)).fetchone()
+        return bool(row and row[0])
+
+    def sources(self, university: Any, roll_no: Any) -> List[Dict[str, Any]]:
+        """The tenant's sources, most recently ingested first."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT source, chunks, latest_ingested_at, bytes FROM source_catalog"
+                " WHERE collection = ? AND university = ? AND roll_no = ?"
+                " ORDER BY latest_ingested_at DESC",
+                (self.collection, *tenant_key(university, roll_no)),
+            ).fetchall()
+        return [
+            {"source": source, "chunks": chunks, "latest_ingested_at": latest, "bytes": size}
+            for source, chunks, latest, size in rows
+        ]
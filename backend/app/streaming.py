@@ -0,0 +1,32 @@
+"""
+Server-sent event helpers for streamed answers and summaries.
+
+Streams emit a ``sources`` event first, then one ``token`` event per text
+delta, and finish with a ``done`` event carrying timing information.
+"""
+
+import json
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one server-sent event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """Wrap an event iterator in a response that proxies will not buffer."""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def stream_message(message: str, sources: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+    """Stream a fixed message (e.g. "no content found") using the same event sequence."""
+    yield sse_event("sources", sources or {"sources": []})
+    yield sse_event("token", {"text": message})
+    yield sse_event("done", {"latencyMs": 0, "firstTokenMs": None})
@@ -0,0 +1,51 @@
+"""
+Single-pass word tokenization shared by the ingest analytics.
+
+The ``[A-Za-z][\\w-]+`` word pattern runs once over the whole document and
+each match is assigned to every chunk whose span contains its start offset,
+so a word crossing a chunk edge is counted once, whole. Token counts, chunk
+topics, chunk keywords and document keywords are then derived from those
+matches, instead of re-running the regex over every chunk (twice, with
+overlapping chunks reading the same text again) and once more over the
+whole text.
+"""
+
+import bisect
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+WORD_PATTERN = re.compile(r"[A-Za-z][\w-]+")
+# Terms shorter than this are ignored by topic and keyword extraction.
+MIN_TERM_LENGTH = 4
+
+
+@dataclass
+class TokenizedText:
+    token_count: int
+    # Content terms (lower-cased, long enough, not stop words) of the whole text and of each chunk.
+    term_counts: Counter = field(default_factory=Counter)
+    chunk_term_counts: List[Counter] = field(default_factory=list)
+
+
+def tokenize(text: str, spans: Sequence[Tuple[int, int]] = (), stop_words: Iterable[str] = ()) -> TokenizedText:
+    """Tokenize ``text`` once and count content terms for the document and each ``(start, end)`` chunk."""
+    stop_words = stop_words if isinstance(stop_words, (set, frozenset)) else set(stop_words)
+    offsets: List[int] = []
+    terms: List[Optional[str]] = []
+    for match in WORD_PATTERN.finditer(text):
+        token = match.group().lower()
+        offsets.append(match.start())
+        terms.append(token if len(token) >= MIN_TERM_LENGTH and token not in stop_words else None)
+
+    chunk_counts = []
+    for start, end in spans:
+        first = bisect.bisect_left(offsets, start)
+        last = bisect.bisect_left(offsets, end, lo=first)
+        chunk_counts.append(Counter(term for term in terms[first:last] if term is not None))
+    return TokenizedText(
+        token_count=len(offsets),
+        term_counts=Counter(term for term in terms if term is not None),
+        chunk_term_counts=chunk_counts,
+    )
@@ -0,0 +1,163 @@
+"""
+Streaming upload handling.
+
+Uploaded files are copied in fixed-size chunks into a spool file under the
+student's data directory while their SHA-256 and size are computed on the
+fly, so an upload is never held in memory as a whole. Extraction then reads
+the spool file through a read-only memory map.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import re
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Union
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from app.data_organization import get_student_data_path
+
+MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "50"))
+MAX_UPLOAD_SIZE_BYTES = MAX_UPLOAD_SIZE_MB * 1024 * 1024
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Room for multipart boundaries and part headers on top of the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+UPLOAD_DATA_DIR = os.getenv("INGEST_DATA_DIR", "data")
+
+
+class UploadTooLarge(ValueError):
+    """Raised as soon as an upload grows past the configured limit."""
+
+    def __init__(self, received: int, limit: int):
+        self.received = received
+        self.limit = limit
+        super().__init__(
+            f"File too large. Maximum size is {limit / (1024 * 1024):.0f}MB, "
+            f"but the upload reached {received / (1024 * 1024):.2f}MB"
+        )
+
+
+@dataclass
+class SpooledUpload:
+    path: Path
+    size: int
+    sha256: str
+
+    def discard(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+def student_upload_dir(university: str, roll_no: str, base_dir: str = UPLOAD_DATA_DIR) -> Path:
+    upload_dir = get_student_data_path(university, roll_no, base_dir=base_dir) / "uploads"
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    return upload_dir
+
+
+async def spool_upload(
+    file: UploadFile,
+    dest_dir: Path,
+    *,
+    max_bytes: int = MAX_UPLOAD_SIZE_BYTES,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> SpooledUpload:
+    """Copy an upload to ``dest_dir`` chunk by chunk, hashing it and enforcing ``max_bytes`` as it goes."""
+    safe_name = re.sub(r"[^a-zA-Z0-9._-]", "_", file.filename or "upload")
+    path = (dest_dir / f"{uuid.uuid4().hex}_{safe_name}").resolve()
+    digest = hashlib.sha256()
+    size = 0
+    handle = open(path, "wb")
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(size, max_bytes)
+            digest.update(chunk)
+            await run_in_threadpool(handle.write, chunk)
+    except BaseException:
+        handle.close()
+        path.unlink(missing_ok=True)
+        raise
+    handle.close()
+    return SpooledUpload(path=path, size=size, sha256=digest.hexdigest())
+
+
+def file_sha256(path: Union[str, Path], chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@contextmanager
+def mapped_file(path: Union[str, Path]) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Read-only memory map of a spooled upload (empty files cannot be mapped and yield ``b""``)."""
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            yield b""
+            return
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield mapped
+        finally:
+            mapped.close()
+
+
+class UploadLimitMiddleware:
+    """
+    Reject upload requests whose body exceeds the limit while it is still arriving.
+
+    Multipart bodies are parsed before the endpoint runs, so the per-file check in
+    ``spool_upload`` alone would only fire after the whole body was received.
+    """
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int = MAX_UPLOAD_SIZE_BYTES):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_body = max_bytes + MULTIPART_OVERHEAD_BYTES
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        declared = headers.get(b"content-length")
+        if declared is not None and declared.isdigit() and int(declared) > self.max_body:
+            await self._reject(send, int(declared))
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    # FastAPI re-raises HTTPExceptions from body parsing, so this becomes a 413 response.
+                    raise HTTPException(status_code=413, detail=str(UploadTooLarge(received, self.max_bytes)))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send, received: int) -> None:
+        body = json.dumps({"detail": str(UploadTooLarge(received, self.max_bytes))}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 413,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
@@ -1,27 +1,36 @@
+import asyncio
+import functools
+import importlib
 import json
 import logging
 import os
 import re
+import weakref
 from textwrap import dedent
-from typing import List, Dict, Any, Optional, Sequence
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Sequence, Tuple
 from uuid import uuid4
 
-try:
-    import openai
-except ImportError:  # pragma: no cover - optional dependency
-    openai = None  # type: ignore
-
 try:
     from dotenv import load_dotenv
 except ImportError:  # pragma: no cover - optional dependency
     load_dotenv = None
 
+import httpx
 import requests
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+@functools.lru_cache(maxsize=None)
+def _load_openai() -> Any:
+    """The ``openai`` SDK, imported on first use (it costs most of a second at startup); None when missing."""
+    try:
+        return importlib.import_module("openai")
+    except ImportError:  # pragma: no cover - optional dependency
+        return None
+
+
 QUESTION_TYPES = ("mcq", "scenario", "true_false", "fill_blank")
 
 
@@ -175,6 +184,10 @@ def _generate_fallback_quiz_question(
 OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 OLLAMA_QUIZ_MODEL = os.getenv("OLLAMA_QUIZ_MODEL")
 OLLAMA_QA_MODEL = os.getenv("OLLAMA_QA_MODEL")
+GROQ_CHAT_URL = "https://api.groq.com/openai/v1/chat/completions"
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "200"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "50"))
+STREAM_FALLBACK_CHUNK_CHARS = 48
 
 
 def _normalized_env_value(name: str) -> Optional[str]:
@@ -337,6 +350,7 @@ def _perform_openai_chat_completion(
     temperature: float,
     max_tokens: int,
 ) -> Optional[str]:
+    openai = _load_openai()
     if openai is None:
         logger.debug("OpenAI client not available; skipping remote quiz generation.")
         return None
@@ -369,10 +383,86 @@ def _perform_openai_chat_completion(
     return content.strip() if isinstance(content, str) else None
 
 
+# Pooled async clients are bound to the event loop that created them, so keep one per loop.
+_async_http_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_async_openai_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Return the pooled ``httpx.AsyncClient`` for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _async_http_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_HTTP_MAX_KEEPALIVE,
+            ),
+            timeout=httpx.Timeout(90.0, connect=10.0),
+        )
+        _async_http_clients[loop] = client
+        _async_openai_clients.pop(loop, None)
+    return client
+
+
+async def aclose_async_http_client() -> None:
+    """Close the running loop's pooled client (called on application shutdown)."""
+    loop = asyncio.get_running_loop()
+    _async_openai_clients.pop(loop, None)
+    client = _async_http_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
+
+
+def _get_async_openai_client() -> Any:
+    client_cls = getattr(_load_openai(), "AsyncOpenAI", None)
+    if client_cls is None:
+        return None
+    http_client = get_async_http_client()
+    loop = asyncio.get_running_loop()
+    client = _async_openai_clients.get(loop)
+    if client is None:
+        client = client_cls(api_key=settings.OPENAI_API_KEY or None, http_client=http_client)
+        _async_openai_clients[loop] = client
+    return client
+
+
+async def _aperform_openai_chat_completion(
+    messages: List[Dict[str, str]],
+    model: str,
+    temperature: float,
+    max_tokens: int,
+) -> Optional[str]:
+    openai = _load_openai()
+    if openai is None:
+        logger.debug("OpenAI client not available; skipping remote quiz generation.")
+        return None
+    client = _get_async_openai_client()
+    if client is None:
+        # Pre-1.0 SDKs have no async client; keep the blocking call off the event loop.
+        return await asyncio.to_thread(_perform_openai_chat_completion, messages, model, temperature, max_tokens)
+    try:
+        response = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+        content = _extract_openai_message_content(response.choices[0])
+    except Exception as exc:  # pragma: no cover - relies on external service
+        logger.warning("OpenAI chat completion failed: %s", exc)
+        return None
+    return content.strip() if isinstance(content, str) else None
+
+
 def _call_openai_quiz_model(messages: List[Dict[str, str]], model: str) -> Optional[str]:
     return _perform_openai_chat_completion(messages, model, temperature=0.4, max_tokens=700)
 
 
+async def _acall_openai_quiz_model(messages: List[Dict[str, str]], model: str) -> Optional[str]:
+    return await _aperform_openai_chat_completion(messages, model, temperature=0.4, max_tokens=700)
+
+
 def _normalized_history_prompts(history: Optional[Sequence[Dict[str, Any]]]) -> set[str]:
     prompts: set[str] = set()
     answers: set[str] = set()
@@ -400,6 +490,15 @@ def _normalized_history_prompts(history: Optional[Sequence[Dict[str, Any]]]) ->
     return prompts.union(answers)
 
 
+def _ollama_generate_body(model: str, prompt: str, temperature: float) -> Dict[str, Any]:
+    return {
+        "model": model,
+        "prompt": prompt,
+        "stream": False,
+        "options": {"temperature": temperature},
+    }
+
+
 def _call_ollama_generate(
     model: Optional[str],
     prompt: str,
@@ -412,12 +511,7 @@ def _call_ollama_generate(
     try:
         response = requests.post(
             f"{OLLAMA_BASE_URL.rstrip('/')}/api/generate",
-            json={
-                "model": model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": temperature},
-            },
+            json=_ollama_generate_body(model, prompt, temperature),
             timeout=timeout,
         )
         response.raise_for_status()
@@ -429,6 +523,30 @@ def _call_ollama_generate(
     return str(content).strip() if content else None
 
 
+async def _acall_ollama_generate(
+    model: Optional[str],
+    prompt: str,
+    *,
+    temperature: float = 0.2,
+    timeout: int = 90,
+) -> Optional[str]:
+    if not model:
+        return None
+    try:
+        response = await get_async_http_client().post(
+            f"{OLLAMA_BASE_URL.rstrip('/')}/api/generate",
+            json=_ollama_generate_body(model, prompt, temperature),
+            timeout=timeout,
+        )
+        response.raise_for_status()
+    except httpx.HTTPError as exc:  # pragma: no cover - relies on external service
+        logger.warning("Ollama generate failed (%s): %s", model, exc)
+        return None
+    payload = response.json()
+    content = payload.get("response")
+    return str(content).strip() if content else None
+
+
 def _call_ollama_quiz_model(prompt: str) -> Optional[str]:
     return _call_ollama_generate(OLLAMA_QUIZ_MODEL, prompt, temperature=0.4, timeout=60)
 
@@ -437,48 +555,224 @@ def _call_ollama_answer_model(prompt: str) -> Optional[str]:
     return _call_ollama_generate(OLLAMA_QA_MODEL, prompt, temperature=0.1, timeout=90)
 
 
-def _call_groq_chat_completion(
+async def _acall_ollama_quiz_model(prompt: str) -> Optional[str]:
+    return await _acall_ollama_generate(OLLAMA_QUIZ_MODEL, prompt, temperature=0.4, timeout=60)
+
+
+async def _acall_ollama_answer_model(prompt: str) -> Optional[str]:
+    return await _acall_ollama_generate(OLLAMA_QA_MODEL, prompt, temperature=0.1, timeout=90)
+
+
+def _groq_request(
     messages: List[Dict[str, str]],
-    *,
     temperature: float,
     max_tokens: int,
-    model: Optional[str] = None,
-) -> Optional[str]:
+    model: Optional[str],
+) -> Optional[Tuple[Dict[str, str], Dict[str, Any]]]:
     api_key = _get_groq_api_key()
     if not api_key:
         logger.warning("Groq API key missing; cannot call Groq completion.")
         return None
     resolved_model = model or _get_groq_model()
     logger.debug("Calling Groq chat completion (model=%s)", resolved_model)
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+    body = {
+        "model": resolved_model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    return headers, body
+
+
+def _groq_response_content(payload: Dict[str, Any]) -> Optional[str]:
+    logger.debug("Groq response payload keys: %s", list(payload.keys()))
+    choices = payload.get("choices") or []
+    if not choices:
+        return None
+    message = choices[0].get("message") or {}
+    content = message.get("content")
+    return content.strip() if isinstance(content, str) else None
+
+
+def _call_groq_chat_completion(
+    messages: List[Dict[str, str]],
+    *,
+    temperature: float,
+    max_tokens: int,
+    model: Optional[str] = None,
+) -> Optional[str]:
+    request = _groq_request(messages, temperature, max_tokens, model)
+    if request is None:
+        return None
+    headers, body = request
     try:
-        response = requests.post(
-            "https://api.groq.com/openai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": resolved_model,
-                "messages": messages,
-                "temperature": temperature,
-                "max_tokens": max_tokens,
-            },
-            timeout=60,
-        )
+        response = requests.post(GROQ_CHAT_URL, headers=headers, json=body, timeout=60)
         response.raise_for_status()
     except requests.RequestException as exc:  # pragma: no cover - external service
         logger.warning("Groq chat completion failed: %s", exc)
         if exc.response:
              print(f"GROQ_ERROR_BODY: {exc.response.text}")
         return None
-    payload = response.json()
-    logger.debug("Groq response payload keys: %s", list(payload.keys()))
-    choices = payload.get("choices") or []
-    if not choices:
+    return _groq_response_content(response.json())
+
+
+async def _acall_groq_chat_completion(
+    messages: List[Dict[str, str]],
+    *,
+    temperature: float,
+    max_tokens: int,
+    model: Optional[str] = None,
+) -> Optional[str]:
+    request = _groq_request(messages, temperature, max_tokens, model)
+    if request is None:
         return None
-    message = choices[0].get("message") or {}
-    content = message.get("content")
-    return content.strip() if isinstance(content, str) else None
+    headers, body = request
+    try:
+        response = await get_async_http_client().post(GROQ_CHAT_URL, headers=headers, json=body, timeout=60)
+        response.raise_for_status()
+    except httpx.HTTPError as exc:  # pragma: no cover - external service
+        logger.warning("Groq chat completion failed: %s", exc)
+        if isinstance(exc, httpx.HTTPStatusError):
+            logger.warning("Groq error body: %s", exc.response.text)
+        return None
+    return _groq_response_content(response.json())
+
+
+async def _astream_openai_chat_completion(
+    messages: List[Dict[str, str]],
+    model: str,
+    temperature: float,
+    max_tokens: int,
+) -> AsyncIterator[str]:
+    openai = _load_openai()
+    if openai is None:
+        return
+    client = _get_async_openai_client()
+    if client is None:
+        content = await _aperform_openai_chat_completion(messages, model, temperature, max_tokens)
+        if content:
+            yield content
+        return
+    try:
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = getattr(chunk.choices[0].delta, "content", None)
+            if delta:
+                yield delta
+    except Exception as exc:  # pragma: no cover - relies on external service
+        logger.warning("OpenAI chat completion stream failed: %s", exc)
+
+
+async def _astream_groq_chat_completion(
+    messages: List[Dict[str, str]],
+    *,
+    temperature: float,
+    max_tokens: int,
+    model: Optional[str] = None,
+) -> AsyncIterator[str]:
+    request = _groq_request(messages, temperature, max_tokens, model)
+    if request is None:
+        return
+    headers, body = request
+    try:
+        async with get_async_http_client().stream(
+            "POST", GROQ_CHAT_URL, headers=headers, json={**body, "stream": True}, timeout=60
+        ) as response:
+            response.raise_for_status()
+            # OpenAI-compatible SSE: "data: {json}" lines terminated by "data: [DONE]".
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    payload = json.loads(data)
+                except json.JSONDecodeError:
+                    continue
+                choices = payload.get("choices") or []
+                delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                if delta:
+                    yield delta
+    except httpx.HTTPError as exc:  # pragma: no cover - external service
+        logger.warning("Groq chat completion stream failed: %s", exc)
+
+
+async def _astream_ollama_generate(
+    model: Optional[str],
+    prompt: str,
+    *,
+    temperature: float = 0.2,
+    timeout: int = 90,
+) -> AsyncIterator[str]:
+    if not model:
+        return
+    try:
+        async with get_async_http_client().stream(
+            "POST",
+            f"{OLLAMA_BASE_URL.rstrip('/')}/api/generate",
+            json={**_ollama_generate_body(model, prompt, temperature), "stream": True},
+            timeout=timeout,
+        ) as response:
+            response.raise_for_status()
+            # Ollama streams one JSON object per line until "done" is true.
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    payload = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                token = payload.get("response")
+                if token:
+                    yield str(token)
+                if payload.get("done"):
+                    break
+    except httpx.HTTPError as exc:  # pragma: no cover - relies on external service
+        logger.warning("Ollama generate stream failed (%s): %s", model, exc)
+
+
+def _split_for_streaming(text: str, size: int = STREAM_FALLBACK_CHUNK_CHARS) -> List[str]:
+    """Cut a finished text into roughly ``size``-character pieces on whitespace boundaries."""
+    pieces: List[str] = []
+    current = ""
+    for word in re.findall(r"\S+\s*", text):
+        if current and len(current) + len(word) > size:
+            pieces.append(current)
+            current = ""
+        current += word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+async def _astream_first_available(
+    streams: Sequence[Callable[[], AsyncIterator[str]]],
+    fallback: Callable[[], str],
+) -> AsyncIterator[str]:
+    # A provider that fails before its first token hands over to the next one; once tokens
+    # have been sent there is nothing to retract, so a mid-stream failure just ends the answer.
+    for open_stream in streams:
+        produced = False
+        async for piece in open_stream():
+            produced = True
+            yield piece
+        if produced:
+            return
+    for piece in _split_for_streaming(fallback()):
+        yield piece
 
 
 def _coerce_llm_question_payload(
@@ -572,7 +866,7 @@ def _coerce_llm_question_payload(
     return result
 
 
-def _generate_quiz_question_with_llm(
+def _quiz_question_request(
     topic: Optional[str],
     contexts: List[str],
     difficulty: str,
@@ -580,6 +874,7 @@ def _generate_quiz_question_with_llm(
     focus_concept: Optional[str],
     source_names: Optional[Sequence[str]] = None,
 ) -> Optional[Dict[str, Any]]:
+    """Assemble the prompts and settings shared by the sync and async quiz generators."""
     snippets = _prepare_context_snippets(contexts)
     if not snippets:
         return None
@@ -636,72 +931,141 @@ def _generate_quiz_question_with_llm(
         "Output valid JSON only."
     )
 
-    provider = _get_quiz_llm_provider()
-    quiz_model = _get_quiz_llm_model()
-    prior_signatures = _normalized_history_prompts(history)
+    return {
+        "topic": topic,
+        "focus_concept": focus_concept,
+        "system_prompt": system_prompt,
+        "base_user_prompt": base_user_prompt,
+        "source_overview": source_overview,
+        "requested_difficulty": requested_difficulty,
+        "prior_signatures": _normalized_history_prompts(history),
+        "provider": _get_quiz_llm_provider(),
+        "quiz_model": _get_quiz_llm_model(),
+    }
 
-    def _invoke_llm(prompt_body: str) -> Optional[str]:
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": prompt_body},
-        ]
-        content: Optional[str] = None
-        openai_ready = False
-        if provider in {"openai", "auto", "default"}:
-            openai_ready = set_openai_key_from_env()
-            if openai_ready:
-                content = _call_openai_quiz_model(messages, quiz_model)
-        if not content and provider in {"groq", "auto"}:
-            content = _call_groq_chat_completion(messages, temperature=0.45, max_tokens=700)
-        if not content and OLLAMA_QUIZ_MODEL and provider in {"ollama", "auto"}:
-            prompt = system_prompt + "\n\n" + prompt_body
-            content = _call_ollama_quiz_model(prompt)
-        if not content and provider == "ollama" and not openai_ready:
-            if set_openai_key_from_env():
-                content = _call_openai_quiz_model(messages, quiz_model)
-        return content
 
-    attempts = 0
+def _quiz_messages(request: Dict[str, Any], prompt_body: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": request["system_prompt"]},
+        {"role": "user", "content": prompt_body},
+    ]
+
+
+def _invoke_quiz_llm(request: Dict[str, Any], prompt_body: str) -> Optional[str]:
+    provider = request["provider"]
+    messages = _quiz_messages(request, prompt_body)
+    content: Optional[str] = None
+    openai_ready = False
+    if provider in {"openai", "auto", "default"}:
+        openai_ready = set_openai_key_from_env()
+        if openai_ready:
+            content = _call_openai_quiz_model(messages, request["quiz_model"])
+    if not content and provider in {"groq", "auto"}:
+        content = _call_groq_chat_completion(messages, temperature=0.45, max_tokens=700)
+    if not content and OLLAMA_QUIZ_MODEL and provider in {"ollama", "auto"}:
+        prompt = request["system_prompt"] + "\n\n" + prompt_body
+        content = _call_ollama_quiz_model(prompt)
+    if not content and provider == "ollama" and not openai_ready:
+        if set_openai_key_from_env():
+            content = _call_openai_quiz_model(messages, request["quiz_model"])
+    return content
+
+
+async def _ainvoke_quiz_llm(request: Dict[str, Any], prompt_body: str) -> Optional[str]:
+    provider = request["provider"]
+    messages = _quiz_messages(request, prompt_body)
+    content: Optional[str] = None
+    openai_ready = False
+    if provider in {"openai", "auto", "default"}:
+        openai_ready = set_openai_key_from_env()
+        if openai_ready:
+            content = await _acall_openai_quiz_model(messages, request["quiz_model"])
+    if not content and provider in {"groq", "auto"}:
+        content = await _acall_groq_chat_completion(messages, temperature=0.45, max_tokens=700)
+    if not content and OLLAMA_QUIZ_MODEL and provider in {"ollama", "auto"}:
+        prompt = request["system_prompt"] + "\n\n" + prompt_body
+        content = await _acall_ollama_quiz_model(prompt)
+    if not content and provider == "ollama" and not openai_ready:
+        if set_openai_key_from_env():
+            content = await _acall_openai_quiz_model(messages, request["quiz_model"])
+    return content
+
+
+def _review_quiz_response(
+    request: Dict[str, Any],
+    content: Optional[str],
+) -> Tuple[Optional[Dict[str, Any]], str]:
+    """Validate one LLM reply; returns the question payload or the guardrails for the next attempt."""
+    if not content:
+        return None, "\n\nIf you cannot access the model, try again with a novel question."
+    data = _extract_json_block(content)
+    if not isinstance(data, dict):
+        logger.warning("LLM quiz response was not valid JSON: %s", content)
+        return None, "\n\nThe previous response was invalid JSON. Output valid JSON only and follow the schema exactly."
+    payload = _coerce_llm_question_payload(
+        data, request["requested_difficulty"], request["topic"], request["focus_concept"]
+    )
+    if not payload:
+        return None, "\n\nThe previous output did not match the schema. Regenerate a valid JSON object with all required fields."
+    prior_signatures = request["prior_signatures"]
+    normalized_prompt = _normalize_text(payload.get("prompt"))
+    normalized_answer = _normalize_text(payload.get("correctOptionText"))
+    duplicate_signature = False
+    if normalized_prompt and normalized_prompt in prior_signatures:
+        duplicate_signature = True
+    elif normalized_answer and normalized_answer in prior_signatures:
+        duplicate_signature = True
+    if duplicate_signature:
+        logger.info("LLM quiz response duplicated prior question; requesting regeneration.")
+        prior_examples = "\n".join(sorted(list(prior_signatures))[:5])
+        additional_guardrails = (
+            "\n\nPrevious questions or answers you must not repeat:\n"
+            f"{prior_examples}\n"
+            "Generate a distinctly different question that covers a new angle or sub-concept from the context."
+        )
+        if request["source_overview"]:
+            additional_guardrails += f" Stay within these sources: {request['source_overview']}."
+        return None, additional_guardrails
+    return payload, ""
+
+
+def _generate_quiz_question_with_llm(
+    topic: Optional[str],
+    contexts: List[str],
+    difficulty: str,
+    history: Optional[List[Dict[str, Any]]],
+    focus_concept: Optional[str],
+    source_names: Optional[Sequence[str]] = None,
+) -> Optional[Dict[str, Any]]:
+    request = _quiz_question_request(topic, contexts, difficulty, history, focus_concept, source_names)
+    if request is None:
+        return None
     additional_guardrails = ""
-    while attempts < 3:
-        prompt_to_send = base_user_prompt + additional_guardrails
-        content = _invoke_llm(prompt_to_send)
-        if not content:
-            attempts += 1
-            additional_guardrails = "\n\nIf you cannot access the model, try again with a novel question."
-            continue
-        data = _extract_json_block(content)
-        if not isinstance(data, dict):
-            logger.warning("LLM quiz response was not valid JSON: %s", content)
-            attempts += 1
-            additional_guardrails = "\n\nThe previous response was invalid JSON. Output valid JSON only and follow the schema exactly."
-            continue
-        payload = _coerce_llm_question_payload(data, requested_difficulty, topic, focus_concept)
-        if not payload:
-            attempts += 1
-            additional_guardrails = "\n\nThe previous output did not match the schema. Regenerate a valid JSON object with all required fields."
-            continue
-        normalized_prompt = _normalize_text(payload.get("prompt"))
-        normalized_answer = _normalize_text(payload.get("correctOptionText"))
-        duplicate_signature = False
-        if normalized_prompt and normalized_prompt in prior_signatures:
-            duplicate_signature = True
-        elif normalized_answer and normalized_answer in prior_signatures:
-            duplicate_signature = True
-        if duplicate_signature:
-            logger.info("LLM quiz response duplicated prior question; requesting regeneration.")
-            prior_examples = "\n".join(sorted(list(prior_signatures))[:5])
-            additional_guardrails = (
-                "\n\nPrevious questions or answers you must not repeat:\n"
-                f"{prior_examples}\n"
-                "Generate a distinctly different question that covers a new angle or sub-concept from the context."
-            )
-            if source_overview:
-                additional_guardrails += f" Stay within these sources: {source_overview}."
-            attempts += 1
-            continue
-        return payload
+    for _ in range(3):
+        content = _invoke_quiz_llm(request, request["base_user_prompt"] + additional_guardrails)
+        payload, additional_guardrails = _review_quiz_response(request, content)
+        if payload:
+            return payload
+    return None
+
 
+async def _agenerate_quiz_question_with_llm(
+    topic: Optional[str],
+    contexts: List[str],
+    difficulty: str,
+    history: Optional[List[Dict[str, Any]]],
+    focus_concept: Optional[str],
+    source_names: Optional[Sequence[str]] = None,
+) -> Optional[Dict[str, Any]]:
+    request = _quiz_question_request(topic, contexts, difficulty, history, focus_concept, source_names)
+    if request is None:
+        return None
+    additional_guardrails = ""
+    for _ in range(3):
+        content = await _ainvoke_quiz_llm(request, request["base_user_prompt"] + additional_guardrails)
+        payload, additional_guardrails = _review_quiz_response(request, content)
+        if payload:
+            return payload
     return None
 
 def set_openai_key_from_env() -> bool:
@@ -709,21 +1073,21 @@ def set_openai_key_from_env() -> bool:
 
     This function no longer raises so the app can run in local fallback mode.
     """
-    if openai is None:
-        return False
     key = settings.OPENAI_API_KEY
     if not key:
         return False
+    openai = _load_openai()
+    if openai is None:
+        return False
     openai.api_key = key
     return True
 
 
-def generate_answer_with_context(
+def _answer_prompt(
     question: str,
     contexts: List[str],
-    model: str = "gpt-3.5-turbo",
     conversation: Optional[List[Dict[str, Any]]] = None,
-) -> str:
+) -> Tuple[str, str, List[Dict[str, str]]]:
     system = "You are a helpful assistant that answers questions using the provided context. Cite sources when possible."
     joined = "\n\n---\n\n".join(contexts)
     conversation_snippet = ""
@@ -740,11 +1104,43 @@ def generate_answer_with_context(
         {"role": "system", "content": system},
         {"role": "user", "content": prompt},
     ]
+    return system, prompt, messages
+
+
+def _local_answer_fallback(question: str, contexts: List[str]) -> str:
+    # Local fallback: find most relevant sentence from contexts
+    if not contexts:
+        return "I don't have any context to answer that question. Ingest notes first."
+    q_tokens = re.findall(r"\w+", question.lower())
+    best_sentence = None
+    best_score = 0
+    for ctx in contexts:
+        sentences = re.split(r"(?<=[.!?])\s+", ctx)
+        for s in sentences:
+            s_tokens = re.findall(r"\w+", s.lower())
+            score = sum(1 for t in q_tokens if t in s_tokens)
+            if score > best_score:
+                best_score = score
+                best_sentence = s
+    if best_sentence and best_score > 0:
+        return f"(Local fallback) Best match from notes: {best_sentence.strip()}"
+    # otherwise return short concat of top contexts
+    combined = "\n\n".join(contexts)
+    return f"(Local fallback) Couldn't find precise answer. Top context excerpt:\n{combined[:800]}"
+
+
+def generate_answer_with_context(
+    question: str,
+    contexts: List[str],
+    model: str = "gpt-3.5-turbo",
+    conversation: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    system, prompt, messages = _answer_prompt(question, contexts, conversation)
 
     provider = _get_qa_llm_provider() or "openai"
     requested_model = _get_qa_llm_model() or model
 
-    if provider in {"openai", "auto", "default"} and openai is not None:
+    if provider in {"openai", "auto", "default"}:
         if set_openai_key_from_env():
             content = _perform_openai_chat_completion(messages, requested_model, temperature=0.2, max_tokens=500)
             if content:
@@ -765,30 +1161,70 @@ def generate_answer_with_context(
         if content:
             return content
 
-    # Local fallback: find most relevant sentence from contexts
-    if not contexts:
-        return "I don't have any context to answer that question. Ingest notes first."
-    q_tokens = re.findall(r"\w+", question.lower())
-    best_sentence = None
-    best_score = 0
-    for ctx in contexts:
-        sentences = re.split(r"(?<=[.!?])\s+", ctx)
-        for s in sentences:
-            s_tokens = re.findall(r"\w+", s.lower())
-            score = sum(1 for t in q_tokens if t in s_tokens)
-            if score > best_score:
-                best_score = score
-                best_sentence = s
-    if best_sentence and best_score > 0:
-        return f"(Local fallback) Best match from notes: {best_sentence.strip()}"
-    # otherwise return short concat of top contexts
-    combined = "\n\n".join(contexts)
-    return f"(Local fallback) Couldn't find precise answer. Top context excerpt:\n{combined[:800]}"
+    return _local_answer_fallback(question, contexts)
 
 
-def generate_summary(contexts: List[str], model: str = "gpt-3.5-turbo") -> str:
-    """Generate a structured study summary using Groq API (preferred) or OpenAI as fallback."""
-    
+async def agenerate_answer_with_context(
+    question: str,
+    contexts: List[str],
+    model: str = "gpt-3.5-turbo",
+    conversation: Optional[List[Dict[str, Any]]] = None,
+) -> str:
+    """Async counterpart of :func:`generate_answer_with_context` over pooled connections."""
+    system, prompt, messages = _answer_prompt(question, contexts, conversation)
+
+    provider = _get_qa_llm_provider() or "openai"
+    requested_model = _get_qa_llm_model() or model
+
+    if provider in {"openai", "auto", "default"}:
+        if set_openai_key_from_env():
+            content = await _aperform_openai_chat_completion(messages, requested_model, temperature=0.2, max_tokens=500)
+            if content:
+                return content
+
+    if provider in {"groq", "auto"}:
+        content = await _acall_groq_chat_completion(
+            messages,
+            temperature=0.2,
+            max_tokens=500,
+        )
+        if content:
+            return content
+
+    if provider in {"ollama", "auto"}:
+        combined_prompt = system + "\n\n" + prompt
+        content = await _acall_ollama_answer_model(combined_prompt)
+        if content:
+            return content
+
+    return _local_answer_fallback(question, contexts)
+
+
+def astream_answer_with_context(
+    question: str,
+    contexts: List[str],
+    model: str = "gpt-3.5-turbo",
+    conversation: Optional[List[Dict[str, Any]]] = None,
+) -> AsyncIterator[str]:
+    """Stream answer text deltas from the configured provider, or the local fallback in chunks."""
+    system, prompt, messages = _answer_prompt(question, contexts, conversation)
+
+    provider = _get_qa_llm_provider() or "openai"
+    requested_model = _get_qa_llm_model() or model
+
+    streams: List[Callable[[], AsyncIterator[str]]] = []
+    if provider in {"openai", "auto", "default"} and set_openai_key_from_env():
+        streams.append(lambda: _astream_openai_chat_completion(messages, requested_model, 0.2, 500))
+    if provider in {"groq", "auto"}:
+        streams.append(lambda: _astream_groq_chat_completion(messages, temperature=0.2, max_tokens=500))
+    if provider in {"ollama", "auto"}:
+        combined_prompt = system + "\n\n" + prompt
+        streams.append(lambda: _astream_ollama_generate(OLLAMA_QA_MODEL, combined_prompt, temperature=0.1))
+
+    return _astream_first_available(streams, lambda: _local_answer_fallback(question, contexts))
+
+
+def _summary_messages(contexts: List[str]) -> List[Dict[str, str]]:
     # Enhanced prompt for better structured summaries
     enhanced_prompt = dedent("""
         Create a comprehensive, structured study guide from the provided content. Format your response as Markdown:
@@ -819,10 +1255,24 @@ def generate_summary(contexts: List[str], model: str = "gpt-3.5-turbo") -> str:
     
     joined = "\n\n".join(contexts[:8])  # Limit to first 8 chunks for better quality
     
-    messages = [
+    return [
         {"role": "system", "content": "You are an expert educational assistant creating high-quality study materials for students."},
         {"role": "user", "content": enhanced_prompt + "\n\n" + joined},
     ]
+
+
+def _local_summary_fallback(contexts: List[str]) -> str:
+    # Local fallback: Display first 22 chunks as requested
+    if not contexts:
+        return "📚 [DEBUG] The document seems empty or could not be read. Please check the content."
+    
+    combined_fallback = "\n\n".join(contexts[:3])
+    return f"# 📚 Content Preview (Local Fallback)\n\n*API limits reached or unavailable. Displaying raw document content (First 3 Sections).*\n\n{combined_fallback}"
+
+
+def generate_summary(contexts: List[str], model: str = "gpt-3.5-turbo") -> str:
+    """Generate a structured study summary using Groq API (preferred) or OpenAI as fallback."""
+    messages = _summary_messages(contexts)
     
     # Try Groq first (faster and often better quality)
     if _get_groq_api_key():
@@ -836,24 +1286,53 @@ def generate_summary(contexts: List[str], model: str = "gpt-3.5-turbo") -> str:
             return content
     
     # Fallback to OpenAI
-    if openai is not None and set_openai_key_from_env():
+    if set_openai_key_from_env():
         logger.info("Using OpenAI for summary generation")
         content = _perform_openai_chat_completion(messages, model, temperature=0.3, max_tokens=1200)
         if content:
             return content
     
-    # Local fallback: Display first 22 chunks as requested
-    if not contexts:
-        return "📚 [DEBUG] The document seems empty or could not be read. Please check the content."
-    
-    combined_fallback = "\n\n".join(contexts[:3])
-    return f"# 📚 Content Preview (Local Fallback)\n\n*API limits reached or unavailable. Displaying raw document content (First 3 Sections).*\n\n{combined_fallback}"
-    
-    
+    return _local_summary_fallback(contexts)
+
+
+async def agenerate_summary(contexts: List[str], model: str = "gpt-3.5-turbo") -> str:
+    """Async counterpart of :func:`generate_summary`."""
+    messages = _summary_messages(contexts)
+
+    if _get_groq_api_key():
+        logger.info("Using Groq API for summary generation")
+        content = await _acall_groq_chat_completion(
+            messages,
+            temperature=0.3,
+            max_tokens=1200,
+        )
+        if content:
+            return content
+
+    if set_openai_key_from_env():
+        logger.info("Using OpenAI for summary generation")
+        content = await _aperform_openai_chat_completion(messages, model, temperature=0.3, max_tokens=1200)
+        if content:
+            return content
+
+    return _local_summary_fallback(contexts)
+
+
+def astream_summary(contexts: List[str], model: str = "gpt-3.5-turbo") -> AsyncIterator[str]:
+    """Stream summary text deltas (Groq first, then OpenAI, then the local preview in chunks)."""
+    messages = _summary_messages(contexts)
+
+    streams: List[Callable[[], AsyncIterator[str]]] = []
+    if _get_groq_api_key():
+        streams.append(lambda: _astream_groq_chat_completion(messages, temperature=0.3, max_tokens=1200))
+    if set_openai_key_from_env():
+        streams.append(lambda: _astream_openai_chat_completion(messages, model, 0.3, 1200))
+
+    return _astream_first_available(streams, lambda: _local_summary_fallback(contexts))
 
 
 def generate_quiz(contexts: List[str], num_questions: int = 5, model: str = "gpt-3.5-turbo") -> str:
-    if openai is not None and set_openai_key_from_env():
+    if set_openai_key_from_env():
         joined = "\n\n".join(contexts)
         prompt = f"Create {num_questions} quiz questions (mix of MCQ and short answer) with answers and difficulty tags, based on the context:\n\n{joined}"
         messages = [
@@ -1023,3 +1502,35 @@ def generate_adaptive_quiz_question(
         focus_concept=focus_concept,
         history=history,
     )
+
+
+async def agenerate_adaptive_quiz_question(
+    topic: Optional[str],
+    contexts: List[str],
+    difficulty: str,
+    last_turn: Optional[Dict[str, Any]] = None,
+    history: Optional[List[Dict[str, Any]]] = None,
+    focus_concept: Optional[str] = None,
+    source_names: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """Async counterpart of :func:`generate_adaptive_quiz_question`."""
+
+    llm_payload = await _agenerate_quiz_question_with_llm(
+        topic=topic,
+        contexts=contexts,
+        difficulty=difficulty,
+        history=history,
+        focus_concept=focus_concept,
+        source_names=source_names,
+    )
+    if llm_payload:
+        return llm_payload
+
+    logger.warning("LLM quiz generator failed; using deterministic fallback question.")
+    return _generate_fallback_quiz_question(
+        topic=topic,
+        contexts=contexts,
+        difficulty=difficulty,
+        focus_concept=focus_concept,
+        history=history,
+    )
@@ -1,7 +1,101 @@
+import importlib
 import json
-from typing import Any, Dict, List, Optional
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-import chromadb
+from app.source_catalog import SourceCatalog, TenantKey, chunk_entry, tenant_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERSIST_DIRECTORY = "chroma_store"
+DEFAULT_COLLECTION = "documents"
+# Page size used when indexing an existing collection into the source catalog.
+CATALOG_REBUILD_PAGE = 5000
+# Per-tenant stats() memo; other worker processes' writes become visible after the TTL.
+STATS_CACHE_SIZE = int(os.getenv("STATS_CACHE_SIZE", "1024"))
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "30"))
+
+
+def _open_client(persist_directory: str) -> Any:
+    # chromadb takes most of a second to import, so it is loaded with the first store.
+    chromadb = importlib.import_module("chromadb")
+    return chromadb.PersistentClient(path=persist_directory)
+
+
+class TenantStatsCache:
+    """
+    ``stats()`` results per tenant, bounded by ``max_entries`` (LRU) and ``ttl_seconds``.
+    The store invalidates a tenant whenever it writes that tenant's chunks; a result computed
+    while any invalidation happened is not stored, so a slow read cannot re-cache stale data.
+    """
+
+    def __init__(self, max_entries: int = STATS_CACHE_SIZE, ttl_seconds: float = STATS_CACHE_TTL) -> None:
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[TenantKey, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    @staticmethod
+    def _copy(value: Dict[str, Any]) -> Dict[str, Any]:
+        return {**value, "sources": [dict(entry) for entry in value.get("sources", [])]}
+
+    def get(self, key: TenantKey) -> Tuple[Optional[Dict[str, Any]], int]:
+        """``(cached stats or None, generation to pass to put)``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.monotonic():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._copy(entry[1]), self._generation
+            if entry is not None:
+                del self._entries[key]
+            self._misses += 1
+            return None, self._generation
+
+    def put(self, key: TenantKey, value: Dict[str, Any], generation: int) -> None:
+        if not self.max_entries or self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, self._copy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[TenantKey]) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._invalidations += self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "invalidations": self._invalidations,
+            }
 
 
 class ChromaVectorStore:
@@ -9,13 +103,22 @@ class ChromaVectorStore:
 
     def __init__(
         self,
-        persist_directory: str = "chroma_store",
-        collection_name: str = "documents",
+        persist_directory: str = DEFAULT_PERSIST_DIRECTORY,
+        collection_name: str = DEFAULT_COLLECTION,
+        client: Any = None,
     ) -> None:
         self.persist_directory = persist_directory
         self.collection_name = collection_name
-        self.client = chromadb.PersistentClient(path=persist_directory)
+        self.client = client if client is not None else _open_client(persist_directory)
         self._collection = self._ensure_collection()
+        self._catalog_lock = threading.Lock()
+        self._catalog_ready = False
+        self.stats_cache = TenantStatsCache()
+        try:
+            self.catalog: Optional[SourceCatalog] = SourceCatalog(Path(persist_directory), collection_name)
+        except Exception as exc:
+            logger.warning("Source catalog unavailable for %s; listing sources scans Chroma. Error: %s", collection_name, exc)
+            self.catalog = None
 
     def _ensure_collection(self):
         return self.client.get_or_create_collection(
@@ -61,13 +164,73 @@ class ChromaVectorStore:
     def add_documents(self, docs: List[Dict[str, Any]]) -> None:
         if not docs:
             return
+        ids = [doc.get("id") or str(idx) for idx, doc in enumerate(docs)]
+        documents = [doc.get("text", "") for doc in docs]
         metadatas = [self._sanitize_metadata(doc.get("meta") or {}) for doc in docs]
         self.collection.upsert(
-            ids=[doc.get("id") or str(idx) for idx, doc in enumerate(docs)],
-            documents=[doc.get("text", "") for doc in docs],
+            ids=ids,
+            documents=documents,
             embeddings=[doc.get("embedding") for doc in docs],
             metadatas=metadatas,
         )
+        touched = self._update_catalog(lambda catalog: catalog.record_upsert(map(chunk_entry, ids, metadatas, documents)))
+        self.stats_cache.invalidate(touched | {tenant_key(meta.get("university"), meta.get("roll_no")) for meta in metadatas})
+
+    # --- Source catalog ---
+
+    def _update_catalog(self, write) -> Set[TenantKey]:
+        """Apply ``write`` to the catalog; returns the tenants it reports as changed."""
+        if self.catalog is None:
+            return set()
+        try:
+            return write(self.catalog) or set()
+        except Exception as exc:
+            # Chroma already has the change; drop the catalog so the next read rebuilds it from Chroma.
+            logger.warning("Source catalog update failed; it will be rebuilt. Error: %s", exc)
+            self._catalog_ready = False
+            try:
+                self.catalog.reset(built=False)
+            except Exception:
+                self.catalog = None
+            return set()
+
+    def _ready_catalog(self) -> Optional[SourceCatalog]:
+        """The catalog, indexing the collection into it first if it predates the catalog; None if unusable."""
+        if self.catalog is None:
+            return None
+        if self._catalog_ready:
+            return self.catalog
+        with self._catalog_lock:
+            try:
+                if not self.catalog.is_built():
+                    self._rebuild_catalog()
+            except Exception as exc:
+                logger.warning("Source catalog rebuild failed; listing sources scans Chroma. Error: %s", exc)
+                return None
+            self._catalog_ready = True
+        return self.catalog
+
+    def _rebuild_catalog(self) -> None:
+        logger.info("Indexing collection %s into the source catalog", self.collection_name)
+        self.catalog.reset(built=False)
+        offset = 0
+        while True:
+            page = self.collection.get(include=["documents", "metadatas"], limit=CATALOG_REBUILD_PAGE, offset=offset)
+            ids = page.get("ids") or []
+            if not ids:
+                break
+            self.catalog.record_upsert(
+                map(chunk_entry, ids, page.get("metadatas") or [None] * len(ids), page.get("documents") or [None] * len(ids))
+            )
+            offset += len(ids)
+        self.catalog.mark_built()
+
+    @staticmethod
+    def _tenant(filters: Optional[Dict[str, Any]]) -> Optional[Tuple[Any, Any]]:
+        """``(university, roll_no)`` when ``filters`` select exactly one tenant and nothing else."""
+        if isinstance(filters, dict) and set(filters) == {"university", "roll_no"}:
+            return filters["university"], filters["roll_no"]
+        return None
 
     def _build_where_clause(self, allowed_sources: Optional[List[str]], filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         # Enforce strict isolation at the lowest level
@@ -145,10 +308,20 @@ class ChromaVectorStore:
         except Exception:
             pass
         self._collection = self._ensure_collection()
+        self._update_catalog(lambda catalog: catalog.reset(built=True))
+        self.stats_cache.clear()
 
     def list_sources(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        # For listing sources, we just want distinct sources matching the filter.
-        # Chroma doesn't support 'distinct' queries efficiently, so we must fetch metadata.
+        if self._tenant(filters):
+            return self.stats(filters)["sources"]
+        return self._scan_sources(filters)
+
+    def _scan_sources(self, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        tenant = self._tenant(filters)
+        catalog = self._ready_catalog() if tenant else None
+        if catalog is not None:
+            return catalog.sources(*tenant)
+        # Other filters: Chroma can't group by source, so fetch the matching metadata.
         # Warning: This scales poorly if millions of docs exist.
         where = self._build_where_clause(None, filters)
         
@@ -169,11 +342,28 @@ class ChromaVectorStore:
         )
 
     def stats(self, filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        tenant = self._tenant(filters)
+        if tenant is None:
+            return self._compute_stats(filters)
+        key = tenant_key(*tenant)
+        cached, generation = self.stats_cache.get(key)
+        if cached is not None:
+            return cached
+        result = self._compute_stats(filters)
+        self.stats_cache.put(key, result, generation)
+        return result
+
+    def _compute_stats(self, filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        tenant = self._tenant(filters)
+        catalog = self._ready_catalog() if tenant else None
+        if catalog is not None:
+            sources = catalog.sources(*tenant)
+            return {"docs": sum(entry["chunks"] for entry in sources), "sources": sources}
         where = self._build_where_clause(None, filters)
         count = self.collection.count() if not where else len(self.collection.get(where=where)['ids'])
         return {
             "docs": count,
-            "sources": self.list_sources(filters),
+            "sources": self._scan_sources(filters),
         }
 
     def delete_document(self, source_id: str, filters: Optional[Dict[str, Any]] = None) -> int:
@@ -184,6 +374,9 @@ class ChromaVectorStore:
         ids = self.collection.get(where=where)['ids']
         if ids:
             self.collection.delete(ids=ids)
+            touched = self._update_catalog(lambda catalog: catalog.record_delete(ids))
+            tenant = self._tenant(filters)
+            self.stats_cache.invalidate(touched | ({tenant_key(*tenant)} if tenant else set()))
         return len(ids)
 
     def get_documents_by_source(
@@ -238,3 +431,129 @@ class ChromaVectorStore:
             
             formatted.append(item)
         return formatted
+
+
+def _directory_usage(directory: Path) -> Tuple[int, int]:
+    """``(bytes on disk, files)`` under ``directory``."""
+    total = files = 0
+    for path in directory.rglob("*"):
+        try:
+            if path.is_file():
+                total += path.stat().st_size
+                files += 1
+        except OSError:
+            continue
+    return total, files
+
+
+def _open_handles(directory: Path) -> Optional[int]:
+    """Descriptors this process holds on files under ``directory``; None where /proc is unavailable."""
+    fd_dir = Path("/proc/self/fd")
+    if not fd_dir.is_dir():
+        return None
+    prefix = f"{directory}{os.sep}"
+    count = 0
+    for fd in fd_dir.iterdir():
+        try:
+            if os.readlink(fd).startswith(prefix):
+                count += 1
+        except OSError:
+            continue
+    return count
+
+
+def _process_rss() -> Optional[int]:
+    try:
+        with open("/proc/self/statm", "r", encoding="ascii") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class VectorStoreRegistry:
+    """
+    Hands out one ``ChromaVectorStore`` per (persist directory, collection), all collections
+    of a directory sharing a single ``PersistentClient``. Directories are keyed by resolved
+    path, so ``chroma_store`` and ``./chroma_store`` are the same entry.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Any] = {}
+        self._stores: Dict[Tuple[str, str], ChromaVectorStore] = {}
+
+    def get(
+        self,
+        persist_directory: str = DEFAULT_PERSIST_DIRECTORY,
+        collection_name: str = DEFAULT_COLLECTION,
+    ) -> ChromaVectorStore:
+        directory = str(Path(persist_directory).resolve())
+        key = (directory, collection_name)
+        with self._lock:
+            store = self._stores.get(key)
+            if store is None:
+                client = self._clients.get(directory)
+                if client is None:
+                    logger.info("Opening Chroma client at %s", directory)
+                    client = self._clients[directory] = _open_client(directory)
+                store = self._stores[key] = ChromaVectorStore(directory, collection_name, client=client)
+            return store
+
+    def close(self) -> None:
+        """Close every client; the next ``get`` opens fresh ones."""
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+            self._stores.clear()
+        for directory, client in clients:
+            close = getattr(client, "close", None)
+            if close is None:
+                continue
+            try:
+                close()
+            except Exception as exc:  # pragma: no cover - depends on the chromadb version
+                logger.warning("Closing Chroma client at %s failed: %s", directory, exc)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            directories = list(self._clients)
+            stores = list(self._stores.items())
+        clients = []
+        for directory in directories:
+            path = Path(directory)
+            disk_bytes, files = _directory_usage(path) if path.exists() else (0, 0)
+            clients.append(
+                {
+                    "persist_directory": directory,
+                    "collections": [collection for (store_dir, collection), _ in stores if store_dir == directory],
+                    "stats_caches": {
+                        collection: store.stats_cache.stats()
+                        for (store_dir, collection), store in stores
+                        if store_dir == directory
+                    },
+                    "disk_bytes": disk_bytes,
+                    "files": files,
+                    "open_handles": _open_handles(path),
+                }
+            )
+        # Chroma keeps its segment caches in native memory, so only the process total is observable.
+        return {"clients": clients, "stores": len(stores), "process_rss_bytes": _process_rss()}
+
+
+_registry = VectorStoreRegistry()
+
+
+def get_vector_store(
+    persist_directory: str = DEFAULT_PERSIST_DIRECTORY,
+    collection_name: str = DEFAULT_COLLECTION,
+) -> ChromaVectorStore:
+    """The process-wide store for ``persist_directory``/``collection_name``, opened on first use."""
+    return _registry.get(persist_directory, collection_name)
+
+
+def close_vector_stores() -> None:
+    _registry.close()
+
+
+def vector_store_stats() -> Dict[str, Any]:
+    return _registry.stats()
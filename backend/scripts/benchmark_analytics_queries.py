@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+"""Benchmark analytics reads: ORDER BY datetime(timestamp) without tenant indexes versus the migrated schema."""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import closing
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+# (label, legacy query, rewritten query); every query is parameterised by (university, roll_no).
+QUERIES = [
+    (
+        "recent attempts",
+        "SELECT timestamp, topic, difficulty, was_correct, source_label, session_id FROM quiz_attempts"
+        " WHERE university = ? AND roll_no = ? ORDER BY datetime(timestamp) DESC LIMIT 200",
+        "SELECT timestamp, topic, difficulty, was_correct, source_label, session_id FROM quiz_attempts"
+        " WHERE university = ? AND roll_no = ? ORDER BY timestamp DESC, id DESC LIMIT 200",
+    ),
+    (
+        "latest session",
+        "SELECT session_id FROM quiz_attempts WHERE session_id IS NOT NULL AND TRIM(session_id) <> ''"
+        " AND university = ? AND roll_no = ? ORDER BY datetime(timestamp) DESC LIMIT 1",
+        "SELECT session_id FROM quiz_attempts WHERE session_id IS NOT NULL AND TRIM(session_id) <> ''"
+        " AND university = ? AND roll_no = ? ORDER BY timestamp DESC, id DESC LIMIT 1",
+    ),
+    (
+        "session overview",
+        "SELECT session_id, timestamp, was_correct, source_label FROM quiz_attempts"
+        " WHERE university = ? AND roll_no = ? ORDER BY datetime(timestamp) ASC",
+        "SELECT session_id, timestamp, was_correct, source_label FROM quiz_attempts"
+        " WHERE university = ? AND roll_no = ? ORDER BY timestamp ASC, id ASC",
+    ),
+    (
+        "retrieval count",
+        "SELECT COUNT(*) FROM retrieval_events WHERE university = ? AND roll_no = ?",
+        "SELECT COUNT(*) FROM retrieval_events WHERE university = ? AND roll_no = ?",
+    ),
+    (
+        "recent user events",
+        "SELECT event_type, timestamp FROM user_events"
+        " WHERE university = ? AND roll_no = ? ORDER BY datetime(timestamp) DESC LIMIT 50",
+        "SELECT event_type, timestamp FROM user_events"
+        " WHERE university = ? AND roll_no = ? ORDER BY timestamp DESC, id DESC LIMIT 50",
+    ),
+]
+
+
+def _timestamps(rng: random.Random, count: int) -> Iterator[str]:
+    start = datetime(2024, 1, 1)
+    for _ in range(count):
+        yield (start + timedelta(seconds=rng.randrange(365 * 24 * 3600))).isoformat()
+
+
+def populate(db_path: Path, events: int, tenants: int, seed: int) -> None:
+    """Split ``events`` evenly over quiz_attempts, retrieval_events and user_events."""
+    rng = random.Random(seed)
+    per_table = events // 3
+
+    def tenant(i: int) -> Tuple[str, str]:
+        return f"uni-{i % 7}", str(i % tenants)
+
+    quiz = (
+        (ts, *tenant(i), f"s{i // 10}", f"q{i}", f"topic-{i % 40}", "easy", i % 2, f"notes-{i % 25}.pdf")
+        for i, ts in enumerate(_timestamps(rng, per_table))
+    )
+    retrieval = ((ts, *tenant(i), f"s{i // 10}", "/qa", 5) for i, ts in enumerate(_timestamps(rng, per_table)))
+    users = ((ts, *tenant(i), f"s{i // 10}", "login") for i, ts in enumerate(_timestamps(rng, per_table)))
+    with closing(sqlite3.connect(db_path)) as conn, conn:
+        conn.executemany(
+            "INSERT INTO quiz_attempts (timestamp, university, roll_no, session_id, question_id, topic, difficulty,"
+            " was_correct, source_label) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            quiz,
+        )
+        conn.executemany(
+            "INSERT INTO retrieval_events (timestamp, university, roll_no, session_id, endpoint, top_k)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            retrieval,
+        )
+        conn.executemany(
+            "INSERT INTO user_events (timestamp, university, roll_no, session_id, event_type) VALUES (?, ?, ?, ?, ?)",
+            users,
+        )
+
+
+def best_of(runs: int, fn: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def plan(conn: sqlite3.Connection, sql: str, params: Sequence[str]) -> str:
+    return "; ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def run_queries(conn: sqlite3.Connection, column: int, params: Sequence[str], runs: int) -> Dict[str, float]:
+    timings = {}
+    for query in QUERIES:
+        label, sql = query[0], query[column]
+        timings[label] = best_of(runs, lambda: conn.execute(sql, params).fetchall())
+        print(f"  {label:<20} {timings[label] * 1000:>9.2f} ms  {plan(conn, sql, params)}")
+    return timings
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Time per-student analytics queries before and after the tenant/time indexes.")
+    parser.add_argument("--events", type=int, default=3_000_000, help="Synthetic rows across the three event tables")
+    parser.add_argument("--tenants", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "analytics.db"
+        os.environ["ANALYTICS_DB_PATH"] = str(db_path)
+        # Imported here so the schema is created at db_path.
+        from app import analytics
+
+        with closing(sqlite3.connect(db_path)) as conn:
+            for name in analytics._TENANT_TIME_INDEXES:
+                conn.execute(f"DROP INDEX {name}")
+        started = time.perf_counter()
+        populate(db_path, args.events, args.tenants, args.seed)
+        print(f"Inserted {args.events} events for {args.tenants} students in {time.perf_counter() - started:.1f}s")
+
+        params = ("uni-3", "3")
+        with closing(sqlite3.connect(db_path)) as conn:
+            print("Legacy (ORDER BY datetime(timestamp), no tenant/time indexes):")
+            legacy = run_queries(conn, 1, params, args.runs)
+
+        started = time.perf_counter()
+        analytics._ensure_schema()
+        print(f"Built tenant/time indexes in {time.perf_counter() - started:.1f}s")
+        with closing(sqlite3.connect(db_path)) as conn:
+            print("Migrated (ORDER BY timestamp, (university, roll_no, timestamp) indexes):")
+            migrated = run_queries(conn, 2, params, args.runs)
+
+        print("Speedup: " + ", ".join(f"{label} {legacy[label] / migrated[label]:.0f}x" for label in legacy))
+        overview = best_of(args.runs, lambda: analytics._collect_session_overview(university=params[0], roll_no=params[1]))
+        print(f"_collect_session_overview(): {overview * 1000:.2f} ms")
+        analytics.close_analytics_writer()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""Benchmark the RAG index modes: recall@k against exact search and p50/p99 query latency."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.rag import (  # noqa: E402
+    DEFAULT_EF_SEARCH,
+    DEFAULT_NPROBE,
+    INDEX_MODES,
+    PQ_RERANK_FACTOR,
+    _normalize,
+    ann_search_params,
+    build_ann_index,
+)
+
+logger = logging.getLogger("rag.benchmark")
+
+
+def synthetic_corpus(size: int, dim: int, seed: int, clusters: int = 256) -> np.ndarray:
+    """Unit vectors drawn around random centroids, which resembles embedded notes better than pure noise."""
+    rng = np.random.default_rng(seed)
+    centroids = _normalize(rng.standard_normal((clusters, dim)).astype("float32"))
+    corpus = np.empty((size, dim), dtype="float32")
+    step = 100_000
+    for start in range(0, size, step):
+        stop = min(start + step, size)
+        labels = rng.integers(0, clusters, stop - start)
+        noise = rng.standard_normal((stop - start, dim)).astype("float32") * 0.08
+        corpus[start:stop] = _normalize(centroids[labels] + noise)
+    return corpus
+
+
+def exact_top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    truth = np.empty((len(queries), k), dtype="int64")
+    for row, query in enumerate(queries):
+        scores = corpus @ query
+        top = np.argpartition(scores, -k)[-k:]
+        truth[row] = top[np.argsort(scores[top])[::-1]]
+    return truth
+
+
+def run_mode(
+    mode: str,
+    corpus: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    k: int,
+    nprobe: int,
+    ef_search: int,
+) -> Dict[str, float]:
+    build_started = time.perf_counter()
+    if mode == "flat":
+        index = None
+        params = None
+    else:
+        index = build_ann_index(corpus, mode)
+        params = ann_search_params(mode, nprobe=nprobe, ef_search=ef_search)
+    build_seconds = time.perf_counter() - build_started
+
+    latencies: List[float] = []
+    found = 0
+    for row, query in enumerate(queries):
+        started = time.perf_counter()
+        if index is None:
+            scores = corpus @ query
+            ids = np.argpartition(scores, -k)[-k:]
+        else:
+            fetch = k * PQ_RERANK_FACTOR if mode == "ivf_pq" else k
+            _, ids = index.search(query.reshape(1, -1), fetch, params=params)
+            ids = ids[0][ids[0] >= 0]
+            if mode == "ivf_pq":
+                # Same exact re-scoring of compressed candidates the index applies at query time.
+                ids = ids[np.argsort(corpus[ids] @ query)[::-1][:k]]
+        latencies.append((time.perf_counter() - started) * 1000)
+        found += len(np.intersect1d(ids, truth[row]))
+
+    return {
+        "recall": found / truth.size,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "build_s": build_seconds,
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare flat and approximate RAG index modes on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--modes", nargs="+", default=list(INDEX_MODES), choices=INDEX_MODES)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE)
+    parser.add_argument("--ef-search", type=int, default=DEFAULT_EF_SEARCH)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    print(f"{'size':>9}  {'mode':<9} {'recall@' + str(args.k):>9} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}")
+    for size in args.sizes:
+        logger.info("Generating %d x %d synthetic corpus", size, args.dim)
+        corpus = synthetic_corpus(size, args.dim, args.seed)
+        # Queries are perturbed corpus rows so every query has genuine near neighbours.
+        rng = np.random.default_rng(args.seed + 1)
+        picks = rng.integers(0, size, args.queries)
+        queries = _normalize(corpus[picks] + rng.standard_normal((args.queries, args.dim)).astype("float32") * 0.02)
+        queries = queries.astype("float32")
+        truth = exact_top_k(corpus, queries, args.k)
+
+        for mode in args.modes:
+            result = run_mode(mode, corpus, queries, truth, args.k, args.nprobe, args.ef_search)
+            print(
+                f"{size:>9}  {mode:<9} {result['recall']:>9.3f} {result['p50_ms']:>8.2f} "
+                f"{result['p99_ms']:>8.2f} {result['build_s']:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""Micro-benchmark chunk annotation: per-phrase substring checks versus the compiled phrase matcher."""
+
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.analytics import derive_chunk_topics  # noqa: E402
+from app.chunking import Chunker  # noqa: E402
+from app.ingest import STOP_WORDS, _annotate_chunks, _derive_chunk_keywords, extract_structured_content  # noqa: E402
+from app.tokenization import tokenize  # noqa: E402
+
+SUBJECTS = ["cell", "enzyme", "membrane", "gene", "protein", "tissue", "organ", "neuron", "hormone", "virus"]
+VERBS = ["regulates", "transports", "stores", "signals", "binds", "copies", "repairs", "divides"]
+
+
+def synthetic_document(pages: int, seed: int) -> str:
+    """Pages of roughly 3,000 characters with a heading, definitions, examples and plain prose each."""
+    rng = random.Random(seed)
+    out: List[str] = []
+    for page in range(pages):
+        subject = rng.choice(SUBJECTS)
+        out.append(f"UNIT {page + 1} {subject.upper()} STRUCTURE AND FUNCTION")
+        for paragraph in range(5):
+            prose = " ".join(
+                f"The {rng.choice(SUBJECTS)} {rng.choice(VERBS)} the {rng.choice(SUBJECTS)} in stage {rng.randrange(50)}."
+                for _ in range(8)
+            )
+            out.append(prose)
+        out.append(f"{subject.title()} pathway {page}: the ordered reactions by which a {subject} {rng.choice(VERBS)} its target.")
+        example = f"For example, a {subject} in experiment {page} {rng.choice(VERBS)} the sample within minutes of exposure."
+        if page % 2:
+            # Long examples are stored truncated with "...", so they never match a chunk verbatim.
+            example += " " + " ".join(f"Trial {trial} repeated the measurement." for trial in range(12))
+        out.append(example)
+    return "\n\n".join(out)
+
+
+def substring_annotations(chunks: List[str], structured: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Reference: the previous implementation, testing every phrase against every lowered chunk."""
+    headings = structured.get("headings", [])
+    examples = structured.get("examples", [])
+    definitions = structured.get("definitions", [])
+    found = []
+    for chunk in chunks:
+        lowered = chunk.lower()
+        heading = next((h for h in headings if h.lower() in lowered), None)
+        definition = next((d for d in definitions if d.get("term", "").lower() in lowered), None)
+        example = next((e for e in examples if e.lower() in lowered), None)
+        found.append({"heading": heading, "definitionTerm": definition.get("term") if definition else None, "example": example})
+    return found
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Time chunk annotation on a synthetic multi-page document.")
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    text = synthetic_document(args.pages, args.seed)
+    spans = Chunker().spans(text)
+    chunks = [text[start:end] for start, end in spans]
+    tokenized = tokenize(text, spans, STOP_WORDS)
+    structured = extract_structured_content(text, term_counts=tokenized.term_counts)
+    topics = derive_chunk_topics(chunks, term_counts=tokenized.chunk_term_counts)
+    phrases = len(structured["headings"]) + len(structured["definitions"]) + len(structured["examples"])
+
+    def reference() -> None:
+        substring_annotations(chunks, structured)
+        for counts in tokenized.chunk_term_counts:
+            _derive_chunk_keywords("", counts=counts)
+
+    def per_chunk() -> None:
+        _annotate_chunks(chunks, structured, topics, tokenized.chunk_term_counts)
+
+    def per_document() -> None:
+        _annotate_chunks(chunks, structured, topics, tokenized.chunk_term_counts, text, spans)
+
+    timings = {}
+    for name, fn in (("substring", reference), ("per_chunk", per_chunk), ("per_document", per_document)):
+        best = float("inf")
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        timings[name] = best
+
+    annotations = _annotate_chunks(chunks, structured, topics, tokenized.chunk_term_counts, text, spans)
+    projected = [{key: entry[key] for key in ("heading", "definitionTerm", "example")} for entry in annotations]
+    print(f"{args.pages} pages, {len(text):,} chars, {len(chunks)} chunks, {phrases} phrases")
+    print(f"{'substring checks':<17}: {timings['substring'] * 1000:8.1f} ms")
+    for name, label in (("per_chunk", "matcher per chunk"), ("per_document", "matcher per doc")):
+        print(f"{label:<17}: {timings[name] * 1000:8.1f} ms  ({timings['substring'] / timings[name]:.2f}x)")
+    per_chunk_annotations = _annotate_chunks(chunks, structured, topics, tokenized.chunk_term_counts)
+    print(f"{'same annotations':<17}: {projected == substring_annotations(chunks, structured) and per_chunk_annotations == annotations}")
+
+
+if __name__ == "__main__":
+    main()
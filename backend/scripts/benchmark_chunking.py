@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+"""Benchmark the chunking strategies: retrieval recall@k on synthetic notes and chunking/ingest throughput."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import sys
+import textwrap
+import time
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.chunking import Chunker, strategy_names  # noqa: E402
+from app.ingest import _hash_embedding, embed_texts  # noqa: E402
+
+logger = logging.getLogger("chunking.benchmark")
+
+TOPICS = [
+    "photosynthesis", "respiration", "mitosis", "meiosis", "osmosis", "enzymes", "genetics", "evolution",
+    "ecology", "immunity", "hormones", "neurons", "thermodynamics", "optics", "circuits", "kinematics",
+]
+PROPERTIES = ["rate", "location", "product", "input", "regulator", "inhibitor", "byproduct", "stage", "unit", "origin"]
+FILLER = [
+    "Revise this before the midterm.",
+    "The lecture slides repeat this point with a diagram.",
+    "Several textbooks describe it in slightly different words.",
+    "Students often confuse this with a related idea.",
+    "Past papers have asked about it in short-answer form.",
+]
+
+
+def synthetic_notes(sections: int, facts_per_section: int, seed: int) -> Tuple[str, List[Tuple[str, str]]]:
+    """Headed lecture notes wrapped at 80 columns like PDF text; returns the text and (question, fact) pairs."""
+    rng = random.Random(seed)
+    parts: List[str] = []
+    questions: List[Tuple[str, str]] = []
+    for number in range(sections):
+        topic = f"{rng.choice(TOPICS)}{number}"
+        sentences = []
+        for index in range(facts_per_section):
+            prop = f"{rng.choice(PROPERTIES)}{index}"
+            value = f"value{rng.randrange(10**6)}"
+            fact = f"The {prop} of {topic} is {value} according to the reference tables."
+            sentences.append(fact)
+            sentences.extend(rng.sample(FILLER, 2))
+            questions.append((f"What is the {prop} of {topic}?", fact))
+        body = textwrap.fill(" ".join(sentences), width=80)
+        parts.append(f"{number + 1}. {topic.title()} Overview\n{body}")
+    return "\n\n".join(parts), questions
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def embed(texts: Sequence[str], backend: str) -> np.ndarray:
+    if backend == "hash":
+        return _normalize(np.asarray([_hash_embedding(text) for text in texts], dtype="float32"))
+    return _normalize(np.asarray(embed_texts(list(texts)), dtype="float32"))
+
+
+def run_strategy(
+    chunker: Chunker, text: str, questions: List[Tuple[str, str]], query_vectors: np.ndarray, k: int, backend: str
+) -> Dict[str, float]:
+    started = time.perf_counter()
+    spans = chunker.spans(text)
+    chunk_seconds = time.perf_counter() - started
+    chunks = [text[start:end] for start, end in spans]
+
+    started = time.perf_counter()
+    vectors = embed(chunks, backend)
+    embed_seconds = time.perf_counter() - started
+
+    # A question counts as answered when a top-k chunk holds its whole fact sentence (line wraps ignored).
+    flattened = [" ".join(chunk.split()) for chunk in chunks]
+    hits = 0
+    for (_, fact), query in zip(questions, query_vectors):
+        top = np.argsort(vectors @ query)[::-1][:k]
+        hits += any(fact in flattened[row] for row in top)
+
+    return {
+        "chunks": len(spans),
+        "avg_chars": float(np.mean([end - start for start, end in spans])) if spans else 0.0,
+        "recall": hits / len(questions),
+        "chunk_mb_s": len(text) / 1e6 / max(chunk_seconds, 1e-9),
+        "ingest_s": chunk_seconds + embed_seconds,
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare chunking strategies on synthetic headed notes.")
+    parser.add_argument("--strategies", nargs="+", default=strategy_names(), choices=strategy_names())
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--facts", type=int, default=12, help="facts per section")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--embedder", choices=("hash", "model"), default="hash",
+                        help="hash: deterministic bag-of-words vectors; model: the configured embedding backend")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    text, questions = synthetic_notes(args.sections, args.facts, args.seed)
+    questions = random.Random(args.seed + 1).sample(questions, min(args.queries, len(questions)))
+    logger.info("Corpus: %d characters, %d questions, %s embeddings", len(text), len(questions), args.embedder)
+    query_vectors = embed([question for question, _ in questions], args.embedder)
+
+    print(f"{'strategy':<22} {'chunks':>7} {'avg chars':>9} {'recall@' + str(args.k):>9} {'chunk MB/s':>10} {'ingest s':>9}")
+    for name in args.strategies:
+        chunker = Chunker(name)
+        result = run_strategy(chunker, text, questions, query_vectors, args.k, args.embedder)
+        print(
+            f"{chunker.config_tag:<22} {result['chunks']:>7} {result['avg_chars']:>9.0f} {result['recall']:>9.3f} "
+            f"{result['chunk_mb_s']:>10.1f} {result['ingest_s']:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""Benchmark the local embedding backends: chunks/sec and cosine agreement with the torch reference."""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.chunking import Chunker  # noqa: E402
+from app.embedding_backends import (  # noqa: E402
+    EMBED_BATCH_SIZE,
+    EMBED_THREADS,
+    SENTENCE_TRANSFORMER_MODEL,
+    backend_names,
+    create_backend,
+)
+
+from benchmark_chunking import synthetic_notes  # noqa: E402
+
+logger = logging.getLogger("embeddings.benchmark")
+
+
+def run_backend(name: str, chunks: List[str], model: str, batch_size: int, threads: int) -> Dict[str, object]:
+    backend = create_backend(name, model_name=model, batch_size=batch_size, threads=threads)
+    started = time.perf_counter()
+    backend.load()
+    load_seconds = time.perf_counter() - started
+    backend.encode(chunks[:batch_size])  # warm-up: first-call allocations and graph optimisation
+    started = time.perf_counter()
+    vectors = backend.encode(chunks)
+    seconds = time.perf_counter() - started
+    return {"vectors": vectors, "chunks_per_s": len(chunks) / seconds, "load_s": load_seconds}
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare torch, ONNX and int8 ONNX embedding backends on CPU.")
+    parser.add_argument("--backends", nargs="+", default=backend_names(), choices=backend_names())
+    parser.add_argument("--reference", default="torch", choices=backend_names())
+    parser.add_argument("--model", default=SENTENCE_TRANSFORMER_MODEL)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE)
+    parser.add_argument("--threads", type=int, default=EMBED_THREADS)
+    parser.add_argument("--min-cosine", type=float, default=0.99, help="quality bar: mean cosine to the reference")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    text, _ = synthetic_notes(max(1, args.chunks // 2), 12, seed=0)
+    chunks = [text[start:end] for start, end in Chunker().spans(text)][: args.chunks]
+    logger.info("Embedding %d chunks with %s", len(chunks), args.model)
+
+    order = [args.reference] + [name for name in args.backends if name != args.reference]
+    results: Dict[str, Dict[str, object]] = {}
+    reference: Optional[np.ndarray] = None
+    print(f"{'backend':<10} {'load s':>7} {'chunks/s':>9} {'mean cos':>9} {'min cos':>8}  meets bar")
+    for name in order:
+        try:
+            result = run_backend(name, chunks, args.model, args.batch_size, args.threads)
+        except Exception as exc:
+            print(f"{name:<10} unavailable: {exc}")
+            continue
+        vectors = result["vectors"]
+        if reference is None and name == args.reference:
+            reference = vectors
+        cosines = np.sum(vectors * reference, axis=1) if reference is not None else np.full(len(chunks), np.nan)
+        result["mean_cos"] = float(np.mean(cosines))
+        results[name] = result
+        meets = bool(result["mean_cos"] >= args.min_cosine)
+        print(
+            f"{name:<10} {result['load_s']:>7.1f} {result['chunks_per_s']:>9.1f} "
+            f"{result['mean_cos']:>9.4f} {float(np.min(cosines)):>8.4f}  {'yes' if meets else 'no'}"
+        )
+
+    eligible = [name for name, result in results.items() if result["mean_cos"] >= args.min_cosine]
+    if eligible:
+        best = max(eligible, key=lambda name: results[name]["chunks_per_s"])
+        print(f"\nFastest backend meeting mean cosine >= {args.min_cosine}: EMBED_BACKEND={best}")
+
+
+if __name__ == "__main__":
+    main()
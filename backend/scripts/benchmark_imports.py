@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+"""Measure the cold import time of the backend (``import app.main``) and check it against the tracked baseline."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_PATH = ROOT / "scripts" / "import_baseline.json"
+
+# Loaded on first use; any of these showing up at import time is a regression.
+LAZY_MODULES = ("chromadb", "torch", "sentence_transformers", "transformers", "openai", "plotly", "faiss", "onnxruntime")
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def measure(target: str) -> Tuple[float, Dict[str, float]]:
+    """One fresh interpreter importing ``target``: total ms and cumulative ms per top-level package/app module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=ROOT,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0.0
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative_ms = int(match.group(2)) / 1000
+        name = match.group(4)
+        if name == target:
+            total = cumulative_ms
+        # A package's cumulative time covers the submodules imported from its __init__; the
+        # backend's own modules are listed individually since app/__init__ imports nothing.
+        if "." not in name or name.startswith("app."):
+            packages[name] = cumulative_ms
+    return total, packages
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the backend's cold import time.")
+    parser.add_argument("--target", default="app.main")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time; the median is reported")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--check", action="store_true",
+                        help="fail when a lazy module is imported or the median exceeds the baseline by --tolerance")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown over the baseline (0.5 = +50%%)")
+    parser.add_argument("--write-baseline", action="store_true", help=f"record this run in {BASELINE_PATH.name}")
+    args = parser.parse_args(argv)
+
+    totals: List[float] = []
+    runs: List[Dict[str, float]] = []
+    for _ in range(max(1, args.runs)):
+        total, packages = measure(args.target)
+        totals.append(total)
+        runs.append(packages)
+    median = statistics.median(totals)
+    packages = {name: statistics.median(run.get(name, 0.0) for run in runs) for name in set().union(*runs)}
+
+    print(f"import {args.target}: median {median:.0f} ms over {len(totals)} runs (min {min(totals):.0f}, max {max(totals):.0f})")
+    print(f"{'package':<28} {'ms':>8}")
+    for name, ms in sorted(packages.items(), key=lambda item: item[1], reverse=True)[: args.top]:
+        print(f"{name:<28} {ms:>8.0f}")
+
+    if args.write_baseline:
+        BASELINE_PATH.write_text(json.dumps({"target": args.target, "total_ms": round(median)}, indent=2) + "\n")
+        print(f"Wrote {BASELINE_PATH}")
+
+    if not args.check:
+        return 0
+    failures = [f"{name} is imported eagerly" for name in LAZY_MODULES if name in packages]
+    if BASELINE_PATH.exists():
+        baseline = json.loads(BASELINE_PATH.read_text())
+        limit = baseline["total_ms"] * (1 + args.tolerance)
+        if median > limit:
+            failures.append(f"median {median:.0f} ms exceeds baseline {baseline['total_ms']} ms + {args.tolerance:.0%}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
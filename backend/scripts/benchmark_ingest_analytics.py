@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""Benchmark ingest analytics: per-chunk re-tokenization versus the shared single tokenization pass."""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Sequence
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.analytics import derive_chunk_topics  # noqa: E402
+from app.chunking import Chunker  # noqa: E402
+from app.ingest import STOP_WORDS, _annotate_chunks, extract_structured_content  # noqa: E402
+from app.tokenization import tokenize  # noqa: E402
+
+from benchmark_chunking import synthetic_notes  # noqa: E402
+
+
+def per_chunk(text: str, spans) -> Dict[str, object]:
+    token_count = len(re.findall(r"[A-Za-z][\w-]+", text))
+    chunks = [text[start:end] for start, end in spans]
+    topics = derive_chunk_topics(chunks)
+    structured = extract_structured_content(text)
+    annotations = _annotate_chunks(chunks, structured, topics)
+    return {"token_count": token_count, "topics": topics, "keywords": structured["keywords"], "annotations": annotations}
+
+
+def single_pass(text: str, spans) -> Dict[str, object]:
+    tokenized = tokenize(text, spans, STOP_WORDS)
+    chunks = [text[start:end] for start, end in spans]
+    chunk_terms = tokenized.chunk_term_counts
+    topics = derive_chunk_topics(chunks, term_counts=chunk_terms)
+    structured = extract_structured_content(text, term_counts=tokenized.term_counts)
+    annotations = _annotate_chunks(chunks, structured, topics, chunk_terms)
+    return {
+        "token_count": tokenized.token_count,
+        "topics": topics,
+        "keywords": structured["keywords"],
+        "annotations": annotations,
+    }
+
+
+def best_of(runs: int, fn: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Time ingest analytics with and without the shared tokenization pass.")
+    parser.add_argument("--sections", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--strategy", default="heading")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    chunker = Chunker(args.strategy)
+    print(f"{'chars':>10} {'chunks':>7} {'per-chunk s':>12} {'single-pass s':>14} {'speedup':>8}  same output")
+    for sections in args.sections:
+        text, _ = synthetic_notes(sections, 12, seed=sections)
+        spans = chunker.spans(text)
+        legacy = best_of(args.runs, lambda: per_chunk(text, spans))
+        shared = best_of(args.runs, lambda: single_pass(text, spans))
+        same = per_chunk(text, spans) == single_pass(text, spans)
+        print(f"{len(text):>10} {len(spans):>7} {legacy:>12.3f} {shared:>14.3f} {legacy / shared:>7.2f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
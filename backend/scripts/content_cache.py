@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""Inspect, trim or purge the content-addressed extraction/embedding cache."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))
+
+from app.content_cache import DEFAULT_CACHE_DIR, ContentCache  # noqa: E402
+
+logger = logging.getLogger("content_cache")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the content-addressed ingestion cache.")
+    parser.add_argument("command", choices=("stats", "evict", "purge"), help="What to do with the cache.")
+    parser.add_argument("--dir", type=Path, default=DEFAULT_CACHE_DIR, help="Cache directory (default: %(default)s).")
+    parser.add_argument(
+        "--max-mb",
+        type=float,
+        default=None,
+        help="For 'evict': shrink the cache to this many MB (default: the configured limit).",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    cache = ContentCache(root=args.dir)
+
+    if args.command == "purge":
+        result = cache.purge()
+        logger.info("Removed %d entries (%.1f MB)", result["entries_removed"], result["bytes_freed"] / (1024 * 1024))
+    elif args.command == "evict":
+        target = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else cache.max_bytes
+        removed = cache.evict(target_bytes=target)
+        logger.info("Evicted %d entries", removed)
+    print(json.dumps(cache.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -15,7 +15,7 @@ if str(ROOT) not in sys.path:
 
 from app.ingest import ingest_bytes  # noqa: E402
 from app.rag import reset_index  # noqa: E402
-from app.vector_store import ChromaVectorStore  # noqa: E402
+from app.vector_store import close_vector_stores, get_vector_store  # noqa: E402
 
 logger = logging.getLogger("rag.ingest")
 
@@ -48,7 +48,7 @@ def main() -> None:
 
     logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
 
-    store = ChromaVectorStore()
+    store = get_vector_store()
     if args.reset:
         logger.info("Resetting vector stores before ingestion.")
         store.clear()
@@ -75,6 +75,7 @@ def main() -> None:
             logger.info("Skipped %s (no text extracted)", file_path.name)
 
     logger.info("Ingestion complete: %d files, %d chunks", processed_files, total_chunks)
+    close_vector_stores()
 
 
 if __name__ == "__main__":
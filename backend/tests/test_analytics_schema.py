@@ -0,0 +1,44 @@
+import sqlite3
+
+from app import analytics
+
+
+def test_migration_normalizes_timestamps_and_indexes_tenant_timelines(tmp_path, monkeypatch):
+    db_path = tmp_path / "analytics.db"
+    with sqlite3.connect(db_path) as conn:
+        # A database written before the migration: mixed timestamp formats, no tenant/time index.
+        conn.execute(
+            "CREATE TABLE quiz_attempts (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL,"
+            " university TEXT, roll_no TEXT, session_id TEXT, question_id TEXT, topic TEXT, difficulty TEXT,"
+            " was_correct INTEGER, selected_option TEXT, correct_option TEXT, latency_ms INTEGER,"
+            " source_label TEXT, metadata TEXT)"
+        )
+        conn.executemany(
+            "INSERT INTO quiz_attempts (timestamp, university, roll_no, session_id, question_id, was_correct)"
+            " VALUES (?, 'U', '1', ?, ?, 1)",
+            [
+                ("2024-03-01 09:00:00", "old", "q1"),
+                ("2024-03-01T10:00:00.123456", "mid", "q2"),
+                ("2024-03-01T12:30:00+02:00", "new", "q3"),
+            ],
+        )
+    monkeypatch.setattr(analytics, "_DB_PATH", db_path)
+    analytics._ensure_schema()
+
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == analytics.SCHEMA_VERSION
+        stamps = [row[0] for row in conn.execute("SELECT timestamp FROM quiz_attempts ORDER BY id")]
+        plan = " ".join(
+            row[3]
+            for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT session_id FROM quiz_attempts"
+                " WHERE university = ? AND roll_no = ? ORDER BY timestamp DESC, id DESC LIMIT 1",
+                ("U", "1"),
+            )
+        )
+    assert stamps == ["2024-03-01T09:00:00", "2024-03-01T10:00:00", "2024-03-01T10:30:00"]
+    assert "idx_quiz_attempts_tenant_time" in plan and "TEMP B-TREE" not in plan
+
+    assert analytics._get_latest_session_id(university="U", roll_no="1") == "new"
+    rows = analytics._fetch_quiz_attempt_rows(limit=2, university="U", roll_no="1")
+    assert [row["session_id"] for row in rows] == ["mid", "new"]
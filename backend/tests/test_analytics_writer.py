@@ -0,0 +1,63 @@
+import sqlite3
+import threading
+
+from app.analytics_writer import AnalyticsWriter
+
+INSERT_A = "INSERT INTO a (value) VALUES (?)"
+INSERT_B = "INSERT INTO b (value) VALUES (?)"
+
+
+def _db(tmp_path):
+    path = tmp_path / "events.db"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE a (value INTEGER)")
+        conn.execute("CREATE TABLE b (value INTEGER)")
+    return path
+
+
+def _rows(path, table):
+    with sqlite3.connect(path) as conn:
+        return [row[0] for row in conn.execute(f"SELECT value FROM {table} ORDER BY rowid")]
+
+
+def test_events_are_group_committed_in_order(tmp_path):
+    path = _db(tmp_path)
+    writer = AnalyticsWriter(path, batch_size=50, flush_ms=50)
+    threads = [
+        threading.Thread(target=lambda n=n: [writer.submit(INSERT_A if i % 2 else INSERT_B, (n * 100 + i,)) for i in range(100)])
+        for n in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert writer.flush(timeout=5)
+    assert len(_rows(path, "a")) == len(_rows(path, "b")) == 200
+    per_thread = [value for value in _rows(path, "a") if value < 100]
+    assert per_thread == sorted(per_thread)
+    stats = writer.stats()
+    assert (stats["enqueued"], stats["written"], stats["dropped"], stats["queue_depth"]) == (400, 400, 0, 0)
+    assert stats["batches"] < 400
+    writer.close()
+
+
+def test_full_queue_drops_and_close_flushes(tmp_path):
+    path = _db(tmp_path)
+    writer = AnalyticsWriter(path, max_queue=5, batch_size=100, flush_ms=1000)
+    # Hold the database write lock so the writer cannot drain the queue.
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    accepted = [writer.submit(INSERT_A, (i,)) for i in range(1000)]
+    blocker.execute("ROLLBACK")
+    blocker.close()
+
+    writer.close()
+    assert accepted.count(False) == writer.stats()["dropped"] > 0
+    assert len(_rows(path, "a")) == accepted.count(True)
+
+    # A closed writer restarts on the next event.
+    assert writer.submit(INSERT_B, (1,))
+    assert writer.flush(timeout=5)
+    assert _rows(path, "b") == [1]
+    writer.close()
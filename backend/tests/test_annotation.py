@@ -0,0 +1,31 @@
+from app.ingest import _PhraseMatcher, _annotate_chunks
+
+PHRASES = ["cell", "cell wall", "wall street", "mitosis", "example: onion root tip"]
+
+
+def test_matcher_reports_overlapping_and_prefix_phrases():
+    matcher = _PhraseMatcher(PHRASES)
+    assert matcher.find("the cell wall street") == {"cell", "cell wall", "wall street"}
+    assert matcher.find("meiosis only") == set()
+
+    text = "plant cell wall. mitosis in the onion"
+    spans = [(0, 10), (0, 15), (6, 37)]
+    assert matcher.find_in_spans(text, spans) == [matcher.find(text[start:end]) for start, end in spans]
+    # "cell wall" runs past the first chunk, but its prefix "cell" is inside it.
+    assert matcher.find_in_spans(text, spans)[0] == {"cell"}
+
+
+def test_annotations_pick_the_first_listed_phrase_present():
+    text = "CELL DIVISION\nMitosis splits a cell. For example: onion root tip cells divide quickly.\nOsmosis: water movement."
+    spans = [(0, 60), (14, len(text))]
+    chunks = [text[start:end] for start, end in spans]
+    structured = {
+        "headings": ["Meiosis", "Cell Division", "Mitosis"],
+        "definitions": [{"term": "Osmosis", "definition": "water movement."}],
+        "examples": ["For example: onion root tip cells divide quickly."],
+    }
+    per_document = _annotate_chunks(chunks, structured, [], text=text, spans=spans)
+    assert per_document == _annotate_chunks(chunks, structured, [])
+    assert [entry["heading"] for entry in per_document] == ["Cell Division", "Mitosis"]
+    assert [entry["definitionTerm"] for entry in per_document] == [None, "Osmosis"]
+    assert per_document[1]["example"] == structured["examples"][0] and per_document[0]["example"] is None
@@ -0,0 +1,146 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import httpx
+
+from app import utils
+
+
+def _install_mock_client(handler):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    utils._async_http_clients[asyncio.get_running_loop()] = client
+    return client
+
+
+def test_async_groq_and_ollama_calls_share_the_loop_client(monkeypatch):
+    monkeypatch.setattr(utils, "_get_groq_api_key", lambda: "test-key")
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        body = json.loads(request.content)
+        if request.url.path.endswith("/chat/completions"):
+            assert request.headers["Authorization"] == "Bearer test-key"
+            return httpx.Response(200, json={"choices": [{"message": {"content": f" {body['model']} ok "}}]})
+        return httpx.Response(200, json={"response": f"{body['prompt']} done"})
+
+    async def scenario():
+        client = _install_mock_client(handler)
+        groq = await utils._acall_groq_chat_completion(
+            [{"role": "user", "content": "hi"}], temperature=0.1, max_tokens=10, model="m1"
+        )
+        ollama = await utils._acall_ollama_generate("llama", "prompt")
+        assert utils.get_async_http_client() is client
+        await utils.aclose_async_http_client()
+        return groq, ollama
+
+    groq, ollama = asyncio.run(scenario())
+    assert groq == "m1 ok"
+    assert ollama == "prompt done"
+    assert seen == ["/openai/v1/chat/completions", "/api/generate"]
+
+
+def test_async_answer_falls_back_locally_when_providers_fail(monkeypatch):
+    monkeypatch.setattr(utils, "_get_qa_llm_provider", lambda: "groq")
+    monkeypatch.setattr(utils, "_get_groq_api_key", lambda: "test-key")
+
+    async def scenario():
+        _install_mock_client(lambda request: httpx.Response(503, text="busy"))
+        try:
+            return await utils.agenerate_answer_with_context(
+                "What do mitochondria produce?",
+                ["Mitochondria produce ATP for the cell. Ribosomes build proteins."],
+            )
+        finally:
+            await utils.aclose_async_http_client()
+
+    answer = asyncio.run(scenario())
+    assert answer.startswith("(Local fallback)")
+    assert "ATP" in answer
+
+
+def test_groq_stream_yields_deltas_in_order(monkeypatch):
+    monkeypatch.setattr(utils, "_get_groq_api_key", lambda: "test-key")
+    body = (
+        'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "Cells "}}]}\n\n'
+        'data: {"choices": [{"delta": {"content": "divide."}}]}\n\n'
+        "data: [DONE]\n\n"
+    )
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert json.loads(request.content)["stream"] is True
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    async def scenario():
+        _install_mock_client(handler)
+        try:
+            return [
+                piece
+                async for piece in utils._astream_groq_chat_completion(
+                    [{"role": "user", "content": "hi"}], temperature=0.1, max_tokens=10
+                )
+            ]
+        finally:
+            await utils.aclose_async_http_client()
+
+    assert asyncio.run(scenario()) == ["Cells ", "divide."]
+
+
+def test_summary_stream_falls_back_to_local_chunks(monkeypatch):
+    monkeypatch.setattr(utils, "_get_groq_api_key", lambda: None)
+    monkeypatch.setattr(utils, "set_openai_key_from_env", lambda: False)
+    contexts = ["Photosynthesis converts light energy into chemical energy stored in glucose. " * 3]
+
+    async def scenario():
+        return [piece async for piece in utils.astream_summary(contexts)]
+
+    pieces = asyncio.run(scenario())
+    assert len(pieces) > 1
+    assert "".join(pieces) == utils._local_summary_fallback(contexts)
+
+
+def test_streamed_qa_emits_sources_then_tokens_then_done(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import app.main as main
+
+    monkeypatch.setattr(main, "embed_query", lambda text: [0.0] * 384)
+    with TestClient(main.app) as client:
+        login = client.post(
+            "/auth/login", json={"university": "SCA", "roll_no": f"stream_{uuid4()}", "password": "smart2025"}
+        )
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        response = client.post("/qa", json={"question": "What is osmosis?", "stream": True}, headers=headers)
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in response.text.strip().split("\n\n")
+    ]
+    assert [name for name, _ in events] == ["sources", "token", "done"]
+    assert events[0][1] == {"sources": []}
+
+
+def test_streamed_document_summary_logs_time_to_first_token(monkeypatch):
+    from app.models.student import Student
+    from app.routers import documents
+
+    async def fake_stream(texts):
+        for piece in ("Cells ", "divide."):
+            yield piece
+
+    logged = []
+    monkeypatch.setattr(documents, "astream_summary", fake_stream)
+    monkeypatch.setattr(documents, "log_summary_event", lambda *args, **kwargs: logged.append((args, kwargs)))
+    student = Student.model_construct(university="U", roll_no="1")
+
+    async def scenario():
+        return [event async for event in documents._stream_summary(["chunk"], ["notes.pdf"], "s1", student)]
+
+    events = asyncio.run(scenario())
+    assert len(events) == 4
+    (session_id, topic, chunk_count, _), kwargs = logged[0]
+    assert (session_id, chunk_count, kwargs["university"], kwargs["roll_no"]) == ("s1", 1, "U", "1")
+    assert kwargs["first_token_ms"] is not None and kwargs["metadata"]["streamed"] is True
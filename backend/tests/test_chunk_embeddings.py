@@ -0,0 +1,68 @@
+import numpy as np
+
+from app import ingest
+from app.chunk_embeddings import ChunkEmbeddingStore, chunk_hash
+
+
+class _MemoryStore:
+    def __init__(self):
+        self.docs = []
+
+    def add_documents(self, docs):
+        self.docs.extend(docs)
+
+
+def test_store_round_trip_across_instances(tmp_path):
+    writer = ChunkEmbeddingStore(tmp_path, "model-a")
+    keys = [chunk_hash("alpha"), chunk_hash("beta"), chunk_hash("alpha")]
+    vectors = np.array([[1, 0, 0], [0, 1, 0], [1, 0, 0]], dtype="float32")
+
+    assert writer.add(keys, vectors) == 2
+    assert writer.add(keys[:1], vectors[:1]) == 0
+
+    # A second instance stands in for another worker process sharing the directory.
+    reader = ChunkEmbeddingStore(tmp_path, "model-a")
+    found = reader.lookup([chunk_hash("beta"), chunk_hash("gamma")])
+    assert list(found) == [chunk_hash("beta")]
+    assert found[chunk_hash("beta")].tolist() == [0.0, 1.0, 0.0]
+    assert reader.stats()["rows"] == 2 and reader.stats()["hit_rate"] == 0.5
+
+    writer.add([chunk_hash("gamma")], np.array([[0, 0, 1]], dtype="float32"))
+    assert reader.lookup([chunk_hash("gamma")])[chunk_hash("gamma")].tolist() == [0.0, 0.0, 1.0]
+    assert ChunkEmbeddingStore(tmp_path, "model-b").lookup([chunk_hash("beta")]) == {}
+
+
+def test_ingest_embeds_only_novel_chunks(tmp_path, monkeypatch):
+    store = ChunkEmbeddingStore(tmp_path, ingest._primary_embed_tag())
+    monkeypatch.setattr(ingest, "get_content_cache", lambda: None)
+    monkeypatch.setattr(ingest, "get_chunk_embedding_store", lambda model: store)
+    monkeypatch.setattr(ingest, "add_to_index", lambda docs: None)
+    embedded = []
+
+    def fake_embed(texts):
+        embedded.extend(texts)
+        return [[float(len(text)), 1.0] for text in texts], ingest._primary_embed_tag()
+
+    monkeypatch.setattr(ingest, "_embed_texts_tagged", fake_embed)
+    shared = "The cell membrane regulates what enters and leaves the cell. " * 40
+    first = ingest.ingest_bytes(shared.encode(), _MemoryStore(), "a.txt", with_metrics=True)
+    calls_after_first = len(embedded)
+    extended = shared + "Ribosomes assemble proteins from amino acids. " * 40
+    second_store = _MemoryStore()
+    second = ingest.ingest_bytes(extended.encode(), second_store, "b.txt", with_metrics=True)
+
+    assert first["embedding_dedup"]["embedded"] == calls_after_first
+    assert 0 < second["embedding_dedup"]["embedded"] < second["embedding_dedup"]["chunks"]
+    assert second["embedding_dedup"]["ratio"] > 0
+    assert len(embedded) == calls_after_first + second["embedding_dedup"]["embedded"]
+    assert all(doc["embedding"] == [float(len(doc["text"])), 1.0] for doc in second_store.docs)
+
+
+def test_fallback_vectors_are_not_shared(tmp_path, monkeypatch):
+    store = ChunkEmbeddingStore(tmp_path, ingest._primary_embed_tag())
+    monkeypatch.setattr(ingest, "get_chunk_embedding_store", lambda model: store)
+    monkeypatch.setattr(ingest, "_embed_texts_tagged", lambda texts: ([[0.0, 1.0] for _ in texts], "hash"))
+
+    vectors, _, embedded = ingest._embed_batch_deduplicated(["photosynthesis", "photosynthesis"])
+    assert embedded == 1 and vectors == [[0.0, 1.0], [0.0, 1.0]]
+    assert store.stats()["rows"] == 0
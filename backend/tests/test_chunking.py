@@ -0,0 +1,50 @@
+from app.chunking import Chunker, fixed_spans, section_starts
+
+NOTES = (
+    "# Photosynthesis\n"
+    + "Chlorophyll absorbs red and blue light. " * 20
+    + "\n\n2. Cellular Respiration\n"
+    + "Glycolysis splits glucose in the cytoplasm. " * 20
+    + "\n\nMITOSIS\nChromosomes line up at the metaphase plate."
+)
+
+
+def test_fixed_windows_share_the_configured_overlap():
+    text = "abcdefghij" * 30
+    spans = fixed_spans(text, size=100, overlap=20)
+    assert spans[:3] == [(0, 100), (80, 180), (160, 260)]
+    assert spans[-1][1] == len(text)
+    assert fixed_spans("short", size=100, overlap=20) == [(0, 5)]
+
+
+def test_sentence_packing_keeps_sentences_whole_and_overlaps():
+    spans = Chunker("sentence", size=300, overlap=90).spans(NOTES)
+    assert all(end - start <= 300 for start, end in spans)
+    assert all(NOTES[end - 1] == "." for _, end in spans)
+    assert all(later[0] < earlier[1] for earlier, later in zip(spans, spans[1:]))
+    covered = set()
+    for start, end in spans:
+        covered.update(range(start, end))
+    assert all(index in covered for index, char in enumerate(NOTES) if not char.isspace())
+
+
+def test_heading_strategy_starts_sections_in_fresh_chunks():
+    starts = section_starts(NOTES)
+    assert [NOTES[index:NOTES.index("\n", index)] for index in starts] == [
+        "# Photosynthesis", "2. Cellular Respiration", "MITOSIS"
+    ]
+    spans = Chunker("heading", size=1000, overlap=200).spans(NOTES)
+    chunk_starts = [start for start, _ in spans]
+    assert starts[1] in chunk_starts
+    # The short final section fits next to respiration, so it is not orphaned in its own chunk.
+    assert starts[2] not in chunk_starts
+    assert not any(start < starts[1] < end for start, end in spans)
+
+
+def test_token_budget_uses_the_supplied_tokenizer():
+    words = lambda text: len(text.split())
+    chunker = Chunker("tokens", size=40, overlap=8, count_tokens=words, tokenizer_name="words")
+    spans = chunker.spans(NOTES)
+    assert chunker.config_tag == "tokens:40:8:words"
+    assert all(words(NOTES[start:end]) <= 40 for start, end in spans)
+    assert len(spans) > 1
@@ -0,0 +1,87 @@
+import os
+
+import numpy as np
+
+from app import ingest
+from app.content_cache import ContentCache
+
+
+class _MemoryStore:
+    def __init__(self):
+        self.docs = []
+
+    def add_documents(self, docs):
+        self.docs.extend(docs)
+
+
+def test_cache_round_trip_and_lru_eviction(tmp_path):
+    cache = ContentCache(root=tmp_path, max_bytes=10_000)
+    cache.store_extraction("aaa", "first handout " * 100, {"fileType": "txt"})
+    cache.store_embeddings("aaa", "tag", [(0, 10), (10, 20)], np.ones((2, 4)))
+
+    text, details = cache.load_extraction("aaa")
+    spans, vectors = cache.load_embeddings("aaa", "tag")
+    assert details == {"fileType": "txt"} and text.startswith("first handout")
+    assert spans == [(0, 10), (10, 20)] and vectors.dtype == np.float32
+    assert cache.load_embeddings("aaa", "other-model") is None
+
+    # Make "aaa" the oldest entry, then push the cache over its limit.
+    stamp = next(tmp_path.rglob("entry.json"))
+    os.utime(stamp, (1, 1))
+    cache.store_extraction("bbb", "x" * 8_500, {})
+    assert cache.load_extraction("aaa") is None
+    assert cache.load_extraction("bbb") is not None
+    assert cache.size_bytes() <= 10_000
+    assert cache.stats()["evictions"] == 1
+
+    assert cache.purge()["entries_removed"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_pipeline_version_separates_entries(tmp_path):
+    ContentCache(root=tmp_path, pipeline_version="1").store_extraction("aaa", "old text", {})
+    assert ContentCache(root=tmp_path, pipeline_version="2").load_extraction("aaa") is None
+
+
+def test_identical_upload_skips_extraction_and_embedding(tmp_path, monkeypatch):
+    cache = ContentCache(root=tmp_path)
+    monkeypatch.setattr(ingest, "get_content_cache", lambda: cache)
+    monkeypatch.setattr(ingest, "get_chunk_embedding_store", lambda model: None)
+    monkeypatch.setattr(ingest, "add_to_index", lambda docs: None)
+    extract_calls, embed_calls = [], []
+    real_extract = ingest.extract_text_auto
+
+    def counting_extract(*args, **kwargs):
+        extract_calls.append(args[1])
+        return real_extract(*args, **kwargs)
+
+    def fake_embed(texts):
+        embed_calls.append(len(texts))
+        return [[float(len(text)), 1.0] for text in texts], ingest._primary_embed_tag()
+
+    monkeypatch.setattr(ingest, "extract_text_auto", counting_extract)
+    monkeypatch.setattr(ingest, "_embed_texts_tagged", fake_embed)
+    data = ("Photosynthesis converts light into chemical energy. " * 60).encode()
+
+    first_store, second_store = _MemoryStore(), _MemoryStore()
+    first = ingest.ingest_bytes(data, first_store, "bio.txt", with_metrics=True, metadata_overrides={"roll_no": "a"})
+    second = ingest.ingest_bytes(data, second_store, "bio.txt", with_metrics=True, metadata_overrides={"roll_no": "b"})
+
+    assert first["content_cache"] == {"extraction": "miss", "embeddings": "miss"}
+    assert second["content_cache"] == {"extraction": "hit", "embeddings": "hit"}
+    assert len(extract_calls) == 1 and len(embed_calls) == 1
+    assert [doc["embedding"] for doc in second_store.docs] == [doc["embedding"] for doc in first_store.docs]
+    assert {doc["meta"]["roll_no"] for doc in second_store.docs} == {"b"}
+
+
+def test_fallback_embeddings_are_not_cached(tmp_path, monkeypatch):
+    cache = ContentCache(root=tmp_path)
+    monkeypatch.setattr(ingest, "get_content_cache", lambda: cache)
+    monkeypatch.setattr(ingest, "get_chunk_embedding_store", lambda model: None)
+    monkeypatch.setattr(ingest, "add_to_index", lambda docs: None)
+    monkeypatch.setattr(ingest, "_embed_texts_tagged", lambda texts: ([[0.0, 1.0] for _ in texts], "hash"))
+
+    data = b"Mitosis produces two identical daughter cells. " * 40
+    ingest.ingest_bytes(data, _MemoryStore(), "cells.txt")
+    result = ingest.ingest_bytes(data, _MemoryStore(), "cells.txt", with_metrics=True)
+    assert result["content_cache"] == {"extraction": "hit", "embeddings": "miss"}
@@ -0,0 +1,72 @@
+import sys
+
+import numpy as np
+import pytest
+
+from app import embedding_backends, ingest
+from app.embedding_backends import EmbeddingBackend, OnnxBackend, create_backend, register_backend
+
+
+class _CountingBackend(EmbeddingBackend):
+    name = "counting"
+    loads = 0
+
+    def _load(self):
+        type(self).loads += 1
+
+    def _encode(self, texts):
+        return np.array([[float(len(text)), 0.0] for text in texts])
+
+
+def test_registry_creates_configured_backends_lazily():
+    register_backend("counting", _CountingBackend)
+    backend = create_backend("counting", model_name="tiny", batch_size=4, threads=2)
+
+    assert (backend.batch_size, backend.threads, backend.tag) == (4, 2, "st-counting:tiny")
+    assert _CountingBackend.loads == 0
+    assert backend.encode(["ab", "abc"]).tolist() == [[2.0, 0.0], [3.0, 0.0]]
+    backend.encode(["a"])
+    assert _CountingBackend.loads == 1
+    assert create_backend("torch", model_name="tiny").tag == "st:tiny"
+    with pytest.raises(ValueError):
+        create_backend("tpu")
+
+
+def test_ingest_uses_the_selected_backend_and_its_tag(monkeypatch):
+    register_backend("counting", _CountingBackend)
+    monkeypatch.setattr(ingest, "OLLAMA_EMBED_MODEL", None)
+    monkeypatch.setattr(ingest, "get_embedding_backend", lambda: create_backend("counting", model_name="tiny"))
+
+    assert ingest._embed_texts_tagged(["abcd"]) == ([[4.0, 0.0]], "st-counting:tiny")
+    assert ingest._primary_embed_tag() == "st-counting:tiny"
+
+
+def test_onnx_backend_mean_pools_and_normalises():
+    class Session:
+        def run(self, outputs, feeds):
+            assert set(feeds) == {"input_ids", "attention_mask"}
+            hidden = np.zeros((2, 3, 2), dtype="float32")
+            hidden[0] = [[3, 0], [1, 0], [100, 100]]  # last position is padding
+            hidden[1] = [[0, 2], [0, 2], [0, 2]]
+            return [hidden]
+
+    def tokenizer(texts, **kwargs):
+        return {
+            "input_ids": np.ones((2, 3)),
+            "attention_mask": np.array([[1, 1, 0], [1, 1, 1]]),
+            "token_type_ids": np.zeros((2, 3)),
+        }
+
+    backend = OnnxBackend(model_name="tiny")
+    backend._session, backend._tokenizer = Session(), tokenizer
+    backend._input_names, backend._max_length, backend._cls_pooling = {"input_ids", "attention_mask"}, 8, False
+    backend._loaded = True
+
+    assert backend.encode(["x", "y"]).tolist() == [[1.0, 0.0], [0.0, 1.0]]
+
+
+def test_getting_the_backend_does_not_import_torch(monkeypatch):
+    monkeypatch.setattr(embedding_backends, "_default_backend", None)
+    monkeypatch.delitem(sys.modules, "torch", raising=False)
+    backend = embedding_backends.get_embedding_backend()
+    assert not backend._loaded and "torch" not in sys.modules
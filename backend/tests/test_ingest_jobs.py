@@ -0,0 +1,143 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from app.ingest_jobs import IngestJobManager, IngestQueueFull, describe_stage
+
+
+def _manager(tmp_path, runner, **kwargs):
+    db_path = tmp_path / "jobs.db"
+    return IngestJobManager(runner, connect=lambda: sqlite3.connect(db_path), **kwargs)
+
+
+def _submit(manager, tmp_path, filename, content):
+    upload_path = tmp_path / f"spool_{filename}"
+    upload_path.write_bytes(content)
+    return manager.submit(
+        university="SCA", roll_no="r1", user_id=1, filename=filename, upload_path=upload_path, file_size=len(content)
+    )
+
+
+def _wait_for(manager, job_id, predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id, "SCA", "r1")
+        if predicate(job):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} never reached the expected state: {job}")
+
+
+def test_describe_stage_formats_page_and_batch_progress():
+    assert describe_stage("extracting") == "extracting"
+    assert describe_stage("ocr", 12, 80) == "ocr page 12/80"
+    assert describe_stage("embedding", 300, 900) == "embedding 300/900"
+
+
+def test_job_reports_progress_and_stores_result(tmp_path):
+    release = threading.Event()
+
+    def runner(job, progress):
+        assert Path(job["upload_path"]).read_bytes() == b"lecture notes"
+        progress("ocr", 12, 80)
+        release.wait(5)
+        progress("embedding", 900, 900)
+        return {"status": "success", "chunks_added": 3}
+
+    manager = _manager(tmp_path, runner)
+    manager.start()
+    try:
+        job = _submit(manager, tmp_path, "notes.pdf", b"lecture notes")
+        assert job["status"] in ("queued", "running")
+
+        running = _wait_for(manager, job["job_id"], lambda j: j["stage"] == "ocr page 12/80")
+        assert running["status"] == "running"
+        assert running["progress"] == {"current": 12, "total": 80}
+
+        release.set()
+        done = _wait_for(manager, job["job_id"], lambda j: j["status"] == "completed")
+    finally:
+        manager.stop()
+
+    assert done["result"] == {"status": "success", "chunks_added": 3}
+    assert not (tmp_path / "spool_notes.pdf").exists()
+    assert manager.get(job["job_id"], "SCA", "someone_else") is None
+
+
+def test_failed_job_records_error(tmp_path):
+    def runner(job, progress):
+        raise ValueError("The PDF appears to be scanned images.")
+
+    manager = _manager(tmp_path, runner)
+    manager.start()
+    try:
+        job = _submit(manager, tmp_path, "scan.pdf", b"%PDF")
+        failed = _wait_for(manager, job["job_id"], lambda j: j["status"] == "failed")
+    finally:
+        manager.stop()
+    assert "scanned images" in failed["error"]
+
+
+def test_unfinished_jobs_resume_after_restart(tmp_path):
+    processed = []
+
+    def runner(job, progress):
+        processed.append(job["filename"])
+        return {"status": "success"}
+
+    # A process that accepted uploads but stopped before running them.
+    first = _manager(tmp_path, runner)
+    queued = _submit(first, tmp_path, "a.pdf", b"a")
+    interrupted = _submit(first, tmp_path, "b.pdf", b"b")
+    first._update(interrupted["job_id"], status="running", stage="embedding 64/900")
+
+    second = _manager(tmp_path, runner)
+    assert second.start() == 2
+    try:
+        for job in (queued, interrupted):
+            _wait_for(second, job["job_id"], lambda j: j["status"] == "completed")
+    finally:
+        second.stop()
+    assert sorted(processed) == ["a.pdf", "b.pdf"]
+
+
+def test_submit_rejects_when_queue_is_full(tmp_path):
+    release = threading.Event()
+    manager = _manager(tmp_path, lambda job, progress: release.wait(5) and {}, workers=1, max_pending=1)
+    manager.start()
+    try:
+        _submit(manager, tmp_path, "1.pdf", b"1")
+        _wait_for(manager, manager.list_jobs("SCA", "r1")[0]["job_id"], lambda j: j["status"] == "running")
+        _submit(manager, tmp_path, "2.pdf", b"2")
+        with pytest.raises(IngestQueueFull):
+            _submit(manager, tmp_path, "3.pdf", b"3")
+    finally:
+        release.set()
+        manager.stop()
+
+
+def test_only_jobs_with_expired_leases_are_requeued(tmp_path):
+    first = _manager(tmp_path, lambda job, progress: {})
+    job = _submit(first, tmp_path, "live.pdf", b"live")
+    assert first._claim(job["job_id"])["owner"] == first.owner
+
+    # Another process starting up must leave a job with a live lease alone.
+    second = _manager(tmp_path, lambda job, progress: {}, lease_seconds=60)
+    assert second.start() == 0
+    second.stop()
+    assert second.get(job["job_id"], "SCA", "r1")["status"] == "running"
+
+    first._update(job["job_id"], heartbeat_at="2000-01-01T00:00:00")
+    assert second._requeue_expired() == [job["job_id"]]
+    assert second.get(job["job_id"], "SCA", "r1")["status"] == "queued"
+
+
+def test_a_queued_job_is_claimed_by_one_worker_only(tmp_path):
+    first = _manager(tmp_path, lambda job, progress: {})
+    second = _manager(tmp_path, lambda job, progress: {})
+    job = _submit(first, tmp_path, "once.pdf", b"once")
+    assert first._claim(job["job_id"]) is not None
+    assert second._claim(job["job_id"]) is None
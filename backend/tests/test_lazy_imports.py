@@ -0,0 +1,27 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+_PROBE = """
+import json, sys
+import app.main
+from app import rag, vector_store
+print(json.dumps({
+    "modules": sorted(name for name in ("chromadb", "torch", "sentence_transformers", "openai", "plotly", "faiss")
+                      if name in sys.modules),
+    "store_opened": vector_store.vector_store_stats()["stores"] > 0,
+    "index_opened": rag._rag_index is not None,
+}))
+"""
+
+
+def test_importing_the_app_defers_heavy_dependencies():
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    state = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert state == {"modules": [], "store_opened": False, "index_opened": False}
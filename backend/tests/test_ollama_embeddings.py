@@ -0,0 +1,150 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from app import ingest
+from app.ollama_embeddings import OllamaEmbeddingClient
+
+
+class _StubOllama:
+    """Local stand-in for Ollama's embedding endpoints."""
+
+    def __init__(self, batch_endpoint=True, failures=None, delay=0.0):
+        self.batch_endpoint = batch_endpoint
+        self.failures = failures or {}  # input text -> number of 503s before succeeding (-1: always)
+        self.delay = delay
+        self.requests = []
+        self.connections = set()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                with stub.lock:
+                    stub.requests.append(self.path)
+                    stub.connections.add(self.client_address)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    time.sleep(stub.delay)
+                    self._handle(payload)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def _handle(self, payload):
+                if self.path == "/api/embed" and not stub.batch_endpoint:
+                    return self._reply(404, {"error": "404 page not found"})
+                texts = payload["input"] if self.path == "/api/embed" else [payload["prompt"]]
+                with stub.lock:
+                    for text in texts:
+                        remaining = stub.failures.get(text, 0)
+                        if remaining:
+                            stub.failures[text] = remaining - 1 if remaining > 0 else -1
+                            return self._reply(503, {"error": "busy"})
+                vectors = [[float(len(text)), 1.0] for text in texts]
+                if self.path == "/api/embed":
+                    return self._reply(200, {"embeddings": vectors})
+                return self._reply(200, {"embedding": vectors[0]})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_factory():
+    stubs, clients = [], []
+
+    def make(client_options=None, **stub_options):
+        stub = _StubOllama(**stub_options)
+        client = OllamaEmbeddingClient("nomic-embed-text", stub.url, backoff=0.01, **(client_options or {}))
+        stubs.append(stub)
+        clients.append(client)
+        return stub, client
+
+    yield make
+    for client in clients:
+        client.close()
+    for stub in stubs:
+        stub.close()
+
+
+def test_batches_run_concurrently_over_pooled_connections(stub_factory):
+    stub, client = stub_factory({"batch_size": 10, "concurrency": 3}, delay=0.05)
+    texts = [f"chunk {index}" * (index % 7 + 1) for index in range(95)]
+
+    vectors = client.embed(texts)
+
+    assert vectors == [[float(len(text)), 1.0] for text in texts]
+    assert stub.requests == ["/api/embed"] * 10
+    assert 1 < stub.max_in_flight <= 3
+    assert len(stub.connections) <= 3
+
+
+def test_transient_errors_are_retried(stub_factory):
+    stub, client = stub_factory({"batch_size": 4}, failures={"flaky": 2})
+
+    assert client.embed(["a", "flaky", "c"]) == [[1.0, 1.0], [5.0, 1.0], [1.0, 1.0]]
+    assert client.stats()["retries"] == 2 and len(stub.requests) == 3
+
+
+def test_failing_batch_falls_back_alone(stub_factory):
+    stub, client = stub_factory({"batch_size": 2, "retries": 1}, failures={"poison": -1})
+    fallback_batches = []
+
+    def fallback(batch):
+        fallback_batches.append(batch)
+        return [[0.0, 0.0] for _ in batch]
+
+    vectors = client.embed(["a", "b", "poison", "d", "e"], fallback=fallback)
+
+    assert fallback_batches == [["poison", "d"]]
+    assert vectors == [[1.0, 1.0], [1.0, 1.0], [0.0, 0.0], [0.0, 0.0], [1.0, 1.0]]
+    assert client.stats()["fallback_batches"] == 1
+    with pytest.raises(requests.RequestException):
+        client.embed(["poison"])
+
+
+def test_servers_without_batch_endpoint_use_per_text_requests(stub_factory):
+    stub, client = stub_factory({"batch_size": 8}, batch_endpoint=False)
+
+    assert client.embed(["ab", "abc"]) == [[2.0, 1.0], [3.0, 1.0]]
+    assert client.embed(["abcd"]) == [[4.0, 1.0]]
+    assert stub.requests == ["/api/embed", "/api/embeddings", "/api/embeddings", "/api/embeddings"]
+    assert client.stats()["batch_endpoint"] is False
+
+
+def test_ingest_tags_partial_fallback_as_local(stub_factory, monkeypatch):
+    stub, client = stub_factory({"batch_size": 1, "retries": 0}, failures={"poison": -1})
+    monkeypatch.setattr(ingest, "OLLAMA_EMBED_MODEL", "nomic-embed-text")
+    monkeypatch.setattr(ingest, "get_ollama_embedder", lambda model: client)
+    monkeypatch.setattr(ingest, "_embed_locally", lambda texts: ([[9.0, 9.0] for _ in texts], "st:test"))
+
+    assert ingest._embed_texts_tagged(["ok"]) == ([[2.0, 1.0]], "ollama:nomic-embed-text")
+    assert ingest._embed_texts_tagged(["ok", "poison"]) == ([[2.0, 1.0], [9.0, 9.0]], "st:test")
@@ -0,0 +1,117 @@
+import io
+import threading
+import time
+
+import pytest
+from PyPDF2 import PageObject, PdfWriter
+from PyPDF2.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+from app import pdf_extraction
+from app.pdf_extraction import PageTimeout, extract_pdf_pages, page_needs_ocr
+
+
+def _pdf(pages):
+    """Build a PDF whose pages carry the given text (None leaves a page without a text layer)."""
+    writer = PdfWriter()
+    font = writer._add_object(
+        DictionaryObject(
+            {
+                NameObject("/Type"): NameObject("/Font"),
+                NameObject("/Subtype"): NameObject("/Type1"),
+                NameObject("/BaseFont"): NameObject("/Helvetica"),
+            }
+        )
+    )
+    for text in pages:
+        page = PageObject.create_blank_page(width=300, height=300)
+        if text is not None:
+            stream = DecodedStreamObject()
+            stream.set_data(f"BT /F1 12 Tf 20 150 Td ({text}) Tj ET".encode())
+            page[NameObject("/Contents")] = writer._add_object(stream)
+            page[NameObject("/Resources")] = DictionaryObject(
+                {NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})}
+            )
+        writer.add_page(page)
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def test_watermark_only_pages_need_ocr():
+    assert page_needs_ocr("")
+    assert page_needs_ocr("  Scanned with CamScanner \n")
+    assert not page_needs_ocr("Scanned with CamScanner\nCell division has two phases.")
+
+
+def test_only_pages_without_text_are_ocrd_and_order_is_kept(monkeypatch):
+    ocrd = []
+
+    def fake_ocr(path, index, budget, scale):
+        ocrd.append(index)
+        return index, f"ocr text {index}"
+
+    monkeypatch.setattr(pdf_extraction, "_ocr_page", fake_ocr)
+    monkeypatch.setattr(pdf_extraction, "ensure_ocr_dependencies", lambda: None)
+    progress = []
+
+    pages = extract_pdf_pages(
+        _pdf(["Page zero", None, "Page two", None]),
+        workers=1,
+        progress=lambda stage, done, total: progress.append((stage, done, total)),
+    )
+
+    assert [page.strip() for page in pages] == ["Page zero", "ocr text 1", "Page two", "ocr text 3"]
+    assert ocrd == [1, 3]
+    assert progress[-1] == ("ocr", 2, 2)
+
+
+def test_missing_ocr_stack_only_fails_fully_scanned_documents(monkeypatch):
+    def missing():
+        raise RuntimeError("pytesseract is required for OCR fallback.")
+
+    monkeypatch.setattr(pdf_extraction, "ensure_ocr_dependencies", missing)
+    assert [page.strip() for page in extract_pdf_pages(_pdf(["Notes", None]), workers=1)] == ["Notes", ""]
+    with pytest.raises(RuntimeError):
+        extract_pdf_pages(_pdf([None, None]), workers=1)
+
+
+def test_process_pool_keeps_page_order(monkeypatch):
+    monkeypatch.setattr(pdf_extraction, "PDF_PARALLEL_MIN_PAGES", 2)
+    texts = [f"Lecture page {index}" for index in range(12)]
+    try:
+        pages = extract_pdf_pages(_pdf(texts), workers=2)
+        assert pdf_extraction._pool is not None
+    finally:
+        pdf_extraction.shutdown_pdf_pool()
+    assert [page.strip() for page in pages] == texts
+
+
+def test_page_budget_interrupts_slow_pages():
+    started = time.monotonic()
+    with pytest.raises(PageTimeout):
+        with pdf_extraction._page_budget(0.05):
+            time.sleep(2)
+    assert time.monotonic() - started < 1
+
+
+def test_short_documents_off_the_main_thread_run_in_the_pool():
+    results = []
+    worker = threading.Thread(target=lambda: results.append(extract_pdf_pages(_pdf(["Only page"]), workers=1)))
+    try:
+        worker.start()
+        worker.join(60)
+        # The page budget cannot fire on this thread, so the page went to a pool worker.
+        assert pdf_extraction._pool is not None
+    finally:
+        pdf_extraction.shutdown_pdf_pool()
+    assert [page.strip() for page in results[0]] == ["Only page"]
+
+
+def test_spooled_upload_is_extracted_in_place(tmp_path, monkeypatch):
+    from app import ingest
+
+    path = tmp_path / "notes.pdf"
+    path.write_bytes(_pdf(["Spooled page"]))
+    monkeypatch.setattr(pdf_extraction.tempfile, "NamedTemporaryFile", None)
+    text = ingest.extract_text_from_pdf_bytes(path.read_bytes(), file_path=str(path))
+    assert text.strip() == "Spooled page"
@@ -0,0 +1,68 @@
+import threading
+import time
+
+from app.ingest import QueryEmbeddingService
+
+
+class _RecordingEmbedder:
+    def __init__(self, delay=0.0):
+        self.calls = []
+        self.delay = delay
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        time.sleep(self.delay)
+        return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_repeated_queries_are_served_from_cache():
+    embedder = _RecordingEmbedder()
+    service = QueryEmbeddingService(embed_fn=embedder, model_name=lambda: "test-model", batch_window_ms=0)
+
+    first = service.embed("Photosynthesis")
+    assert service.embed("  photosynthesis ") == first
+    assert len(embedder.calls) == 1
+
+    stats = service.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+
+def test_cache_is_keyed_by_model_and_expires():
+    embedder = _RecordingEmbedder()
+    model = {"name": "a"}
+    service = QueryEmbeddingService(
+        embed_fn=embedder, model_name=lambda: model["name"], batch_window_ms=0, ttl_seconds=0.05
+    )
+
+    service.embed("topic")
+    model["name"] = "b"
+    service.embed("topic")
+    assert len(embedder.calls) == 2
+
+    time.sleep(0.06)
+    service.embed("topic")
+    assert len(embedder.calls) == 3
+
+
+def test_concurrent_queries_share_one_batch():
+    embedder = _RecordingEmbedder(delay=0.01)
+    service = QueryEmbeddingService(
+        embed_fn=embedder, model_name=lambda: "test-model", batch_window_ms=50, max_batch=16
+    )
+    results = {}
+    barrier = threading.Barrier(8)
+
+    def worker(idx):
+        barrier.wait()
+        results[idx] = service.embed(f"question{'x' * idx}")
+
+    threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sum(len(call) for call in embedder.calls) == 8
+    assert len(embedder.calls) < 8
+    assert all(results[idx][0] == len(f"question{'x' * idx}") for idx in range(8))
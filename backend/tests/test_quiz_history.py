@@ -0,0 +1,54 @@
+import sqlite3
+
+from app import analytics
+from app.analytics_writer import AnalyticsWriter
+
+
+def _attempt(question_id, correct=True):
+    return {"question_id": question_id, "difficulty": "easy", "was_correct": correct, "conceptLabel": "Cells"}
+
+
+def test_quiz_history_is_inserted_in_one_batch_and_deduplicated(tmp_path, monkeypatch):
+    db_path = tmp_path / "analytics.db"
+    monkeypatch.setattr(analytics, "_DB_PATH", db_path)
+    analytics._ensure_schema()
+
+    history = [_attempt(f"q{i}", correct=i % 2 == 0) for i in range(20)] + [{"difficulty": "easy"}]
+    assert analytics.log_quiz_history("s1", history, source_label="notes.pdf", university="U", roll_no="1") == 20
+    # Re-logging the completed quiz with one new answer only stores the new one.
+    assert analytics.log_quiz_history("s1", history + [_attempt("q20")], university="U", roll_no="1") == 1
+    assert analytics.log_quiz_history("s2", history[:3], university="U", roll_no="1") == 3
+    assert analytics.log_quiz_history("s2", [], university="U", roll_no="1") == 0
+
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT session_id, COUNT(*), SUM(was_correct) FROM quiz_attempts GROUP BY session_id"
+        ).fetchall()
+    assert rows == [("s1", 21, 11), ("s2", 3, 2)]
+
+
+def test_queued_steps_are_committed_before_the_history_and_batches_keep_their_order(tmp_path, monkeypatch):
+    db_path = tmp_path / "analytics.db"
+    writer = AnalyticsWriter(db_path, flush_ms=1000)
+    monkeypatch.setattr(analytics, "_DB_PATH", db_path)
+    monkeypatch.setattr(analytics, "_writer", writer)
+    analytics._ensure_schema()
+
+    # Each quiz step queues its answer; completing the quiz then logs the whole history.
+    history = [{**_attempt(f"q{i}"), "difficulty": f"d{i}"} for i in range(5)]
+    analytics.log_quiz_attempt("s1", history[0], source_label="notes.pdf", university="U", roll_no="1")
+    assert analytics.log_quiz_history("s1", history, university="U", roll_no="1") == 4
+    # A duplicate single row is not counted.
+    assert analytics.log_quiz_history("s1", history[:1], university="U", roll_no="1") == 0
+    assert writer.stats()["written"] == 1
+
+    with sqlite3.connect(db_path) as conn:
+        labels = dict(conn.execute("SELECT question_id, source_label FROM quiz_attempts WHERE session_id = 's1'"))
+    assert labels == {"q0": "notes.pdf", "q1": None, "q2": None, "q3": None, "q4": None}
+
+    # Every row of the batch gets the same timestamp; reads must still return them in order.
+    analytics.log_quiz_attempt("s2", _attempt("q0"), university="U", roll_no="1")
+    rows = analytics._fetch_quiz_attempt_rows(limit=3, university="U", roll_no="1")
+    assert [(row["session_id"], row["difficulty"]) for row in rows] == [("s1", "d3"), ("s1", "d4"), ("s2", "easy")]
+    assert analytics._get_latest_session_id(university="U", roll_no="1") == "s2"
+    writer.close()
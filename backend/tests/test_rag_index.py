@@ -0,0 +1,246 @@
+import json
+import os
+import time
+
+import numpy as np
+import pytest
+
+from app.rag import STALE_SEGMENT_SECONDS, RAGIndex
+
+DIM = 8
+
+
+def _doc(text, vector, university="SCA", roll_no="A1", source="notes.pdf", **meta):
+    return {
+        "text": text,
+        "embedding": list(vector),
+        "meta": {"university": university, "roll_no": roll_no, "source": source, **meta},
+    }
+
+
+def _unit(idx):
+    vec = np.zeros(DIM, dtype="float32")
+    vec[idx] = 1.0
+    return vec
+
+
+def test_search_is_scoped_to_tenant_partition(tmp_path):
+    index = RAGIndex(dimension=DIM, store_dir=tmp_path)
+    index.add_documents([
+        _doc("alice chunk", _unit(0), roll_no="A1"),
+        _doc("bob chunk", _unit(0), roll_no="B2"),
+    ])
+
+    hits = index.search(_unit(0), top_k=5, filters={"university": "SCA", "roll_no": "A1"})
+    assert [hit["text"] for hit in hits] == ["alice chunk"]
+
+    assert index.search(_unit(0), filters={"university": "SCA", "roll_no": "nobody"}) == []
+    with pytest.raises(RuntimeError):
+        index.search(_unit(0), filters={"university": "SCA"})
+
+
+def test_allowed_sources_filter_within_tenant(tmp_path):
+    index = RAGIndex(dimension=DIM, store_dir=tmp_path)
+    index.add_documents([
+        _doc("best match", _unit(1), source="a.pdf"),
+        _doc("other source", _unit(1), source="b.pdf"),
+    ])
+
+    hits = index.search(
+        _unit(1), top_k=5, allowed_sources=["b.pdf"], filters={"university": "SCA", "roll_no": "A1"}
+    )
+    assert [hit["text"] for hit in hits] == ["other source"]
+
+
+def test_evicted_tenants_reload_from_disk(tmp_path):
+    index = RAGIndex(dimension=DIM, store_dir=tmp_path, max_loaded_tenants=1)
+    index.add_documents([_doc("first", _unit(2), roll_no="A1")])
+    index.add_documents([_doc("second", _unit(3), roll_no="B2")])
+    assert index.stats()["loaded_tenants"] == 1
+
+    hits = index.search(_unit(2), top_k=1, filters={"university": "SCA", "roll_no": "A1"})
+    assert hits[0]["text"] == "first"
+
+    reopened = RAGIndex(dimension=DIM, store_dir=tmp_path)
+    hits = reopened.search(_unit(3), top_k=1, filters={"university": "SCA", "roll_no": "B2"})
+    assert hits[0]["text"] == "second"
+
+
+def test_each_batch_is_an_append_only_segment(tmp_path):
+    index = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    for idx in range(3):
+        index.add_documents([_doc(f"chunk {idx}", _unit(idx))])
+
+    tenant_dir = next((tmp_path / "tenants").iterdir())
+    first_name = json.loads((tenant_dir / "manifest.json").read_text())["segments"][0]
+    first_segment = tenant_dir / first_name / "embeddings.npy"
+    mtime = first_segment.stat().st_mtime_ns
+    index.add_documents([_doc("chunk 3", _unit(3))])
+    assert first_segment.stat().st_mtime_ns == mtime
+    assert index.stats()["loaded_segments"] == 4
+
+    # An interrupted write leaves a directory the manifest does not list; reload ignores it and
+    # removes it once it is old enough that no other process can still be writing it.
+    stale, in_flight = tenant_dir / ".seg-1-stale.tmp", tenant_dir / ".seg-2-inflight.tmp"
+    stale.mkdir()
+    in_flight.mkdir()
+    os.utime(stale, (time.time() - 2 * STALE_SEGMENT_SECONDS,) * 2)
+    reopened = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    hits = reopened.search(_unit(3), top_k=1, filters={"university": "SCA", "roll_no": "A1"})
+    assert hits[0]["text"] == "chunk 3"
+    assert not stale.exists()
+    assert in_flight.exists()
+
+
+def test_compaction_merges_segments_without_changing_results(tmp_path):
+    index = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    for idx in range(4):
+        index.add_documents([_doc(f"chunk {idx}", _unit(idx), source=f"s{idx}.pdf")])
+    filters = {"university": "SCA", "roll_no": "A1"}
+    before = index.search(_unit(2), top_k=2, filters=filters)
+
+    assert index.compact() == 1
+    assert index.stats()["loaded_segments"] == 1
+    assert index.search(_unit(2), top_k=2, filters=filters) == before
+
+    reopened = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    hits = reopened.search(_unit(1), top_k=1, allowed_sources=["s1.pdf"], filters=filters)
+    assert hits[0]["text"] == "chunk 1"
+
+
+def test_segments_are_memory_mapped_columns(tmp_path):
+    index = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    index.add_documents([
+        _doc("ünïcode text", _unit(0), source="a.pdf", heading="Intro"),
+        _doc("plain text", _unit(1), source="b.pdf"),
+    ])
+
+    reopened = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    filters = {"university": "SCA", "roll_no": "A1"}
+    hits = reopened.search(_unit(0), top_k=1, filters=filters)
+    assert hits[0]["text"] == "ünïcode text"
+    assert hits[0]["meta"]["heading"] == "Intro"
+
+    tenant = reopened._get_tenant(("SCA", "A1"))
+    segment = tenant._segments[0]
+    assert isinstance(segment.embeddings, np.memmap)
+    assert segment.sources == ["a.pdf", "b.pdf"]
+
+
+def test_json_segments_are_upgraded_on_open(tmp_path):
+    tenant_dir = tmp_path / "tenants" / "legacy"
+    segment_dir = tenant_dir / "seg-000001"
+    segment_dir.mkdir(parents=True)
+    np.save(segment_dir / "embeddings.npy", np.stack([_unit(4)]))
+    (segment_dir / "metadata.json").write_text(
+        json.dumps({"texts": ["old chunk"], "metadatas": [{"university": "SCA", "roll_no": "A1", "source": "x"}]})
+    )
+    (tenant_dir / "manifest.json").write_text(
+        json.dumps({"key": ["SCA", "A1"], "segments": ["seg-000001"], "next_segment": 2})
+    )
+
+    from app.rag import _TenantIndex
+
+    tenant = _TenantIndex(("SCA", "A1"), tenant_dir, DIM)
+    assert (segment_dir / "texts.bin").exists()
+    assert tenant.search(_unit(4).reshape(1, -1), 1, ["x"], {})[0]["text"] == "old chunk"
+
+
+def test_delete_and_update_use_tombstones_until_compaction(tmp_path):
+    index = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    filters = {"university": "SCA", "roll_no": "A1"}
+    index.add_documents([
+        {**_doc("v1 intro", _unit(0), source="notes.pdf"), "id": "notes.pdf_0"},
+        {**_doc("v1 detail", _unit(1), source="notes.pdf"), "id": "notes.pdf_1"},
+        {**_doc("other", _unit(2), source="other.pdf"), "id": "other.pdf_0"},
+    ])
+
+    # Re-adding an existing id replaces the old row.
+    index.add_documents([{**_doc("v2 intro", _unit(0), source="notes.pdf"), "id": "notes.pdf_0"}])
+    hits = index.search(_unit(0), top_k=5, filters=filters)
+    assert [hit["text"] for hit in hits].count("v1 intro") == 0
+    assert hits[0]["id"] == "notes.pdf_0" and hits[0]["text"] == "v2 intro"
+
+    assert index.delete(source="notes.pdf", filters=filters) == 2
+    assert index.delete(ids=["other.pdf_0", "missing"], filters=filters) == 1
+    assert index.search(_unit(0), top_k=5, filters=filters) == []
+    assert index.stats()["loaded_dead_chunks"] == 4
+
+    reopened = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    assert reopened.search(_unit(2), top_k=5, filters=filters) == []
+    reopened.add_documents([{**_doc("fresh", _unit(3)), "id": "fresh_0"}])
+    assert reopened.compact() == 1
+    stats = reopened.stats()
+    assert stats["loaded_chunks"] == 1 and stats["loaded_dead_chunks"] == 0
+    assert reopened.search(_unit(3), top_k=5, filters=filters)[0]["text"] == "fresh"
+
+
+def test_delete_is_scoped_to_tenant(tmp_path):
+    index = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    index.add_documents([_doc("mine", _unit(0), roll_no="A1"), _doc("theirs", _unit(0), roll_no="B2")])
+
+    assert index.delete(source="notes.pdf", filters={"university": "SCA", "roll_no": "A1"}) == 1
+    hits = index.search(_unit(0), filters={"university": "SCA", "roll_no": "B2"})
+    assert [hit["text"] for hit in hits] == ["theirs"]
+    with pytest.raises(RuntimeError):
+        index.delete(source="notes.pdf", filters={})
+
+
+@pytest.mark.parametrize("mode", ["ivf_flat", "hnsw", "ivf_pq"])
+def test_ann_modes_match_exact_search_and_honour_tombstones(tmp_path, mode):
+    pytest.importorskip("faiss")
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((2000, DIM)).astype("float32")
+    docs = [
+        {**_doc(f"chunk {row}", vector, source=f"s{row % 4}.pdf"), "id": f"c{row}"}
+        for row, vector in enumerate(vectors)
+    ]
+    filters = {"university": "SCA", "roll_no": "A1"}
+    index = RAGIndex(
+        dimension=DIM,
+        store_dir=tmp_path,
+        background_compaction=False,
+        index_mode=mode,
+        ann_min_vectors=1000,
+        ann_params={"nlist": 8, "pq_m": 4},
+    )
+    index.add_documents(docs)
+    index.compact()
+    tenant = index._get_tenant(("SCA", "A1"))
+    assert (tenant._segments[0].directory / "ann.faiss").exists()
+
+    # Querying with a stored vector must return that chunk first once every list is probed.
+    hits = index.search(vectors[42], top_k=3, filters=filters, nprobe=8, ef_search=128)
+    assert hits[0]["text"] == "chunk 42"
+    assert hits[0]["score"] == pytest.approx(1.0, abs=1e-5)
+
+    index.delete(ids=["c41"], filters=filters)
+    hits = index.search(vectors[41], top_k=3, allowed_sources=["s1.pdf"], filters=filters, nprobe=8)
+    assert len(hits) == 3
+    assert all(hit["id"] != "c41" and hit["meta"]["source"] == "s1.pdf" for hit in hits)
+
+
+def test_processes_sharing_a_tenant_directory_see_each_others_writes(tmp_path):
+    # Two indexes over one directory stand in for two server processes.
+    first = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    second = RAGIndex(dimension=DIM, store_dir=tmp_path, background_compaction=False)
+    filters = {"university": "SCA", "roll_no": "A1"}
+    first.add_documents([_doc("from first", _unit(0), chunk_index=0)])
+    assert [hit["text"] for hit in second.search(_unit(0), top_k=5, filters=filters)] == ["from first"]
+
+    second.add_documents([_doc("from second", _unit(1), chunk_index=1)])
+    first.add_documents([_doc("first again", _unit(2), chunk_index=2)])
+    tenant_dir = next((tmp_path / "tenants").iterdir())
+    manifest = json.loads((tenant_dir / "manifest.json").read_text())
+    assert len(manifest["segments"]) == len(set(manifest["segments"])) == 3
+    assert {hit["text"] for hit in first.search(_unit(1), top_k=5, filters=filters)} == {
+        "from first", "from second", "first again",
+    }
+
+    second.delete(source="notes.pdf", filters=filters)
+    assert first.search(_unit(0), top_k=5, filters=filters) == []
+
+    second.add_documents([_doc("after delete", _unit(3), chunk_index=3)])
+    assert first.compact() == 1
+    assert [hit["text"] for hit in second.search(_unit(3), top_k=5, filters=filters)] == ["after delete"]
+    assert second._get_tenant(("SCA", "A1")).segment_count == 1
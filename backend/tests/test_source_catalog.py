@@ -0,0 +1,87 @@
+import pytest
+
+pytest.importorskip("chromadb")
+
+from app.source_catalog import CATALOG_FILE
+from app.vector_store import ChromaVectorStore
+
+ALICE = {"university": "uni", "roll_no": "1"}
+BOB = {"university": "uni", "roll_no": "2"}
+
+
+def _docs(source, count, tenant, ingested_at, text="chunk"):
+    return [
+        {
+            "id": f"{tenant['roll_no']}:{source}_{i}",
+            "text": f"{text} {i}",
+            "embedding": [1.0, float(i)],
+            "meta": {"source": source, "ingested_at": ingested_at, **tenant},
+        }
+        for i in range(count)
+    ]
+
+
+def _scanned(store, filters):
+    catalog, store.catalog = store.catalog, None
+    try:
+        return store._compute_stats(filters)
+    finally:
+        store.catalog = catalog
+
+
+def test_catalog_tracks_upserts_and_deletes_per_tenant(tmp_path):
+    store = ChromaVectorStore(str(tmp_path), "documents")
+    store.add_documents(_docs("a.pdf", 3, ALICE, "2024-01-01T00:00:00"))
+    store.add_documents(_docs("b.pdf", 2, ALICE, "2024-02-01T00:00:00"))
+    store.add_documents(_docs("a.pdf", 4, BOB, "2024-01-05T00:00:00"))
+    # Re-ingesting replaces chunks instead of adding to the counts.
+    store.add_documents(_docs("a.pdf", 2, ALICE, "2024-03-01T00:00:00", text="longer chunk"))
+
+    stats = store.stats(filters=ALICE)
+    assert stats["docs"] == 5
+    assert [(entry["source"], entry["chunks"], entry["latest_ingested_at"]) for entry in stats["sources"]] == [
+        ("a.pdf", 3, "2024-03-01T00:00:00"),
+        ("b.pdf", 2, "2024-02-01T00:00:00"),
+    ]
+    assert stats["sources"][0]["bytes"] == len("longer chunk 0") + len("longer chunk 1") + len("chunk 2")
+    scanned = _scanned(store, ALICE)
+    assert scanned["docs"] == stats["docs"]
+    assert [{k: v for k, v in entry.items() if k != "bytes"} for entry in stats["sources"]] == scanned["sources"]
+
+    assert store.delete_document("a.pdf", filters=ALICE) == 3
+    assert [entry["source"] for entry in store.list_sources(filters=ALICE)] == ["b.pdf"]
+    assert store.stats(filters=BOB)["docs"] == 4
+
+
+def test_existing_collection_is_indexed_on_first_read(tmp_path):
+    store = ChromaVectorStore(str(tmp_path), "documents")
+    store.add_documents(_docs("a.pdf", 3, ALICE, "2024-01-01T00:00:00"))
+    (tmp_path / CATALOG_FILE).unlink()
+
+    reopened = ChromaVectorStore(str(tmp_path), "documents", client=store.client)
+    assert reopened.stats(filters=ALICE)["docs"] == 3
+    assert reopened.catalog.is_built()
+
+    reopened.clear()
+    assert reopened.stats(filters=ALICE) == {"docs": 0, "sources": []}
+
+
+def test_tenant_stats_are_cached_until_that_tenant_writes(tmp_path):
+    store = ChromaVectorStore(str(tmp_path), "documents")
+    store.add_documents(_docs("a.pdf", 2, ALICE, "2024-01-01T00:00:00"))
+    store.add_documents(_docs("a.pdf", 1, BOB, "2024-01-01T00:00:00"))
+
+    first = store.stats(filters=ALICE)
+    first["sources"][0]["chunks"] = 99  # callers get copies
+    assert store.list_sources(filters=ALICE)[0]["chunks"] == 2
+    store.stats(filters=BOB)
+    assert (store.stats_cache.stats()["hits"], store.stats_cache.stats()["misses"]) == (1, 2)
+
+    store.add_documents(_docs("b.pdf", 1, BOB, "2024-02-01T00:00:00"))
+    assert store.stats(filters=ALICE)["docs"] == 2  # still cached
+    assert store.stats(filters=BOB)["docs"] == 2  # invalidated by Bob's ingest
+    store.delete_document("a.pdf", filters=ALICE)
+    assert store.stats(filters=ALICE) == {"docs": 0, "sources": []}
+
+    cache = store.stats_cache.stats()
+    assert (cache["hits"], cache["misses"], cache["invalidations"]) == (2, 4, 2)
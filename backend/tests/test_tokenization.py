@@ -0,0 +1,50 @@
+import re
+from collections import Counter
+
+from app.analytics import derive_chunk_topics
+from app.chunking import Chunker
+from app.ingest import STOP_WORDS
+from app.tokenization import tokenize
+
+TEXT = (
+    "Enzymes lower activation energy. Enzymes are proteins with an active site. "
+    "Substrates bind the active site and products are released. " * 12
+)
+
+
+def _per_chunk_counts(chunk):
+    tokens = re.findall(r"[A-Za-z][\w-]+", chunk.lower())
+    return Counter(token for token in tokens if len(token) >= 4 and token not in STOP_WORDS)
+
+
+def test_single_pass_matches_per_chunk_tokenization():
+    spans = Chunker("sentence", size=300, overlap=120).spans(TEXT)
+    assert any(later[0] < earlier[1] for earlier, later in zip(spans, spans[1:]))
+
+    tokenized = tokenize(TEXT, spans, STOP_WORDS)
+
+    assert tokenized.token_count == len(re.findall(r"[A-Za-z][\w-]+", TEXT))
+    assert tokenized.term_counts == _per_chunk_counts(TEXT)
+    assert tokenized.chunk_term_counts == [_per_chunk_counts(TEXT[start:end]) for start, end in spans]
+
+
+def test_chunk_topics_skip_stop_words_with_or_without_shared_counts():
+    chunks = ["This this this mitochondria mitochondria produce energy"]
+    shared = derive_chunk_topics(chunks, term_counts=tokenize(chunks[0], [(0, len(chunks[0]))], STOP_WORDS).chunk_term_counts)
+    assert derive_chunk_topics(chunks) == shared
+    assert shared[0]["terms"][0] == "mitochondria" and "this" not in shared[0]["terms"]
+
+
+def test_word_crossing_a_chunk_edge_is_counted_once_whole():
+    text = "Photosynthesis converts sunlight. Chlorophyll absorbs light."
+    edge = text.index("sunlight") + 3
+    spans = [(0, edge), (edge, len(text))]
+
+    tokenized = tokenize(text, spans, STOP_WORDS)
+
+    assert tokenized.token_count == len(re.findall(r"[A-Za-z][\w-]+", text))
+    assert tokenized.term_counts == _per_chunk_counts(text)
+    assert tokenized.chunk_term_counts == [
+        Counter({"photosynthesis": 1, "converts": 1, "sunlight": 1}),
+        Counter({"chlorophyll": 1, "absorbs": 1, "light": 1}),
+    ]
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import io
+import zipfile
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.ingest import extract_text_auto
+from app.uploads import UploadLimitMiddleware, UploadTooLarge, mapped_file, spool_upload
+
+
+class _CountingFile(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = super().read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def test_spool_hashes_incrementally_and_maps_the_file(tmp_path):
+    data = b"Mitochondria produce ATP.\n" * 5000
+    upload = UploadFile(file=io.BytesIO(data), filename="notes.txt")
+
+    spooled = asyncio.run(spool_upload(upload, tmp_path, max_bytes=len(data), chunk_size=4096))
+
+    assert spooled.size == len(data)
+    assert spooled.sha256 == hashlib.sha256(data).hexdigest()
+    with mapped_file(spooled.path) as mapped:
+        text, details = extract_text_auto(mapped, "notes.txt")
+    assert text == data.decode()
+    assert details["fileType"] == "txt"
+
+
+def test_spool_aborts_once_the_limit_is_passed(tmp_path):
+    source = _CountingFile(b"x" * 1_000_000)
+    upload = UploadFile(file=source, filename="big.pdf")
+
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_upload(upload, tmp_path, max_bytes=100_000, chunk_size=16_384))
+
+    assert source.bytes_read < 100_000 + 16_384 * 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_docx_is_extracted_from_a_memory_map(tmp_path):
+    body = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        "<w:body><w:p><w:r><w:t>Osmosis moves water.</w:t></w:r></w:p></w:body></w:document>"
+    )
+    path = tmp_path / "lesson.docx"
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", body)
+
+    with mapped_file(path) as mapped:
+        text, details = extract_text_auto(mapped, "lesson.docx")
+    assert text == "Osmosis moves water."
+    assert details["fileType"] == "docx"
+
+
+def test_middleware_rejects_oversized_bodies_before_the_endpoint():
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, paths=("/upload",), max_bytes=1024)
+    calls = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        calls.append(file.filename)
+        return {"ok": True}
+
+    client = TestClient(app)
+    assert client.post("/upload", files={"file": ("small.txt", b"a" * 100)}).status_code == 200
+
+    response = client.post("/upload", files={"file": ("big.txt", b"a" * 200_000)})
+    assert response.status_code == 413
+    assert "File too large" in response.json()["detail"]
+
+    def chunked_body():
+        for _ in range(50):
+            yield b"a" * 8192
+
+    streamed = client.post("/upload", content=chunked_body(), headers={"content-type": "multipart/form-data; boundary=x"})
+    assert streamed.status_code == 413
+    assert calls == ["small.txt"]
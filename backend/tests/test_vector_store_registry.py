@@ -0,0 +1,39 @@
+import threading
+
+import pytest
+
+pytest.importorskip("chromadb")
+
+from app.vector_store import VectorStoreRegistry
+
+
+def test_registry_shares_one_client_per_directory(tmp_path):
+    registry = VectorStoreRegistry()
+    stores = []
+    threads = [
+        threading.Thread(target=lambda: stores.append(registry.get(str(tmp_path / "chroma"), "documents")))
+        for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(store) for store in stores}) == 1
+    assert registry.get(str(tmp_path / "chroma" / ".." / "chroma")) is stores[0]
+    notes = registry.get(str(tmp_path / "chroma"), "notes")
+    assert notes is not stores[0] and notes.client is stores[0].client
+
+    notes.add_documents([{"id": "a", "text": "alpha", "embedding": [1.0, 0.0], "meta": {"source": "a.txt"}}])
+    stats = registry.stats()
+    assert stats["stores"] == 2
+    [client] = stats["clients"]
+    assert client["collections"] == ["documents", "notes"]
+    assert client["disk_bytes"] > 0 and client["files"] > 0
+
+    registry.close()
+    assert (registry.stats()["clients"], registry.stats()["stores"]) == ([], 0)
+    reopened = registry.get(str(tmp_path / "chroma"), "notes")
+    assert reopened is not notes
+    assert reopened.collection.count() == 1
+    registry.close()
@@ -1,5 +1,5 @@
 import { useCallback } from 'react'
-import { uploadFile } from '../services/api/files'
+import { uploadFile, type IngestJob } from '../services/api/files'
 import useAppStore, { type AppState } from '../store/useAppStore'
 import type { UploadQueueItem } from '../types/file'
 import { formatBytes } from '../utils/formatters'
@@ -39,7 +39,19 @@ export function useUpload() {
             statusMessage: undefined,
           },
         ])
-        let result = await uploadFile(file)
+        const reportProgress = (job: IngestJob) => {
+          const total = job.progress?.total ?? 0
+          const fraction = total ? (job.progress?.current ?? 0) / total : 0
+          upsertFileItems([
+            {
+              ...metadata,
+              progress: Math.round(35 + fraction * 60),
+              status: 'processing',
+              statusMessage: job.stage,
+            },
+          ])
+        }
+        let result = await uploadFile(file, false, reportProgress)
 
         if (result.status === 'duplicate_detected') {
           // Very simple prompt - strictly satisfies requirement "prompt user"
@@ -48,7 +60,7 @@ export function useUpload() {
           // Wait, standard window.confirm might block UI rendering if not careful, but React state updates handle it.
           // Better: use a boolean flag or similar. But requirement allows simple prompt.
           if (window.confirm(`Duplicate Detected: ${file.name}\n${result.message}\n\nReplace existing version?`)) {
-            result = await uploadFile(file, true)
+            result = await uploadFile(file, true, reportProgress)
           } else {
             throw new Error("Skipped duplicate.")
           }
@@ -10,7 +10,37 @@ type UploadResponse = {
   message?: string
 }
 
-export async function uploadFile(file: File, force = false): Promise<UploadResponse> {
+export type IngestJob = {
+  job_id: string
+  status: 'queued' | 'running' | 'completed' | 'failed'
+  stage?: string
+  progress?: { current: number; total: number }
+  result?: UploadResponse | null
+  error?: string | null
+}
+
+const JOB_POLL_INTERVAL_MS = 1500
+
+// Uploads are processed by a background job; poll it until the pipeline finishes.
+async function waitForIngestJob(jobId: string, onProgress?: (job: IngestJob) => void): Promise<UploadResponse> {
+  for (;;) {
+    const job = await request<IngestJob>(`${API_BASE_URL}/ingest-jobs/${jobId}`)
+    onProgress?.(job)
+    if (job.status === 'completed') {
+      return job.result ?? { status: 'success' }
+    }
+    if (job.status === 'failed') {
+      throw new Error(job.error || 'Processing failed.')
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+  }
+}
+
+export async function uploadFile(
+  file: File,
+  force = false,
+  onProgress?: (job: IngestJob) => void,
+): Promise<UploadResponse> {
   if (FEATURE_FLAGS.useMocks) {
     return mockUploadFile(file)
   }
@@ -93,7 +123,8 @@ export async function uploadFile(file: File, force = false): Promise<UploadRespo
     throw new Error(message)
   }
 
-  return response.json()
+  const job = (await response.json()) as IngestJob
+  return waitForIngestJob(job.job_id, onProgress)
 }
 
 export async function listFiles(): Promise<UploadQueueItem[]> {